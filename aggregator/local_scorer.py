@@ -0,0 +1,139 @@
+# aggregator/local_scorer.py
+
+import re
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_TOKEN_OR_SEP = re.compile(r"[a-z0-9]+|\0")
+_SEP = -2
+
+
+def _base(token: str) -> str:
+    # "NFTs" and "NFT" are the same term
+    return token[:-1] if len(token) > 3 and token.endswith("s") else token
+
+
+class LocalSynergyScorer:
+    """
+    Scores memos against node profiles without a network call.
+
+    The profiles are compiled once into a TF-IDF matrix (nodes x vocabulary, rows
+    L2-normalized; a term in every profile weighs least). A batch of memos becomes
+    one sparse matrix over the same vocabulary (words outside it can't match any
+    profile and are dropped, but still count towards the memo's length), so
+    scoring a whole bucket against one or all nodes is a single sparse product.
+    Scores are cosine-like similarities in [0, 1].
+    """
+
+    def __init__(self, node_profiles: Dict[str, str]):
+        self.node_ids: List[str] = sorted(node_profiles)
+        self.node_index = {n: i for i, n in enumerate(self.node_ids)}
+        self.vocab: Dict[str, int] = {}
+        rows, cols, n_terms = [], [], 0
+        for row, node_id in enumerate(self.node_ids):
+            for token in _TOKEN.findall(node_profiles[node_id].lower()):
+                base = _base(token)
+                col = self.vocab.get(base)
+                if col is None:
+                    col = self.vocab[base] = n_terms
+                    self.vocab.setdefault(base + "s", col)
+                    n_terms += 1
+                rows.append(row)
+                cols.append(col)
+        n_nodes = len(self.node_ids)
+        tf = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_nodes, n_terms))
+        tf.sum_duplicates()
+        df = np.bincount(tf.indices, minlength=n_terms)
+        self.idf = np.log((1.0 + n_nodes) / (1.0 + df)) + 1.0
+        weights = tf.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.profiles = sparse.diags(1.0 / norms) @ weights   # nodes x terms
+        self.profiles_t = self.profiles.T.tocsr()              # terms x nodes
+        self._lookup = dict(self.vocab)
+        self._lookup["\0"] = _SEP
+
+    def memo_matrix(self, memos: Sequence[str]) -> sparse.csr_matrix:
+        """
+        memos x terms, idf-weighted and divided by sqrt(word count).
+
+        All memos are tokenized in one regex pass over their NUL-joined text; the
+        separators give each token its row.
+        """
+        if not memos:
+            return sparse.csr_matrix((0, self.profiles.shape[1]))
+        text = "\0".join(memos).lower()
+        if text.count("\0") != len(memos) - 1:
+            text = "\0".join(m.replace("\0", " ") for m in memos).lower()
+        tokens = _TOKEN_OR_SEP.findall(text)
+        cols = np.fromiter(map(self._lookup.get, tokens, repeat(-1)), dtype=np.int64, count=len(tokens))
+        is_sep = cols == _SEP
+        rows = np.cumsum(is_sep)
+        words = np.bincount(rows[~is_sep], minlength=len(memos))
+        known = cols >= 0
+        rows, cols = rows[known], cols[known]
+        # rows come out sorted, so the CSR arrays can be built directly
+        indptr = np.zeros(len(memos) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(memos)), out=indptr[1:])
+        scale = 1.0 / np.sqrt(np.maximum(words, 1))
+        matrix = sparse.csr_matrix((self.idf[cols] * scale[rows], cols, indptr),
+                                   shape=(len(memos), self.profiles.shape[1]))
+        matrix.sum_duplicates()
+        return matrix
+
+    def score_matrix(self, memos: Sequence[str]) -> sparse.csr_matrix:
+        """
+        memos x nodes (columns in self.node_ids order); sparse, since most memos
+        share no term with most profiles.
+        """
+        return (self.memo_matrix(memos) @ self.profiles_t).tocsr()
+
+    def node_scores(self, memos: Sequence[str], node_id: str) -> np.ndarray:
+        """
+        Similarity of every memo to one node's profile (zeros for an unknown node).
+        """
+        if node_id not in self.node_index:
+            return np.zeros(len(memos))
+        profile = self.profiles_t[:, self.node_index[node_id]].toarray().ravel()
+        return self.memo_matrix(memos) @ profile
+
+    def rank(self, memos: Sequence[str], node_id: str, k: Optional[int] = None) -> np.ndarray:
+        """
+        Indices of the k best memos for node_id, best first, ties in input order
+        (all of them when k is None). Picking the top k is a partial sort.
+        """
+        scores = self.node_scores(memos, node_id)
+        if k is None or k >= len(scores):
+            return np.argsort(-scores, kind="stable")
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.lexsort((top, -scores[top]))]
+
+    def order(self, items: Sequence, memos: Sequence[str], node_id: str, k: Optional[int] = None) -> List:
+        """
+        items reordered by their memo's score for node_id: the top k first, best
+        first, then the rest in their original order.
+        """
+        top = self.rank(memos, node_id, k)
+        if len(top) == len(items):
+            return [items[i] for i in top]
+        chosen = np.zeros(len(items), dtype=bool)
+        chosen[top] = True
+        return [items[i] for i in top] + [item for item, c in zip(items, chosen) if not c]
+
+    def synergy_bonuses(self, memos: Sequence[str], node_ids: Iterable[str]) -> Dict[str, float]:
+        """
+        The LLM's 0..5 synergy scale: 5 x the mean similarity of the memos to each
+        node's profile.
+        """
+        node_ids = list(node_ids)
+        if not memos:
+            return {n: 0.0 for n in node_ids}
+        means = np.asarray(self.score_matrix(memos).mean(axis=0)).ravel()
+        return {n: round(5.0 * float(means[self.node_index[n]]), 2) if n in self.node_index else 0.0
+                for n in node_ids}
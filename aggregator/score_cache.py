@@ -0,0 +1,183 @@
+# aggregator/score_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+def score_key(memos: List[str], profiles: Dict[str, str], nodes: Iterable[str],
+              model: str, prompt_version: str) -> str:
+    """
+    Content address of one scoring request: SHA-256 over a canonical JSON form.
+    Memo order is kept (it is block order); profiles and nodes are sorted, since
+    their order carries no meaning.
+    """
+    canonical = json.dumps(
+        {
+            "memos": list(memos),
+            "profiles": sorted(profiles.items()),
+            "nodes": sorted(nodes),
+            "model": model,
+            "prompt_version": prompt_version,
+        },
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ScoreCache:
+    """
+    Two-tier cache for synergy scores (JSON-able dicts), keyed by score_key().
+
+      - memory: an LRU bounded by max_entries and by max_bytes of serialized values
+      - disk: a SQLite table at `path` (optional) that survives restarts; hits are
+        promoted to memory
+
+    get_or_compute() also collapses concurrent requests for the same key into one
+    call: the first caller computes, the others wait for its result. A compute
+    that raises is not cached (the error goes to every waiter). Each entry keeps
+    the latency of the call that produced it, so every hit adds that to
+    `saved_latency_s`.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 4096,
+                 max_bytes: int = 16 << 20):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, size, latency)
+        self._memory_bytes = 0
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, latency REAL NOT NULL, created REAL NOT NULL)"
+            )
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0,
+                         "errors": 0, "saved_latency_s": 0.0, "compute_latency_s": 0.0}
+
+    # --- tiers ------------------------------------------------------------------
+
+    def _memory_get(self, key: str):
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        return entry
+
+    def _memory_put(self, key: str, value, latency: float, size: int):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        self._memory[key] = (value, size, latency)
+        self._memory_bytes += size
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes):
+            _, (_, evicted_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _disk_get(self, key: str):
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT value, latency FROM scores WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], len(row[0])
+
+    def _disk_put(self, key: str, blob: str, latency: float):
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO scores (key, value, latency, created) VALUES (?, ?, ?, ?)",
+                             (key, blob, latency, time.time()))
+
+    # --- lookups ----------------------------------------------------------------
+
+    def get(self, key: str):
+        """
+        The cached value, or None. Counts as a hit or a miss.
+        """
+        with self._lock:
+            return self._lookup(key)
+
+    def _lookup(self, key: str):
+        entry = self._memory_get(key)
+        if entry is not None:
+            self.counters["memory_hits"] += 1
+            self.counters["saved_latency_s"] += entry[2]
+            return entry[0]
+        found = self._disk_get(key)
+        if found is not None:
+            value, latency, size = found
+            self._memory_put(key, value, latency, size)
+            self.counters["disk_hits"] += 1
+            self.counters["saved_latency_s"] += latency
+            return value
+        return None
+
+    def put(self, key: str, value, latency: float = 0.0):
+        blob = json.dumps(value, sort_keys=True)
+        with self._lock:
+            self._memory_put(key, value, latency, len(blob))
+            self._disk_put(key, blob, latency)
+
+    def get_or_compute(self, key: str, compute: Callable[[], object]):
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                future = self._inflight[key] = Future()
+                self.counters["misses"] += 1
+            else:
+                self.counters["coalesced"] += 1
+        if waiting is not None:
+            value = waiting.result()
+            with self._lock:
+                self.counters["saved_latency_s"] += getattr(waiting, "latency", 0.0)
+            return value
+
+        started = time.perf_counter()
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self.counters["errors"] += 1
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        latency = time.perf_counter() - started
+        self.put(key, value, latency)
+        with self._lock:
+            self.counters["compute_latency_s"] += latency
+            del self._inflight[key]
+        future.latency = latency
+        future.set_result(value)
+        return value
+
+    # --- reporting --------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        with self._lock:
+            c = dict(self.counters)
+            lookups = c["memory_hits"] + c["disk_hits"] + c["misses"] + c["coalesced"]
+            c["hit_rate"] = round((lookups - c["misses"]) / lookups, 4) if lookups else 0.0
+            c["memory_entries"] = len(self._memory)
+            c["memory_bytes"] = self._memory_bytes
+            return c
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,282 @@
+# aggregator/scoring_service.py
+
+import asyncio
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from aggregator.score_cache import score_key
+from aggregator.synergy_ai import (GROUP_PROMPT_VERSION, PROMPT_VERSION, parse_group_scores, parse_scores,
+                                   record_llm_call)
+from metrics.registry import METRICS
+
+_STOP = object()      # queued by stop()
+_NO_CARRY = object()  # _dispatch holds no item over from the previous group
+
+
+@dataclass
+class ScoringItem:
+    seq: int
+    block_id: int
+    node_activity: Dict[str, float]
+    memos: List[str]
+
+
+def default_async_client():
+    from openai import AsyncOpenAI
+
+    # Retries are ours (with jittered backoff), not the client's
+    return AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"),
+                       base_url=os.environ.get("OPENAI_BASE_URL"), max_retries=0)
+
+
+class ScoringService:
+    """
+    Synergy scoring off the consensus path. submit() queues a finalized block's memos
+    and returns at once; an asyncio loop on a background thread scores them and
+    applies the bonuses through AINodeAggregator.apply_synergy(), which ignores a
+    block it has already applied.
+
+      - coalescing: when a request slot frees up, every block waiting in the queue
+        (up to max_blocks_per_prompt blocks / max_memos_per_prompt memos) goes into
+        one prompt. The blocks are labelled, the model scores each one separately,
+        and each block gets its own scores, so payouts don't depend on grouping. A
+        block the answer leaves out is scored locally
+      - at most max_inflight requests at once, each with a timeout; failures are
+        retried up to `retries` times with exponential backoff and +-50% jitter. A
+        group that still fails is scored locally, so the payout window can't stall
+      - results are cached in the aggregator's ScoreCache
+      - at most queue_size blocks may be outstanding; submit() blocks beyond that
+
+    flush() waits until everything submitted before the call has been applied;
+    AINodeAggregator.maybe_run_monthly() calls it before paying out.
+    """
+
+    def __init__(self, aggregator, client=None, max_inflight: int = 4, max_blocks_per_prompt: int = 8,
+                 max_memos_per_prompt: int = 256, timeout: float = 30.0, retries: int = 3,
+                 backoff: float = 0.5, backoff_max: float = 10.0, queue_size: int = 4096):
+        self.aggregator = aggregator
+        self.client = client
+        self.max_inflight = max_inflight
+        self.max_blocks_per_prompt = max_blocks_per_prompt
+        self.max_memos_per_prompt = max_memos_per_prompt
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+        self._room = threading.BoundedSemaphore(queue_size)
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._outstanding = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self.stats = {"submitted": 0, "applied": 0, "prompts": 0, "llm_calls": 0, "retries": 0,
+                      "failed_prompts": 0, "cache_hits": 0, "max_blocks_in_prompt": 0}
+        self._retries = METRICS.counter("scoring_retries_total", "LLM scoring calls retried after a failure")
+        self._failed = METRICS.counter("scoring_failed_prompts_total", "Prompts scored locally after every retry failed")
+        METRICS.gauge("scoring_pending_blocks", "Blocks submitted for scoring and not yet applied", fn=self.pending)
+
+    # --- lifecycle --------------------------------------------------------------
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="synergy-scoring", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+        return self
+
+    def _run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._queue = asyncio.Queue()
+        if self.client is None:
+            self.client = default_async_client()
+        self._ready.set()
+        try:
+            loop.run_until_complete(self._dispatch())
+        except asyncio.CancelledError:
+            pass  # stop() gave up on in-flight calls
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits (up to timeout) for outstanding blocks, then stops the loop: groups
+        already sent to the model get up to another timeout to finish, and blocks
+        still queued are dropped. Returns whether everything was applied.
+        """
+        if self._thread is None:
+            return True
+        drained = self.flush(timeout)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, _STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Still waiting on in-flight calls; cancel them rather than hang the caller
+            self._loop.call_soon_threadsafe(self._cancel_all)
+            self._thread.join(timeout)
+        self._thread = None
+        return drained
+
+    def _cancel_all(self):
+        for task in asyncio.all_tasks(self._loop):
+            task.cancel()
+
+    # --- producer side ----------------------------------------------------------
+
+    def submit(self, block_id: int, node_activity: Dict[str, float], memos: List[str]):
+        self._room.acquire()
+        with self._cond:
+            seq = self._seq
+            self._seq += 1
+            self._outstanding.add(seq)
+            self.stats["submitted"] += 1
+        item = ScoringItem(seq, block_id, dict(node_activity), list(memos))
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every block submitted before this call has been applied.
+        """
+        with self._cond:
+            target = self._seq
+            return self._cond.wait_for(
+                lambda: min(self._outstanding, default=target) >= target, timeout=timeout)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._outstanding)
+
+    # --- event loop side --------------------------------------------------------
+
+    async def _dispatch(self):
+        slots = asyncio.Semaphore(self.max_inflight)
+        tasks = set()
+        carry = _NO_CARRY
+        stopping = False
+        while not stopping:
+            await slots.acquire()
+            first = carry if carry is not _NO_CARRY else await self._queue.get()
+            carry = _NO_CARRY
+            if first is _STOP:
+                break
+            group, memo_count = [first], len(first.memos)
+            while len(group) < self.max_blocks_per_prompt and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True  # score this group, then stop
+                    break
+                if memo_count + len(item.memos) > self.max_memos_per_prompt:
+                    carry = item
+                    break
+                group.append(item)
+                memo_count += len(item.memos)
+            task = asyncio.create_task(self._score_group(group))
+            tasks.add(task)
+            task.add_done_callback(lambda t: (tasks.discard(t), slots.release()))
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _score_group(self, group: List[ScoringItem]):
+        agg = self.aggregator
+        scores: Dict[int, Dict[str, float]] = {}  # seq -> that block's scores
+        todo = []  # (item, nodes, cache key) still to be scored
+        for item in group:
+            if not item.memos:
+                scores[item.seq] = {}
+                continue
+            nodes = sorted(item.node_activity)
+            key = score_key(item.memos, agg.node_profiles, nodes, agg.model, PROMPT_VERSION)
+            cached = agg.score_cache.get(key)
+            if cached is None:
+                cached = agg.score_cache.get(
+                    score_key(item.memos, agg.node_profiles, nodes, agg.model, GROUP_PROMPT_VERSION))
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                scores[item.seq] = cached
+            else:
+                todo.append((item, nodes, key))
+
+        if len(todo) == 1:
+            # A lone block gets the same prompt (and cache entry) as the synchronous path
+            item, nodes, key = todo[0]
+            started = time.perf_counter()
+            answer = await self._call_with_retries(agg._build_prompt(item.memos, nodes), group, parse_scores)
+            if answer is not None:
+                agg.score_cache.put(key, answer, time.perf_counter() - started)
+                scores[item.seq] = answer
+        elif todo:
+            # Blocks are labelled by position, and each gets back its own scores
+            started = time.perf_counter()
+            prompt = agg._build_group_prompt([(str(i), item.memos, nodes)
+                                              for i, (item, nodes, _) in enumerate(todo)])
+            answer = await self._call_with_retries(prompt, group, parse_group_scores, blocks=len(todo))
+            if answer is not None:
+                elapsed = (time.perf_counter() - started) / len(todo)
+                for i, (item, nodes, _) in enumerate(todo):
+                    if str(i) in answer:
+                        scores[item.seq] = answer[str(i)]
+                        agg.score_cache.put(score_key(item.memos, agg.node_profiles, nodes, agg.model,
+                                                      GROUP_PROMPT_VERSION), answer[str(i)], elapsed)
+        if todo:
+            self.stats["prompts"] += 1
+            self.stats["max_blocks_in_prompt"] = max(self.stats["max_blocks_in_prompt"], len(todo))
+        for item, nodes, _ in todo:
+            if item.seq not in scores:
+                # Failed, or missing from the answer: score this block locally
+                scores[item.seq] = agg.local_synergy(item.memos, nodes)
+
+        for item in group:
+            block_scores = scores[item.seq]
+            bonuses = {n: block_scores.get(n, 0.0) for n in item.node_activity} if block_scores else {}
+            try:
+                agg.apply_synergy(item.block_id, bonuses)
+            finally:
+                with self._cond:
+                    self._outstanding.discard(item.seq)
+                    self.stats["applied"] += 1
+                    self._cond.notify_all()
+                self._room.release()
+
+    async def _call_with_retries(self, prompt: str, group: List[ScoringItem], parse, blocks: int = 1):
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                if METRICS.enabled:
+                    self._retries.inc()
+                delay = min(self.backoff_max, self.backoff * (2 ** (attempt - 1)))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            started = time.perf_counter()
+            try:
+                self.stats["llm_calls"] += 1
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.aggregator.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=0.0,
+                        max_tokens=200 * blocks,
+                    ),
+                    timeout=self.timeout,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                timed_out = isinstance(e, asyncio.TimeoutError) or "Timeout" in type(e).__name__
+                record_llm_call("async", time.perf_counter() - started, "timeout" if timed_out else "error")
+                error = e
+                continue
+            record_llm_call("async", time.perf_counter() - started, "ok")
+            return parse(response.choices[0].message.content)
+        self.stats["failed_prompts"] += 1
+        if METRICS.enabled:
+            self._failed.inc()
+        blocks = [item.block_id for item in group]
+        print(f"[AI Aggregator] scoring failed for blocks {blocks} after {self.retries + 1} attempts:",
+              str(error) or type(error).__name__)
+        return None
@@ -2,9 +2,16 @@
 
 import time
 import os
+import threading
+from collections import deque
 from openai import OpenAI
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from aggregator.local_scorer import LocalSynergyScorer
+from aggregator.score_cache import ScoreCache, score_key
+from escrow.reward_payout import RewardPayout
+from metrics.registry import METRICS, perf_counter
 
 # Deterministic LLM usage
 #openai.api_key = os.getenv("OPENAI_API_KEY")
@@ -12,6 +19,65 @@ client = OpenAI(
     api_key=os.environ.get("OPENAI_API_KEY"),  # This is the default and can be omitted
 )
 
+# Bump whenever _build_prompt's wording changes, so cached scores from the old prompt
+# are not reused
+PROMPT_VERSION = "synergy-v1"
+# Same for _build_group_prompt; per-block scores from a group prompt are cached under it
+GROUP_PROMPT_VERSION = "synergy-group-v1"
+
+LLM_RESULTS = ("ok", "error", "timeout")
+_LLM_SECONDS = {path: METRICS.histogram("llm_call_seconds", "Latency of one LLM scoring call", path=path)
+                for path in ("sync", "async")}
+_LLM_CALLS = {(path, result): METRICS.counter("llm_calls_total", "LLM scoring calls by outcome",
+                                              path=path, result=result)
+              for path in ("sync", "async") for result in LLM_RESULTS}
+
+
+def record_llm_call(path: str, seconds: float, result: str):
+    """
+    Reports one LLM call ("sync" from the aggregator, "async" from ScoringService)
+    to METRICS, if enabled.
+    """
+    if METRICS.enabled:
+        _LLM_SECONDS[path].observe(seconds)
+        _LLM_CALLS[path, result].inc()
+
+
+def parse_scores(content: str) -> Dict[str, float]:
+    """
+    {node_id: score} from the model's JSON answer; an unparseable answer scores nothing.
+    """
+    synergy_map = {}
+    try:
+        parsed = json.loads(content.strip())
+        for node_id, synergy_str in parsed.items():
+            synergy_map[node_id] = float(synergy_str)
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        # fallback
+        pass
+    return synergy_map
+
+
+def parse_group_scores(content: str) -> Dict[str, Dict[str, float]]:
+    """
+    {block label: {node_id: score}} from the answer to a _build_group_prompt prompt;
+    a block whose entry is missing or unparseable is left out.
+    """
+    try:
+        parsed = json.loads(content.strip())
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    blocks = {}
+    for label, scores in parsed.items():
+        try:
+            blocks[str(label)] = {node_id: float(v) for node_id, v in scores.items()}
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return blocks
+
+
 class AINodeAggregator:
     """
     A synergy aggregator that:
@@ -22,15 +88,57 @@ class AINodeAggregator:
       5) Optionally can reorder tasks prior to block finalization (not fully implemented by default)
     """
 
-    def __init__(self, node_profiles: Dict[str, str] = None, monthly_cycle: float = 30.0):
+    def __init__(self, node_profiles: Dict[str, str] = None, monthly_cycle: float = 30.0,
+                 llm_client=None, model: str = "gpt-4o", score_cache: Optional[ScoreCache] = None,
+                 llm_prefilter: bool = False):
         """
         :param node_profiles: e.g. { "NodeA": "Focus: DeFi / NFT", ... }
         :param monthly_cycle: how often (seconds) we do synergy-based payouts
+        :param llm_client: OpenAI-compatible client (defaults to the module's client)
+        :param score_cache: where LLM scores are cached (defaults to an in-memory ScoreCache)
+        :param llm_prefilter: skip the LLM for memos that share no term with any profile
         """
         self.node_scores = {}   # node_id -> float
         self.node_profiles = node_profiles or {}
         self.monthly_cycle = monthly_cycle
         self.last_run = time.time()
+        self.llm_client = llm_client or client
+        self.model = model
+        self.score_cache = score_cache if score_cache is not None else ScoreCache()
+        self.llm_prefilter = llm_prefilter
+        self.monthly_pool = 100000   # escrow units paid out per cycle
+        self.credits_per_tx = 1       # single-credit payouts take the vectorized executor path
+        self.scoring_service = None  # see use_scoring_service()
+        self._scores_lock = threading.Lock()
+        self._applied_blocks = set()           # blocks whose synergy has been applied
+        self._applied_order = deque()          # ...oldest first, to bound the set
+        self.max_applied_history = 65536
+        self._local_scorer = None
+        self._local_profiles = None
+
+    @property
+    def local_scorer(self) -> LocalSynergyScorer:
+        """
+        LocalSynergyScorer over node_profiles, recompiled when the profiles change.
+        """
+        if self._local_scorer is None or self._local_profiles != self.node_profiles:
+            self._local_profiles = dict(self.node_profiles)
+            self._local_scorer = LocalSynergyScorer(self._local_profiles)
+        return self._local_scorer
+
+    def local_synergy(self, memos: List[str], node_ids) -> Dict[str, float]:
+        """
+        Synergy bonuses from the local scorer, on the LLM's 0..5 scale.
+        """
+        return self.local_scorer.synergy_bonuses(memos, node_ids)
+
+    def use_scoring_service(self, service):
+        """
+        Hands LLM scoring to an aggregator.scoring_service.ScoringService: blocks are
+        then scored off the caller's thread and their bonuses applied when they arrive.
+        """
+        self.scoring_service = service
+        return service
 
     def process_final_block(
         self,
@@ -46,27 +154,71 @@ class AINodeAggregator:
         if not block_memos and not node_activity:
             return
 
+        if self.scoring_service is not None:
+            # Base scores count now; the synergy bonus follows asynchronously
+            self._add_scores(node_activity)
+            self.scoring_service.submit(block.block_id, node_activity, block_memos)
+            return
+
         synergy_score_map = self._analyze_memos_with_llm(block_memos, node_activity)
         # Merge synergy + node_activity into node_scores
-        for node_id, base_score in node_activity.items():
-            synergy_bonus = synergy_score_map.get(node_id, 0.0)
-            old_score = self.node_scores.get(node_id, 0.0)
-            new_score = old_score + base_score + synergy_bonus
-            self.node_scores[node_id] = new_score
+        self._add_scores(node_activity)
+        self.apply_synergy(block.block_id, {n: synergy_score_map.get(n, 0.0) for n in node_activity})
+
+    def _add_scores(self, deltas: Dict[str, float]):
+        with self._scores_lock:
+            for node_id, delta in deltas.items():
+                self.node_scores[node_id] = self.node_scores.get(node_id, 0.0) + delta
+
+    def apply_synergy(self, block_id, bonuses: Dict[str, float]) -> bool:
+        """
+        Adds a block's synergy bonuses to node_scores exactly once: a block that was
+        already applied (a retried or duplicate result) is ignored. Returns whether
+        the bonuses were applied.
+        """
+        with self._scores_lock:
+            if block_id in self._applied_blocks:
+                return False
+            self._applied_blocks.add(block_id)
+            self._applied_order.append(block_id)
+            if len(self._applied_order) > self.max_applied_history:
+                self._applied_blocks.discard(self._applied_order.popleft())
+            for node_id, bonus in bonuses.items():
+                self.node_scores[node_id] = self.node_scores.get(node_id, 0.0) + bonus
+            return True
 
     def _analyze_memos_with_llm(self, memos: List[str], node_activity: Dict[str, float]) -> Dict[str, float]:
         """
         Call openai with temperature=0 for near-deterministic synergy calculation
         Return: { node_id: synergy_bonus, ... }
+
+        If the call fails, the local scorer's bonuses are used instead.
+
+        At temperature 0 the same prompt gives the same answer, so scores are cached
+        by score_key() over everything that shapes the prompt; identical requests in
+        flight at the same time share one call.
         """
         if not memos:
             return {}
 
+        node_list = sorted(node_activity.keys())
+        if self.llm_prefilter and self.local_scorer.memo_matrix(memos).nnz == 0:
+            return {}
+        key = score_key(memos, self.node_profiles, node_list, self.model, PROMPT_VERSION)
+        try:
+            scores = self.score_cache.get_or_compute(key, lambda: self._score_with_llm(memos, node_list))
+        except Exception as e:
+            print("[AI Aggregator] OpenAI call failed:", e)
+            return self.local_synergy(memos, node_list)
+
+        # Only keep keys that exist in node_activity
+        return {node_id: value for node_id, value in scores.items() if node_id in node_activity}
+
+    def _build_prompt(self, memos: List[str], node_list: List[str]) -> str:
         big_memo_text = "\n".join([f"- {m}" for m in memos])
-        profile_text = "\n".join([f"{nid} => {desc}" for nid, desc in self.node_profiles.items()])
-        node_list = list(node_activity.keys())
+        profile_text = "\n".join([f"{nid} => {desc}" for nid, desc in sorted(self.node_profiles.items())])
 
-        prompt = f"""
+        return f"""
 We have a set of transaction memos in a block, plus node profiles.
 
 Node Profiles:
@@ -85,95 +237,104 @@ Return a JSON object of synergy scores like:
 {{"NodeA": 3, "NodeB": 5, ...}}
         """
 
+    def _build_group_prompt(self, blocks: Sequence[Tuple[str, List[str], List[str]]]) -> str:
+        """
+        One prompt for several blocks, each given as (label, memos, contributing
+        nodes); the model scores every block on its own (see parse_group_scores).
+        """
+        profile_text = "\n".join([f"{nid} => {desc}" for nid, desc in sorted(self.node_profiles.items())])
+        block_text = "\n\n".join(
+            f"Block {label}:\nBlock Memos:\n" + "\n".join(f"- {m}" for m in memos)
+            + f"\nNodes that contributed to this block: {node_list}"
+            for label, memos, node_list in blocks
+        )
+
+        return f"""
+We have the transaction memos of several blocks, plus node profiles.
+
+Node Profiles:
+{profile_text}
+
+{block_text}
+
+For each block separately, we want an integer synergy bonus from 0..5 for each node
+that contributed to it, based on:
+- Does that block's content (memos) align with the node's declared focus?
+- Are that block's memos thematically relevant to the node's domain?
+
+Return a JSON object keyed by block, like:
+{{"12": {{"NodeA": 3, "NodeB": 5}}, "13": {{"NodeA": 0}}, ...}}
+        """
+
+    def _score_with_llm(self, memos: List[str], node_list: List[str]) -> Dict[str, float]:
+        """
+        One uncached LLM call. Raises if the call fails (so the failure isn't cached);
+        an unparseable answer is a deterministic result and scores nothing.
+        """
         # Deterministic call
+        started = perf_counter()
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
+            response = self.llm_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": self._build_prompt(memos, node_list)}],
                 temperature=0.0,
                 max_tokens=200,
             )
-            content = response.choices[0].message.content.strip()
         except Exception as e:
-            print("[AI Aggregator] OpenAI call failed:", e)
-            return {}
+            record_llm_call("sync", perf_counter() - started, "timeout" if "Timeout" in type(e).__name__ else "error")
+            raise
+        record_llm_call("sync", perf_counter() - started, "ok")
+        return parse_scores(response.choices[0].message.content)
 
-        synergy_map = {}
-        try:
-            parsed = json.loads(content)
-            # Only keep keys that exist in node_activity
-            for node_id, synergy_str in parsed.items():
-                if node_id in node_activity:
-                    synergy_val = float(synergy_str)
-                    synergy_map[node_id] = synergy_val
-        except json.JSONDecodeError:
-            # fallback
-            pass
-
-        return synergy_map
-
-    def maybe_run_monthly(self):
+    def maybe_run_monthly(self, wait_timeout: Optional[float] = None):
+        """
+        Issues the payout once per monthly_cycle: an escrow.reward_payout.RewardPayout
+        splitting monthly_pool by score. With a scoring service, first waits (up to
+        wait_timeout) until every block submitted so far has been scored, so the
+        payout covers the whole window; if that times out the payout is deferred.
+        """
         now = time.time()
         if now - self.last_run >= self.monthly_cycle:
-            synergy_tx = self._generate_synergy_reward_tx()
+            if self.scoring_service is not None and not self.scoring_service.flush(wait_timeout):
+                return None
+            payout = self._generate_synergy_payout()
             self.last_run = now
-            return synergy_tx
+            return payout
         return None
 
-    def _generate_synergy_reward_tx(self):
-        total_score = sum(self.node_scores.values())
-        if total_score == 0:
+    def _generate_synergy_payout(self) -> Optional[RewardPayout]:
+        # The window's scores move into the payout; blocks finalized meanwhile start
+        # the next window. If the debit fails, restore_payout() hands them back.
+        with self._scores_lock:
+            scores = dict(self.node_scores)
+            self.node_scores.clear()
+        payout = RewardPayout(f"AI_REWARD_{int(time.time())}", scores, self.monthly_pool,
+                              credits_per_tx=self.credits_per_tx)
+        if payout.total == 0:
+            self._add_scores(scores)
             return None
+        return payout
 
-        pft_pool = 100000
-        payouts = {}
-        for node_id, sc in self.node_scores.items():
-            frac = sc / total_score
-            payouts[node_id] = frac * pft_pool
-
-        self.node_scores.clear()
-
-        from concurrency.transaction import Transaction
-        write_set = set([f"BAL_{nid}" for nid in payouts.keys()] + ["ESCROW_POOL"])
-
-        def payout_action(read_data):
-            updates = {}
-            old_escrow = read_data.get("ESCROW_POOL", 1_000_000)
-            updates["ESCROW_POOL"] = old_escrow - pft_pool
-            for n_id, amt in payouts.items():
-                bal_key = f"BAL_{n_id}"
-                old_bal = read_data.get(bal_key, 0)
-                updates[bal_key] = old_bal + amt
-            return updates
-
-        tx = Transaction(
-            tx_id=f"AI_REWARD_{int(time.time())}",
-            read_keys=set(["ESCROW_POOL"] + [f"BAL_{n}" for n in payouts.keys()]),
-            write_keys=write_set,
-            action_fn=payout_action,
-            memo="Monthly synergy distribution from AI aggregator"
-        )
-        return tx
+    def restore_payout(self, payout: RewardPayout):
+        """
+        Puts an aborted payout's scores back, so they count toward the next one.
+        """
+        self._add_scores(payout.scores)
 
     # Optional: For daily synergy scheduling or reordering
-    def propose_ordering_for_block(self, pending_txs, node_id) -> List:
+    def propose_ordering_for_block(self, pending_txs, node_id, top_k: Optional[int] = None) -> List:
         """
         Suggest an ordering for the node's pending transactions, 
         awarding synergy for transactions whose memos match node's focus.
-        """
-        def synergy_priority(tx):
-            score = 0
-            profile = self.node_profiles.get(node_id, "")
-            # Basic rule: If profile has 'DeFi' and tx memo includes 'DeFi', big synergy
-            if "DeFi" in profile and "DeFi" in tx.memo:
-                score += 5
-            if "NFT" in profile and "NFT" in tx.memo:
-                score += 3
-            # negative so higher synergy sorts first
-            return -score
 
-        sorted_list = sorted(pending_txs, key=synergy_priority)
-        return sorted_list
+        The whole bucket is scored against the node's profile in one pass
+        (LocalSynergyScorer); with top_k only the best top_k are sorted to the front
+        and the rest keep their order.
+        """
+        pending_txs = list(pending_txs)
+        if not pending_txs:
+            return pending_txs
+        return self.local_scorer.order(pending_txs, [tx.memo or "" for tx in pending_txs], node_id, top_k)
 
     def record_censorship_flags(self, suspicious_node: str, reason: str):
         """
@@ -181,7 +342,6 @@ Return a JSON object of synergy scores like:
         we penalize them to reduce their monthly synergy payout.
         """
         penalty_points = 10
-        old_score = self.node_scores.get(suspicious_node, 0)
-        self.node_scores[suspicious_node] = old_score - penalty_points
+        self._add_scores({suspicious_node: -penalty_points})
         print(f"[AI Aggregator] Node {suspicious_node} penalized: {reason}")
 
@@ -0,0 +1,95 @@
+# benchmarks/account_state_bench.py
+#
+# Memory and throughput of the striped-lock, array-backed AccountState against the
+# original dict-of-Locks design.
+#
+#   python -m benchmarks.account_state_bench --accounts 1000000 --threads 4
+
+import argparse
+import json
+import random
+import threading
+import time
+import tracemalloc
+
+from concurrency.account_state import AccountState
+
+
+class DictOfLocksState:
+    """
+    The previous AccountState: one threading.Lock per key, created on first write.
+    """
+
+    def __init__(self):
+        self.state_store = {}
+        self.locks = {}
+
+    def ensure_lock_exists(self, key):
+        if key not in self.locks:
+            self.locks[key] = threading.Lock()
+
+    def read(self, key):
+        return self.state_store.get(key, 0)
+
+    def write(self, key, value):
+        self.ensure_lock_exists(key)
+        with self.locks[key]:
+            self.state_store[key] = value
+
+
+def measure_memory(factory, keys):
+    tracemalloc.start()
+    state = factory()
+    for i, key in enumerate(keys):
+        state.write(key, i)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # NumPy buffers are traced too, so `current` covers the arrays as well
+    return current, state
+
+
+def measure_throughput(state, keys, threads, ops_per_thread, read_ratio):
+    def worker(seed):
+        rnd = random.Random(seed)
+        picks = [rnd.choice(keys) for _ in range(1024)]
+        reads = [rnd.random() < read_ratio for _ in range(1024)]
+        for i in range(ops_per_thread):
+            key = picks[i & 1023]
+            if reads[i & 1023]:
+                state.read(key)
+            else:
+                state.write(key, i)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    return threads * ops_per_thread / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AccountState memory and throughput benchmark")
+    parser.add_argument("--accounts", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=200_000, help="operations per thread")
+    parser.add_argument("--read-ratio", type=float, default=0.8)
+    args = parser.parse_args()
+
+    keys = [f"BAL_{i}" for i in range(args.accounts)]
+    report = {"accounts": args.accounts, "threads": args.threads, "read_ratio": args.read_ratio}
+    for name, factory in (("dict_of_locks", DictOfLocksState), ("striped_array", AccountState)):
+        mem, state = measure_memory(factory, keys)
+        ops = measure_throughput(state, keys, args.threads, args.ops, args.read_ratio)
+        report[name] = {
+            "bytes": mem,
+            "bytes_per_account": round(mem / args.accounts, 1),
+            "ops_per_s": round(ops),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
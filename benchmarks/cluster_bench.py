@@ -0,0 +1,49 @@
+# benchmarks/cluster_bench.py
+#
+# Cluster scaling: the same synthetic workload through simulated clusters of
+# growing size (cluster/simulator.py), reporting cluster TPS, time to finality and
+# bytes sent per node for each. Each size runs in a fresh process. All nodes of a
+# cluster share this host's CPUs and every node executes every block, so TPS falls
+# with N by construction; finality and bytes per node are the scaling signals.
+#
+#   python -m benchmarks.cluster_bench --nodes 4,8,16,32,64 --txs 10000 --loss 0.01 --out cluster.json
+
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from cluster.simulator import add_arguments, run_cluster
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated cluster scaling benchmark")
+    parser.add_argument("--nodes", default="4,8,16,32,64")
+    add_arguments(parser)
+    parser.add_argument("--inline", action="store_true", help="run every size in this process")
+    parser.add_argument("--out", default=None, help="also write the JSON report to this file")
+    parser.set_defaults(txs=10_000)
+    args = parser.parse_args()
+
+    results = []
+    for n in (int(s) for s in args.nodes.split(",")):
+        if args.inline:
+            report = run_cluster(n, args)
+        else:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                report = pool.submit(run_cluster, n, args).result()
+        results.append({key: report[key] for key in (
+            "nodes", "complete", "consistent", "tps", "finality_ms", "bytes_sent_per_node",
+            "bytes_per_tx", "messages_per_node", "blocks", "slots", "wall_s", "cpu_s", "dropped")})
+
+    config = {key: value for key, value in vars(args).items() if key not in ("nodes", "inline", "out")}
+    text = json.dumps({"config": config, "cpus": os.cpu_count(), "results": results}, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/daqc_bench.py
+#
+# Erasure-coding throughput of the DAQC path: encode (Reed-Solomon parity + shard
+# Merkle root) and reconstruct with the maximum number of data shards lost.
+#
+#   python -m benchmarks.daqc_bench --sizes 1K,64K,1M,16M,64M -k 8 -m 4
+
+import argparse
+import json
+import os
+import time
+
+from concurrency.daqc import encode_batch, get_coder, reconstruct_batch
+
+_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    if text[-1] in _UNITS:
+        return int(text[:-1]) * _UNITS[text[-1]]
+    return int(text)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_size(size: int, k: int, m: int, budget_bytes: int) -> dict:
+    payload = os.urandom(size)
+    repeat = max(1, min(50, budget_bytes // max(size, 1)))
+    daqc = encode_batch([], k, m, payload=payload)
+    # Worst case for decoding: the first m data shards are gone
+    lost = set(range(min(m, k)))
+    survivors = {i: daqc.shards[i] for i in range(k + m) if i not in lost}
+    survivors = dict(list(survivors.items())[:k])
+    assert reconstruct_batch(survivors, k, m, daqc.length) == payload
+
+    encode_s = best_of(lambda: encode_batch([], k, m, payload=payload), repeat)
+    decode_s = best_of(lambda: reconstruct_batch(survivors, k, m, daqc.length), repeat)
+    return {
+        "bytes": size,
+        "shard_bytes": len(daqc.shards[0]),
+        "encode_ms": round(encode_s * 1e3, 3),
+        "encode_mb_s": round(size / encode_s / 1e6, 1),
+        "decode_ms": round(decode_s * 1e3, 3),
+        "decode_mb_s": round(size / decode_s / 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DAQC erasure-coding throughput benchmark")
+    parser.add_argument("--sizes", default="1K,16K,256K,4M,64M")
+    parser.add_argument("-k", type=int, default=8, help="data shards")
+    parser.add_argument("-m", type=int, default=4, help="parity shards")
+    parser.add_argument("--workers", type=int, default=None, help="pool size (default: CPU count)")
+    parser.add_argument("--budget", default="256M", help="approximate bytes processed per size")
+    args = parser.parse_args()
+
+    coder = get_coder(args.k, args.m)
+    if args.workers:
+        coder.max_workers = args.workers
+    results = [bench_size(parse_size(s), args.k, args.m, parse_size(args.budget))
+               for s in args.sizes.split(",")]
+    print(json.dumps({"k": args.k, "m": args.m, "workers": coder.max_workers, "results": results}, indent=2))
+    coder.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# benchmarks/e2e_bench.py
+#
+# End-to-end block production on a synthetic workload (samples/workload.py) at
+# increasing block sizes: DAQC per proposer batch, PoH, execution in the
+# ConcurrencyEngine, state commitment, BlockBuilder/TowerBFT finality and the
+# AINodeAggregator (scoring through an in-process stub LLM), then one synergy
+# payout. Each scale runs in a fresh process, so peak RSS is per scale. Output is
+# JSON, meant to be diffed run to run.
+#
+#   python -m benchmarks.e2e_bench --block-sizes 100,1000,10000 --blocks 20 --zipf 1.1 --out e2e.json
+#
+# --metrics turns on the metrics registry and adds its JSON dump to each scale, to
+# see the instrumentation's overhead against a run without it.
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# The aggregator module builds an OpenAI client on import; the stub replaces it
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+from aggregator.synergy_ai import AINodeAggregator
+from concurrency.account_state import AccountState
+from concurrency.concurrency_engine import ConcurrencyEngine
+from concurrency.daqc import compute_daqc
+from concurrency.state_commitment import StateCommitment
+from consensus.block_builder import BlockBuilder
+from consensus.poh import PoHGenerator
+from consensus.poh_service import PoHService
+from consensus.tower_bft import TowerBFT
+from escrow.escrow_manager import EscrowManager
+from metrics.registry import METRICS
+from samples import workload
+from samples.stub_llm_server import StubLLMClient
+
+STAGES = ("daqc", "poh", "execute", "commit", "finality", "aggregator")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def percentiles(values) -> dict:
+    a = np.asarray(values) * 1e3
+    return {"mean": round(float(a.mean()), 3), "p50": round(float(np.percentile(a, 50)), 3),
+            "p99": round(float(np.percentile(a, 99)), 3), "max": round(float(a.max()), 3)}
+
+
+def run_scale(config: dict, block_size: int, blocks: int, batches: int, poh_kind: str,
+              metrics: bool = False) -> dict:
+    METRICS.reset()
+    METRICS.enable(metrics)
+    cfg = workload.WorkloadConfig(**dict(config, txs=block_size * blocks))
+    started = time.perf_counter()
+    block_stream = list(workload.blocks(cfg, block_size, batches))
+    generate_s = time.perf_counter() - started
+
+    state = AccountState()
+    EscrowManager(state)
+    engine = ConcurrencyEngine(state)
+    commitment = StateCommitment()
+    commitment.commit(state, state.keys())
+    poh = PoHService().start() if poh_kind == "service" else PoHGenerator()
+    builder = BlockBuilder(poh, TowerBFT())
+    llm = StubLLMClient()
+    aggregator = AINodeAggregator(workload.node_profiles(cfg.nodes), monthly_cycle=0.0, llm_client=llm)
+    node_ids = sorted(aggregator.node_profiles)
+
+    stage_s = {s: 0.0 for s in STAGES}
+    latencies, waves, finalized = [], [], 0
+    wall_started = time.perf_counter()
+    for b, batches_of_block in enumerate(block_stream):
+        t0 = time.perf_counter()
+        daqcs = [compute_daqc(batch) for batch in batches_of_block]
+        t1 = time.perf_counter()
+        poh.record_event(b"".join(daqcs))
+        t2 = time.perf_counter()
+        txs = [tx for batch in batches_of_block for tx in batch]
+        engine.execute_block_of_transactions(txs)
+        t3 = time.perf_counter()
+        root = commitment.commit(state, engine.last_dirty_keys)
+        t4 = time.perf_counter()
+        block = builder.build_block(daqcs, state_root=root)
+        finalized += bool(builder.finalize_block(block))
+        t5 = time.perf_counter()
+        proposers = [node_ids[(b * batches + i) % len(node_ids)] for i in range(len(batches_of_block))]
+        aggregator.process_final_block(block, {n: 5 for n in proposers}, [tx.memo for tx in txs])
+        t6 = time.perf_counter()
+        for stage, dt in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5)):
+            stage_s[stage] += dt
+        latencies.append(t6 - t0)
+        waves.append(engine.last_report.get("waves", 0))
+    wall = time.perf_counter() - wall_started
+
+    started = time.perf_counter()
+    payout = aggregator.maybe_run_monthly()
+    credited = 0
+    if payout is not None:
+        if payout.confirm_debit(engine.execute_block_of_transactions([payout.debit_tx()])):
+            for credits in payout.credit_blocks():
+                engine.execute_block_of_transactions(credits)
+                credited += len(credits)
+    payout_s = time.perf_counter() - started
+
+    if poh_kind == "service":
+        poh.stop()
+    engine.shutdown()
+    txs_total = sum(len(batch) for blk in block_stream for batch in blk)
+    report = {
+        "block_size": block_size,
+        "blocks": len(block_stream),
+        "txs": txs_total,
+        "tps": round(txs_total / wall),
+        "block_latency_ms": percentiles(latencies),
+        "stage_ms_per_block": {s: round(v / len(block_stream) * 1e3, 3) for s, v in stage_s.items()},
+        "waves_mean": round(float(np.mean(waves)), 2),
+        "finalized": finalized,
+        "llm_calls": llm.requests,
+        "payout_credits": credited,
+        "payout_ms": round(payout_s * 1e3, 3),
+        "generate_s": round(generate_s, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if metrics:
+        report["metrics"] = METRICS.to_json()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end block production benchmark")
+    parser.add_argument("--block-sizes", default="100,1000,10000")
+    parser.add_argument("--blocks", type=int, default=20)
+    parser.add_argument("--batches", type=int, default=2, help="proposer batches per block")
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--zipf", type=float, default=1.0)
+    parser.add_argument("--reads", type=int, default=1)
+    parser.add_argument("--writes", type=int, default=2)
+    parser.add_argument("--conflict-ratio", type=float, default=0.05)
+    parser.add_argument("--hot-keys", type=int, default=8)
+    parser.add_argument("--memo-min", type=int, default=16)
+    parser.add_argument("--memo-max", type=int, default=64)
+    parser.add_argument("--fee-dist", default="lognormal", choices=workload.FEE_DISTRIBUTIONS)
+    parser.add_argument("--nodes", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--poh", default="service", choices=("service", "generator"),
+                        help="PoHService thread or the plain PoHGenerator")
+    parser.add_argument("--inline", action="store_true",
+                        help="run every scale in this process (peak RSS is then cumulative)")
+    parser.add_argument("--metrics", action="store_true", help="collect and report metrics")
+    parser.add_argument("--out", default=None, help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    config = workload.WorkloadConfig(
+        accounts=args.accounts, zipf_s=args.zipf, reads=args.reads, writes=args.writes,
+        conflict_ratio=args.conflict_ratio, hot_keys=args.hot_keys, memo_min=args.memo_min,
+        memo_max=args.memo_max, fee_dist=args.fee_dist, nodes=args.nodes, seed=args.seed,
+    ).to_dict()
+    config.pop("txs")
+    sizes = [int(s) for s in args.block_sizes.split(",")]
+
+    results = []
+    for size in sizes:
+        if args.inline:
+            results.append(run_scale(config, size, args.blocks, args.batches, args.poh, args.metrics))
+        else:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results.append(pool.submit(run_scale, config, size, args.blocks, args.batches, args.poh,
+                                           args.metrics).result())
+
+    report = {"workload": config, "blocks_per_scale": args.blocks, "batches_per_block": args.batches,
+              "poh": args.poh, "metrics": args.metrics, "cpus": os.cpu_count(), "results": results}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
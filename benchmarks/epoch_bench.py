@@ -0,0 +1,57 @@
+# benchmarks/epoch_bench.py
+#
+# EpochManager: time to compute one epoch's stake-balanced clan assignment, and
+# node -> clan / clan -> members lookup cost, for growing node counts.
+#
+#   python -m benchmarks.epoch_bench --nodes 1000,10000,100000 --clan-size 16
+
+import argparse
+import hashlib
+import json
+import random
+import time
+
+from concurrency.epoch_manager import EpochManager
+
+
+def bench(count: int, clan_size: int, epochs: int, lookups: int) -> dict:
+    rng = random.Random(count)
+    nodes = [f"node{i}" for i in range(count)]
+    stakes = {n: rng.randint(1, 1_000_000) for n in nodes}
+    manager = EpochManager(nodes, stakes)
+    assign_s = []
+    for epoch in range(epochs):
+        manager.start_new_epoch(clan_size, poh_hash=hashlib.sha256(str(epoch).encode()).digest())
+        started = time.perf_counter()
+        assignment = manager.assignment()
+        assign_s.append(time.perf_counter() - started)
+
+    probes = [rng.choice(nodes) for _ in range(lookups)]
+    started = time.perf_counter()
+    clans = [assignment.clan_of_node(n) for n in probes]
+    node_ns = (time.perf_counter() - started) / lookups * 1e9
+    started = time.perf_counter()
+    for c in clans:
+        assignment.members_of(c)
+    members_ns = (time.perf_counter() - started) / lookups * 1e9
+
+    sizes, clan_stake = assignment.clan_sizes(), assignment.clan_stake
+    return {"nodes": count, "clans": len(assignment), "assign_ms": round(min(assign_s) * 1e3, 2),
+            "clan_of_ns": round(node_ns), "members_of_ns": round(members_ns),
+            "size_range": [int(sizes.min()), int(sizes.max())],
+            "stake_spread": round(float(clan_stake.max() / clan_stake.mean() - 1), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Epoch clan assignment benchmark")
+    parser.add_argument("--nodes", default="1000,10000,100000")
+    parser.add_argument("--clan-size", type=int, default=16)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+    results = [bench(int(n), args.clan_size, args.epochs, args.lookups) for n in args.nodes.split(",")]
+    print(json.dumps({"clan_size": args.clan_size, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
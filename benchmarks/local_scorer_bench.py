@@ -0,0 +1,60 @@
+# benchmarks/local_scorer_bench.py
+#
+# Time for LocalSynergyScorer to compile node profiles, order a bucket of memos for
+# one node (full sort and top-K), and score the bucket against every node.
+#
+#   python -m benchmarks.local_scorer_bench --memos 100000 --nodes 1000 --top-k 1000
+
+import argparse
+import json
+import random
+import time
+
+from aggregator.local_scorer import LocalSynergyScorer
+
+TOPICS = ["defi", "nft", "gaming", "bridging", "lending", "oracle", "staking", "dao", "privacy",
+          "payments", "identity", "storage", "compute", "ai", "insurance", "derivatives"]
+FILLER = ["transfer", "user", "swap", "mint", "deposit", "for", "with", "the", "to", "from", "pool"]
+
+
+def make_profiles(count: int, rng: random.Random):
+    return {f"Node{i}": "Focus: " + ", ".join(rng.sample(TOPICS, 3)) + f" team{i % 50}" for i in range(count)}
+
+
+def make_memos(count: int, rng: random.Random):
+    return [" ".join(rng.sample(FILLER, 4) + rng.sample(TOPICS, 2) + [f"user{rng.randrange(10_000)}"])
+            for _ in range(count)]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - started) * 1e3, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local synergy scorer benchmark")
+    parser.add_argument("--memos", type=int, default=100_000)
+    parser.add_argument("--nodes", type=int, default=1_000)
+    parser.add_argument("--top-k", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    profiles = make_profiles(args.nodes, rng)
+    memos = make_memos(args.memos, rng)
+
+    scorer, compile_ms = timed(lambda: LocalSynergyScorer(profiles))
+    _, matrix_ms = timed(lambda: scorer.memo_matrix(memos))
+    _, order_ms = timed(lambda: scorer.rank(memos, "Node0"))
+    _, top_k_ms = timed(lambda: scorer.rank(memos, "Node0", args.top_k))
+    scores, all_nodes_ms = timed(lambda: scorer.score_matrix(memos))
+    print(json.dumps({
+        "memos": args.memos, "nodes": args.nodes, "vocabulary": scorer.profiles.shape[1],
+        "compile_ms": compile_ms, "memo_matrix_ms": matrix_ms, "order_one_node_ms": order_ms,
+        "top_k_one_node_ms": top_k_ms, "score_all_nodes_ms": all_nodes_ms, "score_nnz": int(scores.nnz),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
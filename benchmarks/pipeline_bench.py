@@ -0,0 +1,119 @@
+# benchmarks/pipeline_bench.py
+#
+# Block production throughput: the same stream of blocks run stage after stage on one
+# thread (the old main.py flow) and through BlockPipeline, plus the pipeline's
+# per-stage occupancy and submit-to-executed latency. Both runs must reach the same
+# state root, and each pipelined block must carry the sequential root from
+# state_lag blocks earlier.
+#
+#   python -m benchmarks.pipeline_bench --blocks 200 --txs 2000 --queue-size 4
+
+import argparse
+import json
+import random
+import time
+
+from concurrency.account_state import AccountState
+from concurrency.concurrency_engine import ConcurrencyEngine
+from concurrency.daqc import compute_daqc
+from concurrency.ops import Transfer
+from concurrency.state_commitment import StateCommitment
+from concurrency.transaction import Transaction
+from consensus.block_builder import BlockBuilder
+from consensus.block_pipeline import BlockPipeline
+from consensus.poh_service import PoHService
+from consensus.tower_bft import TowerBFT
+
+
+def make_blocks(blocks: int, txs: int, accounts: int, seed: int = 0):
+    rng = random.Random(seed)
+    out = []
+    for b in range(blocks):
+        batch = []
+        for i in range(txs):
+            src, dst = rng.sample(range(accounts), 2)
+            batch.append(Transaction.from_ops(f"b{b}-t{i}", [Transfer(f"acct{src}", f"acct{dst}", 1)]))
+        half = len(batch) // 2
+        out.append([batch[:half], batch[half:]])
+    return out
+
+
+def fresh_node(accounts: int):
+    state = AccountState()
+    for i in range(accounts):
+        state.write(f"acct{i}", 1_000_000)
+    commitment = StateCommitment()
+    commitment.commit(state, state.keys())
+    poh = PoHService().start()
+    return state, ConcurrencyEngine(state), commitment, poh, BlockBuilder(poh, TowerBFT())
+
+
+def run_sequential(blocks, accounts: int) -> dict:
+    state, engine, commitment, poh, builder = fresh_node(accounts)
+    roots = [commitment.root]  # roots[i]: after the first i blocks
+    started = time.perf_counter()
+    for batches in blocks:
+        daqcs = [compute_daqc(batch) for batch in batches]
+        poh.record_event(b"".join(daqcs))
+        engine.execute_block_of_transactions([tx for batch in batches for tx in batch])
+        root = commitment.commit(state, engine.last_dirty_keys)
+        builder.finalize_block(builder.build_block(daqcs, state_root=root))
+        roots.append(root)
+    elapsed = time.perf_counter() - started
+    poh.stop()
+    engine.shutdown()
+    return {"blocks_per_s": round(len(blocks) / elapsed, 2), "root": commitment.root.hex(), "roots": roots}
+
+
+def run_pipelined(blocks, accounts: int, queue_size: int) -> dict:
+    state, engine, commitment, poh, builder = fresh_node(accounts)
+    block_roots = {}
+
+    def on_executed(job):
+        block_roots[job.seq] = job.block.state_root
+
+    pipeline = BlockPipeline(builder, engine, commitment, on_executed=on_executed,
+                             queue_size=queue_size).start()
+    started = time.perf_counter()
+    for batches in blocks:
+        pipeline.submit(batches)
+    pipeline.drain()
+    elapsed = time.perf_counter() - started
+    pipeline.close()
+    poh.stop()
+    engine.shutdown()
+    report = pipeline.report()
+    report["blocks_per_s"] = round(len(blocks) / elapsed, 2)
+    report["root"] = commitment.root.hex()
+    report["block_roots"] = [block_roots.get(seq) for seq in range(len(blocks))]
+    report["state_lag"] = pipeline.state_lag
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipelined block production benchmark")
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--txs", type=int, default=2000, help="transactions per block")
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--queue-size", type=int, default=4)
+    args = parser.parse_args()
+
+    blocks = make_blocks(args.blocks, args.txs, args.accounts)
+    sequential = run_sequential(blocks, args.accounts)
+    pipelined = run_pipelined(blocks, args.accounts, args.queue_size)
+    if sequential["root"] != pipelined["root"]:
+        raise RuntimeError("pipelined and sequential runs reached different state roots")
+    lag = pipelined["state_lag"]
+    for seq, root in enumerate(pipelined["block_roots"]):
+        if root != sequential["roots"][max(0, seq + 1 - lag)]:
+            raise RuntimeError(f"pipelined block {seq} carries a state root from the wrong block")
+    print(json.dumps({
+        "sequential_blocks_per_s": sequential["blocks_per_s"],
+        "pipelined_blocks_per_s": pipelined["blocks_per_s"],
+        "speedup": round(pipelined["blocks_per_s"] / sequential["blocks_per_s"], 2),
+        "pipeline": {k: v for k, v in pipelined.items() if k not in ("root", "block_roots")},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/poh_bench.py
+#
+# Proof of History hashes per second: generation on the PoH thread (unpaced) and
+# checkpoint-parallel verification with increasing process-pool sizes.
+#
+#   python -m benchmarks.poh_bench --seconds 3 --workers 1,2,4,8
+
+import argparse
+import json
+import os
+import time
+
+from consensus.poh_service import PoHService, PoHVerifier
+
+
+def bench_generation(seconds: float, hashes_per_tick: int, checkpoint_ticks: int):
+    service = PoHService(hashes_per_tick=hashes_per_tick, tick_rate=None,
+                         checkpoint_ticks=checkpoint_ticks)
+    service.start()
+    time.sleep(seconds / 2)
+    # One mixed-in event, so verification below also covers the mix path
+    service.record_event(b"poh_bench")
+    time.sleep(seconds / 2)
+    service.stop()
+    if service.height <= service.hashes_per_tick * service.checkpoint_ticks:
+        raise RuntimeError(f"PoH height stalled at {service.height}")
+    elapsed = time.perf_counter() - service.started_at
+    return service, service.height / elapsed
+
+
+def bench_verification(service: PoHService, workers: int) -> float:
+    # Only whole checkpoint segments, so every run verifies the same hashes
+    last = service.checkpoints()[-1]
+    start, entries = service.entries_between(0, last.height)
+    with PoHVerifier(max_workers=workers) as verifier:
+        verifier.verify(start, entries[:1])  # start the pool outside the timing
+        started = time.perf_counter()
+        ok = verifier.verify(start, entries)
+        elapsed = time.perf_counter() - started
+    if not ok:
+        raise RuntimeError("PoH sequence failed verification")
+    return last.height / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PoH generation / verification benchmark")
+    parser.add_argument("--seconds", type=float, default=3.0, help="how long to generate")
+    parser.add_argument("--hashes-per-tick", type=int, default=1000)
+    parser.add_argument("--checkpoint-ticks", type=int, default=16)
+    parser.add_argument("--workers", default=None,
+                        help="comma-separated pool sizes (default: 1, 2, 4, ... up to CPU count)")
+    args = parser.parse_args()
+
+    if args.workers:
+        pools = [int(w) for w in args.workers.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        pools = sorted({1, cpus} | {1 << i for i in range(cpus.bit_length()) if 1 << i <= cpus})
+
+    service, gen_rate = bench_generation(args.seconds, args.hashes_per_tick, args.checkpoint_ticks)
+    verify = {}
+    for workers in pools:
+        verify[workers] = bench_verification(service, workers)
+    base = verify[pools[0]]
+    print(json.dumps({
+        "hashes": service.height,
+        "checkpoints": len(service.checkpoints()),
+        "generation_hashes_per_s": round(gen_rate),
+        "verification": [
+            {"workers": w, "hashes_per_s": round(rate), "speedup": round(rate / base, 2)}
+            for w, rate in verify.items()
+        ],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
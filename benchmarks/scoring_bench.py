@@ -0,0 +1,134 @@
+# benchmarks/scoring_bench.py
+#
+# ScoringService against the stub chat completions server (samples/stub_llm_server.py)
+# over real HTTP, with injected latency and 500s. For each run it checks that every
+# block's synergy is applied exactly once, that flush() only returns once nothing is
+# pending, and (when no prompt fell back to local scoring) that the totals match
+# scoring the blocks one by one on the synchronous path. Also covers resubmitted
+# blocks being ignored, calls that time out, and stop() with calls still in flight.
+#
+#   python -m benchmarks.scoring_bench --blocks 200 --latency 0.05 --fail-rate 0.2
+
+import argparse
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from aggregator.scoring_service import ScoringService
+from aggregator.synergy_ai import AINodeAggregator
+from benchmarks.local_scorer_bench import make_memos, make_profiles
+from samples.stub_llm_server import StubLLMClient, StubLLMServer
+
+
+def make_blocks(count: int, nodes: int, rng: random.Random):
+    blocks = []
+    for block_id in range(count):
+        activity = {f"Node{i}": 1.0 for i in rng.sample(range(nodes), min(nodes, 3))}
+        blocks.append((block_id, activity, make_memos(rng.randrange(0, 8), rng)))
+    return blocks
+
+
+def async_client(server: StubLLMServer):
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(base_url=server.base_url, api_key="stub", max_retries=0)
+
+
+def rounded(scores):
+    return {n: round(v, 6) for n, v in sorted(scores.items())}
+
+
+def sync_totals(profiles, blocks):
+    agg = AINodeAggregator(profiles, llm_client=StubLLMClient())
+    for block_id, activity, memos in blocks:
+        agg.process_final_block(SimpleNamespace(block_id=block_id), activity, memos)
+    return rounded(agg.node_scores)
+
+
+def run_service(profiles, blocks, server: StubLLMServer, **options):
+    agg = AINodeAggregator(profiles)
+    service = agg.use_scoring_service(ScoringService(agg, client=async_client(server), **options)).start()
+    started = time.perf_counter()
+    for block_id, activity, memos in blocks:
+        agg.process_final_block(SimpleNamespace(block_id=block_id), activity, memos)
+    submit_ms = (time.perf_counter() - started) * 1e3
+    pending_after_submit = service.pending()
+    flushed = service.flush(60)
+    flush_ms = (time.perf_counter() - started) * 1e3
+
+    # flush() returned only once everything was applied, each block exactly once
+    assert flushed and service.pending() == 0, "flush returned with blocks pending"
+    assert service.stats["applied"] == service.stats["submitted"] == len(blocks), service.stats
+    assert len(agg._applied_blocks) == len(blocks), "a block was applied more than once or not at all"
+
+    # Resubmitted blocks (a retried result, a replayed block) change nothing
+    totals = rounded(agg.node_scores)
+    for block_id, activity, memos in blocks[: len(blocks) // 4]:
+        service.submit(block_id, activity, memos)
+    assert service.flush(60) and rounded(agg.node_scores) == totals, "a resubmitted block was applied twice"
+
+    stopped = service.stop(10)
+    return agg, service, totals, {
+        "submit_ms": round(submit_ms, 1), "flush_ms": round(flush_ms, 1),
+        "pending_after_submit": pending_after_submit, "stopped_clean": stopped,
+        **{k: v for k, v in service.stats.items() if k != "submitted"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ScoringService against the stub LLM server")
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--nodes", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the stub adds to every request")
+    parser.add_argument("--fail-rate", type=float, default=0.2, help="fraction of requests the stub fails")
+    parser.add_argument("--max-inflight", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    profiles = make_profiles(args.nodes, rng)
+    blocks = make_blocks(args.blocks, args.nodes, rng)
+    expected = sync_totals(profiles, blocks)
+    report = {"blocks": args.blocks, "latency": args.latency, "fail_rate": args.fail_rate, "runs": {}}
+
+    # Retries with backoff, with and without coalescing
+    for per_prompt in (1, 8):
+        with StubLLMServer(latency=args.latency, fail_rate=args.fail_rate, seed=args.seed) as server:
+            _, service, totals, result = run_service(
+                profiles, blocks, server, max_inflight=args.max_inflight, max_blocks_per_prompt=per_prompt,
+                retries=args.retries, backoff=0.01, backoff_max=0.1, timeout=10.0)
+            if service.stats["failed_prompts"] == 0:
+                assert totals == expected, f"max_blocks_per_prompt={per_prompt}: totals differ from one-by-one"
+            result["matches_sync"] = totals == expected
+            result["http_requests"] = server.requests
+            report["runs"][f"max_blocks_per_prompt={per_prompt}"] = result
+
+    # Every call times out: blocks fall back to local scoring, and are still applied once
+    with StubLLMServer(latency=0.5) as server:
+        _, service, _, result = run_service(profiles, blocks[:20], server, max_inflight=args.max_inflight,
+                                            retries=1, backoff=0.01, timeout=0.1)
+        assert service.stats["failed_prompts"] == service.stats["prompts"] > 0, service.stats
+        report["runs"]["timeouts"] = result
+
+    # stop() with calls still in flight returns within its timeout
+    with StubLLMServer(latency=5.0) as server:
+        agg = AINodeAggregator(profiles)
+        service = ScoringService(agg, client=async_client(server), timeout=30.0).start()
+        for block_id, activity, memos in blocks[:10]:
+            service.submit(block_id, activity, memos or ["defi"])
+        started = time.perf_counter()
+        drained = service.stop(timeout=0.2)
+        stop_ms = (time.perf_counter() - started) * 1e3
+        assert not drained and stop_ms < 2000, stop_ms
+        report["runs"]["stop_in_flight"] = {"drained": drained, "stop_ms": round(stop_ms, 1)}
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
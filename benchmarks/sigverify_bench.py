@@ -0,0 +1,68 @@
+# benchmarks/sigverify_bench.py
+#
+# Ed25519 signature verification throughput of SigVerifier for increasing process
+# pool sizes, plus a re-run of the same transactions served from the LRU cache.
+#
+#   python -m benchmarks.sigverify_bench --txs 50000 --workers 1,2,4,8
+
+import argparse
+import json
+import os
+import time
+
+from concurrency.ops import Transfer
+from concurrency.signatures import generate_keypair
+from concurrency.sigverify import SigVerifier
+from concurrency.transaction import Transaction
+
+
+def make_signed(count: int, signers: int):
+    keys = [generate_keypair()[0] for _ in range(signers)]
+    return [
+        Transaction.from_ops(f"tx{i}", [Transfer(f"acct{i % 1000}", f"acct{(i * 7) % 1000}", 1)],
+                             fee=0.01).sign(keys[i % signers])
+        for i in range(count)
+    ]
+
+
+def bench(txs, workers: int, batch_size: int) -> dict:
+    with SigVerifier(max_workers=workers, batch_size=batch_size) as verifier:
+        verifier.filter(txs[:batch_size * max(1, workers)])  # start the pool outside the timing
+        verifier.clear_cache()
+        started = time.perf_counter()
+        result = verifier.filter(txs)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        cached = verifier.filter(txs)
+        warm = time.perf_counter() - started
+    if len(result.valid) != len(txs) or cached.cache_hits != len(txs):
+        raise RuntimeError("signature verification failed")
+    return {"workers": workers, "verifies_per_s": round(len(txs) / cold),
+            "cached_per_s": round(len(txs) / warm)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch signature verification benchmark")
+    parser.add_argument("--txs", type=int, default=50_000)
+    parser.add_argument("--signers", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", default=None,
+                        help="comma-separated pool sizes (default: 1, 2, 4, ... up to CPU count)")
+    args = parser.parse_args()
+
+    if args.workers:
+        pools = [int(w) for w in args.workers.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        pools = sorted({1, cpus} | {1 << i for i in range(cpus.bit_length()) if 1 << i <= cpus})
+
+    txs = make_signed(args.txs, args.signers)
+    results = [bench(txs, workers, args.batch_size) for workers in pools]
+    base = results[0]["verifies_per_s"]
+    for r in results:
+        r["speedup"] = round(r["verifies_per_s"] / base, 2)
+    print(json.dumps({"txs": args.txs, "cpus": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
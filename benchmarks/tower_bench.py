@@ -0,0 +1,61 @@
+# benchmarks/tower_bench.py
+#
+# Tower BFT vote ingestion: votes per second and traced memory across a long run,
+# for growing validator counts. Cost per vote and steady-state memory should both
+# stay flat.
+#
+#   python -m benchmarks.tower_bench --validators 100,1000,5000 --slots 400
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from consensus.block import Block
+from consensus.tower_bft import TowerBFT
+
+
+def run(validators: int, slots: int, depth: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    stakes = {f"v{i}": rng.randint(1, 1000) for i in range(validators)}
+    names = list(stakes)
+    tower = TowerBFT(stakes, local_validator=names[0], confirmation_depth=depth, retain_finalized=64)
+    tracemalloc.start()
+    samples = []
+    votes = 0
+    started = time.perf_counter()
+    for slot in range(slots):
+        tower.add_block(Block(slot, b"", [], slot - 1, {}))
+        # Every validator votes each slot, in a shuffled batch, ~2% of them late by a slot
+        batch = [(v, slot) for v in names if rng.random() > 0.02]
+        rng.shuffle(batch)
+        tower.ingest_votes(batch)
+        votes += len(batch)
+        if slot % max(1, slots // 8) == 0:
+            samples.append(tracemalloc.get_traced_memory()[0])
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    return {
+        "validators": validators,
+        "slots": slots,
+        "votes": votes,
+        "votes_per_s": round(votes / elapsed),
+        "us_per_vote": round(elapsed / votes * 1e6, 2),
+        "root": tower.root,
+        "traced_bytes_over_run": samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tower BFT vote ingestion benchmark")
+    parser.add_argument("--validators", default="100,1000,5000")
+    parser.add_argument("--slots", type=int, default=400)
+    parser.add_argument("--confirmation-depth", type=int, default=2)
+    args = parser.parse_args()
+    results = [run(int(n), args.slots, args.confirmation_depth) for n in args.validators.split(",")]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+# cluster/node.py
+
+import asyncio
+import hashlib
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from concurrency.account_state import AccountState
+from concurrency.batch_proposer import BatchProposer
+from concurrency.concurrency_engine import ConcurrencyEngine
+from concurrency.daqc import DATA_SHARDS, PARITY_SHARDS, encode_batch, reconstruct_transactions, verify_shard
+from consensus.block import Block
+from consensus.poh import PoHGenerator
+from consensus.tower_bft import TowerBFT
+
+# Modeled wire sizes: a framing header per message, 64-byte signatures on votes and
+# proposals
+HEADER_BYTES = 16
+SIGNATURE_BYTES = 64
+
+
+# --- messages -------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class BatchRef:
+    """
+    What a block says about one certified batch: its DAQC and who proposed it.
+    """
+    certificate: bytes
+    k: int
+    m: int
+    length: int
+    shard_root: bytes
+    origin: str
+
+    WIRE_BYTES = 32 + 2 + 2 + 8 + 32 + 4
+
+
+@dataclass(frozen=True)
+class ShardMsg:
+    """
+    One erasure-coded shard with its Merkle proof. relay=True marks the copy the
+    proposer sends to the shard's custodian, which forwards it to everyone else.
+    """
+    ref: BatchRef
+    index: int
+    data: memoryview
+    proof: Tuple[bytes, ...]
+    relay: bool
+
+    def wire_size(self) -> int:
+        return HEADER_BYTES + BatchRef.WIRE_BYTES + 2 + len(self.data) + 32 * len(self.proof)
+
+
+@dataclass(frozen=True)
+class ProposalMsg:
+    slot: int
+    parent: int
+    leader: str
+    poh_ref: bytes
+    refs: Tuple[BatchRef, ...]
+    proposed_at: float  # loop time; the simulated cluster shares one clock
+
+    def wire_size(self) -> int:
+        return HEADER_BYTES + 8 + 8 + 4 + 32 + SIGNATURE_BYTES + BatchRef.WIRE_BYTES * len(self.refs)
+
+
+@dataclass(frozen=True)
+class VoteMsg:
+    validator: str
+    slot: int
+
+    WIRE_BYTES = HEADER_BYTES + 4 + 8 + SIGNATURE_BYTES
+
+    def wire_size(self) -> int:
+        return self.WIRE_BYTES
+
+
+@dataclass(frozen=True)
+class RepairShardsMsg:
+    certificate: bytes
+    requester: str
+    have: Tuple[int, ...]
+
+    def wire_size(self) -> int:
+        return HEADER_BYTES + 32 + 4 + 2 * len(self.have)
+
+
+@dataclass(frozen=True)
+class RepairBlockMsg:
+    slot: int
+    requester: str
+
+    def wire_size(self) -> int:
+        return HEADER_BYTES + 8 + 4
+
+
+@dataclass(frozen=True)
+class RepairVotesMsg:
+    requester: str
+
+    def wire_size(self) -> int:
+        return HEADER_BYTES + 4
+
+
+@dataclass(frozen=True)
+class VoteBundleMsg:
+    """
+    The latest vote of every validator, as the sender's towers hold them (each
+    still carrying its signature).
+    """
+    votes: Tuple[Tuple[str, int], ...]
+
+    def wire_size(self) -> int:
+        return HEADER_BYTES + len(self.votes) * (VoteMsg.WIRE_BYTES - HEADER_BYTES)
+
+
+@dataclass(frozen=True)
+class SlotTick:
+    """
+    The start of a slot, queued in the node's inbox (not sent over the network) so
+    it is handled after every message that arrived before it.
+    """
+    slot: int
+    leader: bool
+    proposer: bool
+
+
+# --- node -----------------------------------------------------------------------
+
+class ClusterNode:
+    """
+    One validator of a simulated cluster, with its own AccountState,
+    ConcurrencyEngine, PoHGenerator, TowerBFT and BatchProposer. run() is its
+    message loop; the Cluster starts each slot with tick():
+
+      - proposing: in the slots it is a proposer, the node forms a batch from its
+        bucket and erasure-codes it (encode_batch); shard i goes to custodian
+        peers[(index + 1 + i) % N], which verifies it and relays it to every other
+        node. A node holding k verified shards of a batch reconstructs it
+      - leading: the slot's leader proposes a block over the batches it holds that
+        are not yet on its chain, mixing their certificates into its PoH
+      - fork choice: among blocks extending the finalized tip, the heaviest fork
+        by the stake of validators' latest votes (_fork_choice). Leaders build on
+        its head -- with an empty block if they have no batches and the head has
+        stayed unfinalized -- and skip their slot while a block's ancestry is missing
+      - voting: a node votes on a proposal on that fork once it holds every batch
+        the block references, so a finalized block was available to 2/3 of the stake
+      - executing: finalized blocks run on the node's engine in chain order
+      - repair: missing proposals and shards are requested from the slot's leader
+        and the batch's proposer; a node that knows of a slot newer than its
+        finalized tip asks a peer for the latest votes it holds
+
+    All nodes share one event loop (and so the host's CPUs); execution is inline.
+    """
+
+    def __init__(self, index: int, peers: List[str], transport, stakes: Dict[str, int],
+                 batch_txs: int = 1024, max_batches_per_block: int = 64,
+                 k: int = DATA_SHARDS, m: int = PARITY_SHARDS, repair_after: float = 0.2):
+        self.index = index
+        self.peers = peers
+        self.node_id = peers[index]
+        self.transport = transport
+        self.k = k
+        self.m = m
+        self.max_batches_per_block = max_batches_per_block
+        self.repair_after = repair_after
+        self.inbox = transport.register(self.node_id)
+
+        self.account_state = AccountState()
+        # Everything runs inline: the nodes already share the loop thread
+        self.engine = ConcurrencyEngine(self.account_state, max_workers=1, min_parallel_wave=sys.maxsize)
+        self.poh = PoHGenerator()
+        self.tower = TowerBFT(stakes, local_validator=self.node_id, confirmation_depth=1)
+        self.proposer = BatchProposer(self.node_id, max_batch_txs=batch_txs)
+
+        self.batches: Dict[bytes, object] = {}       # certificate -> TransactionBatch, until executed
+        self._shards: Dict[bytes, Dict[int, memoryview]] = {}
+        self._own: Dict[bytes, object] = {}          # certificate -> DAQC, kept to serve repairs
+        self._refs: Dict[bytes, BatchRef] = {}
+        self.proposals: Dict[int, ProposalMsg] = {}
+        self._unvoted: Dict[int, ProposalMsg] = {}
+        self._repairs: Dict[object, float] = {}      # what was last found missing or requested, when
+        self._block_asks: Dict[int, int] = {}
+        self.finalized_certs = set()
+        self.final_tip = -1
+        self._newest_seen = -1                       # newest slot proposed or voted on, as far as we know
+        self.executed_slot = -1
+        self.executed_txs = 0
+        self.finality_s: List[float] = []            # proposal -> finalized here, per block
+        self.last_executed_at = 0.0
+        self.stats = {"batches_proposed": 0, "blocks_proposed": 0, "votes_cast": 0, "bad_shards": 0,
+                      "reconstructed": 0, "repairs_sent": 0, "blocks_executed": 0}
+
+    @property
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def send(self, dst: str, message):
+        self.transport.send(self.node_id, dst, message)
+
+    # --- driving ------------------------------------------------------------------
+
+    async def run(self):
+        inbox = self.inbox
+        while True:
+            messages = [await inbox.get()]
+            while not inbox.empty():
+                messages.append(inbox.get_nowait())
+            votes = []
+            for msg in messages:
+                if msg is None:
+                    return
+                if isinstance(msg, VoteMsg):
+                    votes.append((msg.validator, msg.slot))
+                elif isinstance(msg, ShardMsg):
+                    self._on_shard(msg)
+                elif isinstance(msg, ProposalMsg):
+                    self._on_proposal(msg)
+                elif isinstance(msg, RepairShardsMsg):
+                    self._on_repair_shards(msg)
+                elif isinstance(msg, RepairBlockMsg):
+                    proposal = self.proposals.get(msg.slot)
+                    if proposal is not None:
+                        self.send(msg.requester, proposal)
+                elif isinstance(msg, VoteBundleMsg):
+                    votes.extend(msg.votes)
+                elif isinstance(msg, RepairVotesMsg):
+                    self.send(msg.requester, VoteBundleMsg(tuple(
+                        (v, tower[-1].slot) for v, tower in self.tower.towers.items() if tower)))
+                elif isinstance(msg, SlotTick):
+                    self._on_slot(msg)
+            # Votes of a whole drain go into the tower in one batch
+            if votes:
+                self._newest_seen = max(self._newest_seen, max(slot for _, slot in votes))
+                self._on_finalized(self.tower.ingest_votes(votes))
+            self._progress()
+
+    def tick(self, slot: int, leader: bool, proposer: bool):
+        self.inbox.put_nowait(SlotTick(slot, leader, proposer))
+
+    def _on_slot(self, tick: SlotTick):
+        if tick.proposer:
+            self._disperse()
+        if tick.leader:
+            self._propose(tick.slot)
+        # Something newer than the finalized tip exists, but its votes didn't all
+        # arrive: ask one peer (a different one each time) for the latest votes it has
+        head = self._newest_seen
+        if head > self.final_tip and self._due(("votes", head)):
+            n = len(self.peers)
+            self.send(self.peers[(self.index + 1 + self.stats["repairs_sent"] % (n - 1)) % n],
+                      RepairVotesMsg(self.node_id))
+
+    # --- batches ------------------------------------------------------------------
+
+    def _disperse(self):
+        txs = self.proposer.form_batch()
+        if not txs:
+            return
+        daqc = encode_batch(txs, self.k, self.m)
+        ref = BatchRef(daqc.certificate, daqc.k, daqc.m, daqc.length, daqc.shard_root, self.node_id)
+        cert = ref.certificate
+        self._own[cert] = daqc
+        self._refs[cert] = ref
+        self.batches[cert] = txs
+        self.stats["batches_proposed"] += 1
+        n = len(self.peers)
+        for i, shard in enumerate(daqc.shards):
+            custodian = self.peers[(self.index + 1 + i) % n]
+            self.send(custodian, ShardMsg(ref, i, shard, tuple(daqc.proof(i)), relay=True))
+
+    def _on_shard(self, msg: ShardMsg):
+        ref = msg.ref
+        if msg.relay:
+            relayed = ShardMsg(ref, msg.index, msg.data, msg.proof, relay=False)
+            for peer in self.peers:
+                if peer != self.node_id and peer != ref.origin:
+                    self.send(peer, relayed)
+        cert = ref.certificate
+        if cert in self.batches or cert in self.finalized_certs:
+            return
+        shards = self._shards.setdefault(cert, {})
+        if msg.index in shards:
+            return
+        if not verify_shard(cert, ref.k, ref.m, ref.length, ref.shard_root, msg.index, msg.data, list(msg.proof)):
+            self.stats["bad_shards"] += 1
+            return
+        self._refs[cert] = ref
+        shards[msg.index] = msg.data
+        if len(shards) >= ref.k:
+            self.batches[cert] = reconstruct_transactions(shards, ref.k, ref.m, ref.length)
+            del self._shards[cert]
+            self.stats["reconstructed"] += 1
+
+    def _on_repair_shards(self, msg: RepairShardsMsg):
+        daqc = self._own.get(msg.certificate)
+        if daqc is None:
+            return
+        ref = self._refs[msg.certificate]
+        missing = [i for i in range(daqc.k + daqc.m) if i not in msg.have]
+        for i in missing[:max(0, daqc.k - len(msg.have))]:
+            self.send(msg.requester, ShardMsg(ref, i, daqc.shards[i], tuple(daqc.proof(i)), relay=False))
+
+    def _batch_txs(self, cert: bytes) -> list:
+        batch = self.batches[cert]
+        return batch if isinstance(batch, list) else batch.transactions()
+
+    # --- blocks -------------------------------------------------------------------
+
+    def _chain_certs(self, head: int) -> Optional[set]:
+        # Certificates on the chain ending at head that haven't been executed yet; None
+        # if a block on it is missing (it may be finalized without this node having seen it)
+        certs = set()
+        slot = head
+        while slot > self.executed_slot:
+            proposal = self.proposals.get(slot)
+            if proposal is None:
+                self._request_block(slot)
+                return None
+            certs.update(ref.certificate for ref in proposal.refs)
+            slot = proposal.parent
+        return certs
+
+    def _extends_final(self, slot: int) -> Optional[bool]:
+        """
+        Whether slot's chain reaches the finalized tip (False: it is on a dead fork).
+        None while a proposal on the way is missing; that one is requested.
+        """
+        tip = self.final_tip
+        while slot > tip:
+            proposal = self.proposals.get(slot)
+            if proposal is None:
+                self._request_block(slot)
+                return None
+            slot = proposal.parent
+        return slot == tip
+
+    def _fork_choice(self) -> Optional[int]:
+        """
+        The head to build and vote on: from the finalized tip, repeatedly the child
+        whose subtree holds the most stake in validators' latest votes (the earlier
+        child on a tie). None while some newer block's ancestry is unknown --
+        building past it could repeat batches.
+        """
+        tip = self.final_tip
+        children: Dict[int, List[int]] = {}
+        for slot in sorted(s for s in self.proposals if s > tip):
+            extends = self._extends_final(slot)
+            if extends is None:
+                return None
+            if extends:
+                children.setdefault(self.proposals[slot].parent, []).append(slot)
+        weight: Dict[int, int] = {}
+        for validator, tower in self.tower.towers.items():
+            if tower and tower[-1].slot > tip:
+                stake = self.tower.stakes[validator]
+                slot = tower[-1].slot
+                while slot > tip and slot in self.proposals:
+                    weight[slot] = weight.get(slot, 0) + stake
+                    slot = self.proposals[slot].parent
+        head = tip
+        while head in children:
+            head = max(children[head], key=lambda s: (weight.get(s, 0), -s))
+        return head
+
+    def _on_chain(self, slot: int, head: int) -> bool:
+        while head > slot:
+            head = self.proposals[head].parent
+        return head == slot
+
+    def _propose(self, slot: int):
+        head = self._fork_choice()
+        if head is None:
+            return
+        taken = self._chain_certs(head)
+        if taken is None:
+            return
+        refs = []
+        for cert in self.batches:
+            if cert not in taken and cert not in self.finalized_certs:
+                refs.append(self._refs[cert])
+                if len(refs) >= self.max_batches_per_block:
+                    break
+        # With nothing to add, an empty block is still proposed over a head that has
+        # stayed unfinalized, so split votes get a block to converge on
+        if not refs and not (head > self.final_tip and self._due(("stalled", head))):
+            return
+        poh_ref = self.poh.record_event(b"".join(ref.certificate for ref in refs))
+        proposal = ProposalMsg(slot, head, self.node_id, poh_ref, tuple(refs), self._now)
+        self.stats["blocks_proposed"] += 1
+        self._on_proposal(proposal)
+        self.transport.broadcast(self.node_id, proposal)
+
+    def _on_proposal(self, msg: ProposalMsg):
+        slot = msg.slot
+        if slot in self.proposals:
+            return
+        self.proposals[slot] = msg
+        self._newest_seen = max(self._newest_seen, slot)
+        for ref in msg.refs:
+            self._refs.setdefault(ref.certificate, ref)
+        if msg.leader != self.node_id:
+            self.poh.record_event(msg.poh_ref)
+        self.tower.add_block(Block(slot, msg.poh_ref, [ref.certificate for ref in msg.refs], msg.parent, {}))
+        if self.tower.root is None or slot > self.tower.root:
+            self._unvoted[slot] = msg
+
+    def _available(self, proposal: ProposalMsg) -> bool:
+        return all(ref.certificate in self.batches for ref in proposal.refs)
+
+    def _progress(self):
+        head = self._fork_choice() if self._unvoted else None
+        for slot in sorted(self._unvoted):
+            proposal = self._unvoted[slot]
+            extends = self._extends_final(slot)
+            if extends is False:
+                del self._unvoted[slot]
+                continue
+            if head is None or not self._on_chain(slot, head):
+                continue  # ancestry unknown, or on a lighter fork (for now)
+            if not self._available(proposal):
+                self._request_shards(proposal)
+                continue
+            del self._unvoted[slot]
+            tower = self.tower.towers[self.node_id]
+            newly = self.tower.ingest_votes([(self.node_id, slot)])
+            if tower and tower[-1].slot == slot:
+                self.stats["votes_cast"] += 1
+                self.transport.broadcast(self.node_id, VoteMsg(self.node_id, slot))
+            self._on_finalized(newly)
+        self._execute_finalized()
+
+    def _on_finalized(self, slots: List[int]):
+        if not slots:
+            return
+        now = self._now
+        for slot in slots:
+            proposal = self.proposals.get(slot)
+            if proposal is not None:
+                self.finality_s.append(now - proposal.proposed_at)
+        self.final_tip = max(self.final_tip, slots[-1])
+        for slot in [s for s in self._unvoted if s <= self.final_tip]:
+            del self._unvoted[slot]
+
+    def _execute_finalized(self):
+        chain = []
+        slot = self.final_tip
+        while slot > self.executed_slot:
+            proposal = self.proposals.get(slot)
+            if proposal is None:
+                self._request_block(slot)
+                return
+            chain.append(proposal)
+            slot = proposal.parent
+        if slot != self.executed_slot:
+            raise RuntimeError(f"{self.node_id}: finalized chain skips executed slot {self.executed_slot}")
+        for proposal in reversed(chain):
+            if not self._available(proposal):
+                self._request_shards(proposal)
+                return
+            txs = [tx for ref in proposal.refs for tx in self._batch_txs(ref.certificate)]
+            self.engine.execute_block_of_transactions(txs)
+            for ref in proposal.refs:
+                self.finalized_certs.add(ref.certificate)
+                del self.batches[ref.certificate]
+            self.executed_slot = proposal.slot
+            self.executed_txs += len(txs)
+            self.last_executed_at = self._now
+            self.stats["blocks_executed"] += 1
+
+    # --- repair -------------------------------------------------------------------
+
+    def _due(self, key) -> bool:
+        # The first call only notes that something is missing (it may still be in
+        # flight); a request goes out once it has been missing for repair_after, and
+        # again every repair_after after that
+        now = self._now
+        last = self._repairs.setdefault(key, now)
+        if now - last < self.repair_after:
+            return False
+        self._repairs[key] = now
+        self.stats["repairs_sent"] += 1
+        return True
+
+    def _request_block(self, slot: int):
+        if slot < 0 or not self._due(("block", slot)):
+            return
+        # The slot's leader first, then the next peers in turn
+        n = len(self.peers)
+        attempt = self._block_asks[slot] = self._block_asks.get(slot, -1) + 1
+        target = self.peers[(slot + attempt) % n]
+        if target == self.node_id:
+            target = self.peers[(slot + attempt + 1) % n]
+        self.send(target, RepairBlockMsg(slot, self.node_id))
+
+    def _request_shards(self, proposal: ProposalMsg):
+        for ref in proposal.refs:
+            cert = ref.certificate
+            if cert not in self.batches and self._due(("shards", cert)):
+                have = tuple(self._shards.get(cert, {}))
+                self.send(ref.origin, RepairShardsMsg(cert, self.node_id, have))
+
+    # --- results ------------------------------------------------------------------
+
+    def state_digest(self) -> str:
+        state = self.account_state
+        h = hashlib.sha256()
+        for key in sorted(state.keys()):
+            h.update(f"{key}={state.read(key)!r};".encode())
+        return h.hexdigest()
+
+    def shutdown(self):
+        self.inbox.put_nowait(None)
+        self.engine.shutdown()
@@ -0,0 +1,159 @@
+# cluster/simulator.py
+#
+# N validators as asyncio tasks over a LocalTransport with modeled latency,
+# bandwidth and loss; runs a synthetic workload to completion and reports cluster
+# TPS, time to finality and bytes per node as JSON.
+#
+#   python -m cluster.simulator --nodes 16 --txs 20000 --latency 0.005 --bandwidth 1e8 --loss 0.01
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from cluster.node import ClusterNode
+from cluster.transport import LocalTransport
+from samples import workload
+
+
+def _percentiles_ms(values) -> dict:
+    if not len(values):
+        return {"mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+    a = np.asarray(values) * 1e3
+    return {"mean": round(float(a.mean()), 3), "p50": round(float(np.percentile(a, 50)), 3),
+            "p99": round(float(np.percentile(a, 99)), 3), "max": round(float(a.max()), 3)}
+
+
+class Cluster:
+    """
+    A simulated cluster of ClusterNodes with equal stake (unless stakes are given).
+    Every slot_time seconds a slot starts: its leader is node slot % N, and
+    proposers_per_slot nodes, rotating, each turn their bucket into a batch.
+    Slots missed because the host fell behind are skipped, as a late leader's
+    would be (their proposers batch in the next slot instead). Transactions are loaded into the nodes' buckets round-robin; run()
+    goes on until every node has executed all of them, or timeout.
+    """
+
+    def __init__(self, nodes: int = 4, proposers_per_slot: int = 4, slot_time: float = 0.05,
+                 batch_txs: int = 512, max_batches_per_block: int = 64, latency: float = 0.005,
+                 jitter: float = 0.001, bandwidth: Optional[float] = 100e6, loss: float = 0.0,
+                 stakes: Optional[Dict[str, int]] = None, repair_after: float = 0.2, seed=0):
+        self.slot_time = slot_time
+        self.proposers_per_slot = min(proposers_per_slot, nodes)
+        self.transport = LocalTransport(latency, jitter, bandwidth, loss, seed)
+        peers = [f"node{i}" for i in range(nodes)]
+        stakes = stakes or {p: 1 for p in peers}
+        self.nodes: List[ClusterNode] = [
+            ClusterNode(i, peers, self.transport, stakes, batch_txs=batch_txs,
+                        max_batches_per_block=max_batches_per_block, repair_after=repair_after)
+            for i in range(nodes)
+        ]
+        self.txs = 0
+
+    def load(self, txs):
+        n = len(self.nodes)
+        for i, tx in enumerate(txs):
+            self.nodes[i % n].proposer.add_to_primary(tx)
+        self.txs += len(txs)
+
+    def _is_proposer(self, index: int, slot: int) -> bool:
+        return (index - slot * self.proposers_per_slot) % len(self.nodes) < self.proposers_per_slot
+
+    async def run_async(self, timeout: float = 120.0) -> dict:
+        loop = asyncio.get_running_loop()
+        nodes = self.nodes
+        tasks = [asyncio.create_task(node.run()) for node in nodes]
+        cpu_started = time.process_time()
+        started = loop.time()
+        slot = ticked = 0
+        while any(node.executed_txs < self.txs for node in nodes) and loop.time() - started < timeout:
+            if any(task.done() for task in tasks):
+                break  # a node failed; gather() below raises its error
+            # A skipped slot loses its leader, but not its proposers' batches: their
+            # turn carries over to the next slot that does run
+            turn = range(ticked, slot + 1)
+            for node in nodes:
+                node.tick(slot, leader=slot % len(nodes) == node.index,
+                          proposer=any(self._is_proposer(node.index, s) for s in turn))
+            slot = ticked = slot + 1
+            await asyncio.sleep(max(0.0, started + slot * self.slot_time - loop.time()))
+            # Slots whose time passed while the host was busy are skipped, not bunched up
+            slot = max(slot, int((loop.time() - started) / self.slot_time))
+        cpu_s = time.process_time() - cpu_started
+        for node in nodes:
+            node.shutdown()
+        await asyncio.gather(*tasks)
+        return self.report(started, slot, cpu_s)
+
+    def run(self, timeout: float = 120.0) -> dict:
+        return asyncio.run(self.run_async(timeout))
+
+    def report(self, started: float, slots: int, cpu_s: float) -> dict:
+        nodes = self.nodes
+        t = self.transport
+        complete = all(node.executed_txs >= self.txs for node in nodes)
+        wall = max(node.last_executed_at for node in nodes) - started
+        sent = [t.bytes_sent[node.node_id] for node in nodes]
+        received = [t.bytes_received[node.node_id] for node in nodes]
+        totals: Dict[str, int] = {}
+        for node in nodes:
+            for key, value in node.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return {
+            "nodes": len(nodes),
+            "txs": self.txs,
+            "complete": complete,
+            "consistent": len({node.state_digest() for node in nodes}) == 1,
+            "slots": slots,
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu_s, 3),
+            "tps": round(self.txs / wall) if complete and wall > 0 else 0,
+            "finality_ms": _percentiles_ms([s for node in nodes for s in node.finality_s]),
+            "blocks": nodes[0].stats["blocks_executed"],
+            "bytes_sent_per_node": {"mean": round(float(np.mean(sent))), "max": int(max(sent))},
+            "bytes_received_per_node": {"mean": round(float(np.mean(received))), "max": int(max(received))},
+            "bytes_per_tx": round(sum(sent) / self.txs, 1) if self.txs else 0.0,
+            "messages_per_node": round(sum(t.messages_sent.values()) / len(nodes)),
+            "dropped": t.dropped,
+            "totals": totals,
+        }
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--txs", type=int, default=20_000)
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--zipf", type=float, default=1.0)
+    parser.add_argument("--proposers-per-slot", type=int, default=4)
+    parser.add_argument("--slot-time", type=float, default=0.05, help="seconds per slot")
+    parser.add_argument("--batch-txs", type=int, default=512)
+    parser.add_argument("--latency", type=float, default=0.005, help="one-way seconds")
+    parser.add_argument("--jitter", type=float, default=0.001, help="seconds, uniform, added to latency")
+    parser.add_argument("--bandwidth", type=float, default=100e6, help="uplink bytes/s per node (0: unlimited)")
+    parser.add_argument("--loss", type=float, default=0.0, help="message drop probability")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def run_cluster(nodes: int, args) -> dict:
+    cfg = workload.WorkloadConfig(txs=args.txs, accounts=args.accounts, zipf_s=args.zipf,
+                                  nodes=nodes, seed=args.seed)
+    cluster = Cluster(nodes, args.proposers_per_slot, args.slot_time, args.batch_txs,
+                      latency=args.latency, jitter=args.jitter, bandwidth=args.bandwidth or None,
+                      loss=args.loss, seed=args.seed)
+    cluster.load(workload.generate(cfg))
+    return cluster.run(args.timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated validator cluster")
+    parser.add_argument("--nodes", type=int, default=4)
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(json.dumps(run_cluster(args.nodes, args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
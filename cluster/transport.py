@@ -0,0 +1,80 @@
+# cluster/transport.py
+
+import asyncio
+import random
+from typing import Dict, Hashable, Optional
+
+
+class LocalTransport:
+    """
+    In-process network between cluster nodes sharing one asyncio loop. Each node
+    registers an inbox queue; send() delivers a message to it after the modeled
+    wire time:
+
+      - bandwidth: bytes/s of each node's uplink (None for unlimited). Messages from
+        one sender serialize on its link, so a node that fans a shard out to 63 peers
+        waits for all 63 copies to go out
+      - latency (+ uniform jitter in [0, jitter)): one-way propagation delay in seconds
+      - loss: probability a message is dropped after it was sent (its bytes still count)
+
+    Messages are objects with a wire_size() method (see cluster/node.py); nothing
+    is serialized, the sizes are what the messages would take on the wire. Sending
+    to oneself delivers at once and costs nothing.
+    """
+
+    def __init__(self, latency: float = 0.005, jitter: float = 0.0, bandwidth: Optional[float] = 100e6,
+                 loss: float = 0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.loss = loss
+        self._rng = random.Random(seed)
+        self._inboxes: Dict[Hashable, asyncio.Queue] = {}
+        self._link_free_at: Dict[Hashable, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.bytes_sent: Dict[Hashable, int] = {}
+        self.bytes_received: Dict[Hashable, int] = {}
+        self.messages_sent: Dict[Hashable, int] = {}
+        self.dropped = 0
+
+    def register(self, node_id) -> asyncio.Queue:
+        inbox = self._inboxes[node_id] = asyncio.Queue()
+        self._link_free_at[node_id] = 0.0
+        self.bytes_sent[node_id] = self.bytes_received[node_id] = self.messages_sent[node_id] = 0
+        return inbox
+
+    @property
+    def peers(self):
+        return list(self._inboxes)
+
+    def send(self, src, dst, message):
+        if src == dst:
+            self._inboxes[dst].put_nowait(message)
+            return
+        loop = self._loop or asyncio.get_running_loop()
+        self._loop = loop
+        size = message.wire_size()
+        self.bytes_sent[src] += size
+        self.messages_sent[src] += 1
+        now = loop.time()
+        departs = max(now, self._link_free_at[src])
+        if self.bandwidth:
+            departs += size / self.bandwidth
+        self._link_free_at[src] = departs
+        if self.loss and self._rng.random() < self.loss:
+            self.dropped += 1
+            return
+        arrives = departs + self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+        loop.call_at(arrives, self._deliver, dst, size, message)
+
+    def broadcast(self, src, message):
+        """
+        Sends message to every other node.
+        """
+        for dst in self._inboxes:
+            if dst != src:
+                self.send(src, dst, message)
+
+    def _deliver(self, dst, size: int, message):
+        self.bytes_received[dst] += size
+        self._inboxes[dst].put_nowait(message)
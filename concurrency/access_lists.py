@@ -0,0 +1,138 @@
+# concurrency/access_lists.py
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set
+
+
+@dataclass
+class Schedule:
+    """
+    The result of scheduling one block.
+      - waves: lists of tx positions (indexes into the block); every wave is conflict-free
+      - critical_path_length: longest dependency chain in the block (== number of waves)
+      - parallelism: block size divided by the critical path, i.e. the best speedup possible
+      - conflict_keys: how many dependency edges each key introduced (hot keys first)
+    """
+    waves: List[List[int]]
+    tx_count: int
+    edge_count: int = 0
+    conflict_keys: Counter = field(default_factory=Counter)
+
+    @property
+    def critical_path_length(self) -> int:
+        return len(self.waves)
+
+    @property
+    def parallelism(self) -> float:
+        if not self.waves:
+            return 0.0
+        return self.tx_count / len(self.waves)
+
+    @property
+    def max_wave_width(self) -> int:
+        return max((len(w) for w in self.waves), default=0)
+
+    def summary(self, top_keys: int = 5) -> Dict:
+        return {
+            "txs": self.tx_count,
+            "waves": len(self.waves),
+            "critical_path": self.critical_path_length,
+            "parallelism": round(self.parallelism, 2),
+            "max_wave_width": self.max_wave_width,
+            "edges": self.edge_count,
+            "hot_keys": self.conflict_keys.most_common(top_keys),
+        }
+
+
+class ConflictTracker:
+    """
+    Incrementally assigns transactions to waves while preserving block order semantics.
+
+    A transaction depends on an earlier one if either writes a key the other touches
+    (read-after-write, write-after-write or write-after-read). Instead of materializing
+    the whole conflict graph we only remember, per key, the wave of the last writer and
+    the latest wave that read the key since then. That is enough to compute each
+    transaction's wave as 1 + the deepest wave it depends on, in O(keys per tx).
+    """
+
+    def __init__(self):
+        self.last_write_level: Dict[str, int] = {}
+        self.last_read_level: Dict[str, int] = {}
+        self.edge_count = 0
+        self.conflict_keys = Counter()
+
+    def level_for(self, read_keys: Iterable[str], write_keys: Iterable[str]) -> int:
+        """
+        Returns the wave a transaction with these keys would land in, without recording it.
+        """
+        level = 0
+        for key in read_keys:
+            wl = self.last_write_level.get(key)
+            if wl is not None and wl + 1 > level:
+                level = wl + 1
+        for key in write_keys:
+            wl = self.last_write_level.get(key)
+            if wl is not None and wl + 1 > level:
+                level = wl + 1
+            rl = self.last_read_level.get(key)
+            if rl is not None and rl + 1 > level:
+                level = rl + 1
+        return level
+
+    def add(self, read_keys: Set[str], write_keys: Set[str]) -> int:
+        """
+        Records a transaction and returns the wave it was assigned to.
+        """
+        # A key that is both read and written only needs the write-side checks
+        pure_reads = read_keys - write_keys if write_keys else read_keys
+        level = 0
+        for key in pure_reads:
+            wl = self.last_write_level.get(key)
+            if wl is not None:
+                self.edge_count += 1
+                self.conflict_keys[key] += 1
+                if wl + 1 > level:
+                    level = wl + 1
+        for key in write_keys:
+            wl = self.last_write_level.get(key)
+            rl = self.last_read_level.get(key)
+            if wl is not None or rl is not None:
+                self.edge_count += 1
+                self.conflict_keys[key] += 1
+            if wl is not None and wl + 1 > level:
+                level = wl + 1
+            if rl is not None and rl + 1 > level:
+                level = rl + 1
+
+        for key in pure_reads:
+            if self.last_read_level.get(key, -1) < level:
+                self.last_read_level[key] = level
+        for key in write_keys:
+            self.last_write_level[key] = level
+            # Readers before this write are now ordered behind it
+            self.last_read_level.pop(key, None)
+        return level
+
+
+class AccessListScheduler:
+    """
+    Partitions a block into conflict-free waves using each Transaction's declared
+    read_keys / write_keys. Transactions inside a wave touch disjoint write sets, so
+    they can run in any order (or in parallel) and still give the block-order result.
+    """
+
+    def schedule(self, tx_list: List) -> Schedule:
+        tracker = ConflictTracker()
+        waves: List[List[int]] = []
+        for pos, tx in enumerate(tx_list):
+            level = tracker.add(tx.read_keys, tx.write_keys)
+            if level == len(waves):
+                waves.append([])
+            waves[level].append(pos)
+        return Schedule(
+            waves=waves,
+            tx_count=len(tx_list),
+            edge_count=tracker.edge_count,
+            conflict_keys=tracker.conflict_keys,
+        )
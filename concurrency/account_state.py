@@ -1,22 +1,383 @@
 # concurrency/account_state.py
 
 import threading
+import weakref
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Dict, Iterable
 
-class AccountState:
+from concurrency.balance_table import BalanceTable, is_int64
+from metrics.registry import METRICS, perf_counter
+
+_MISSING = object()
+
+# Only contended acquisitions are timed; the uncontended fast path stays untouched
+_READ_WAIT = METRICS.histogram("lock_wait_seconds", "Time blocked acquiring a contended state lock", mode="read")
+_WRITE_WAIT = METRICS.histogram("lock_wait_seconds", "Time blocked acquiring a contended state lock", mode="write")
+
+
+class RWLock:
     """
-    A global ledger dictionary with a lock manager for concurrency.
-    In a real design, you'd do more fine-grained locking on each account/object.
+    A reader/writer lock: any number of readers, or a single writer. Waiting writers
+    block new readers, so a steady stream of reads can't starve a write.
     """
+
+    __slots__ = ("_mutex", "_cond", "_readers", "_writer", "_writers_waiting", "_sleepers")
+
     def __init__(self):
-        self.state_store = {}
-        self.locks = {}  # map key -> threading.Lock()
+        self._mutex = threading.Lock()
+        self._cond = threading.Condition(self._mutex)
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._sleepers = 0
+
+    def _wait(self):
+        self._sleepers += 1
+        self._cond.wait()
+        self._sleepers -= 1
+
+    def acquire_read(self):
+        with self._mutex:
+            # Uncontended fast path: one plain lock round-trip
+            if not self._writer and not self._writers_waiting:
+                self._readers += 1
+                return
+            started = perf_counter() if METRICS.enabled else 0.0
+            while self._writer or self._writers_waiting:
+                self._wait()
+            self._readers += 1
+            if started:
+                _READ_WAIT.observe(perf_counter() - started)
+
+    def release_read(self):
+        with self._mutex:
+            self._readers -= 1
+            if self._readers == 0 and self._sleepers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._mutex:
+            if not self._writer and not self._readers:
+                self._writer = True
+                return
+            self._writers_waiting += 1
+            started = perf_counter() if METRICS.enabled else 0.0
+            while self._writer or self._readers:
+                self._wait()
+            self._writers_waiting -= 1
+            self._writer = True
+            if started:
+                _WRITE_WAIT.observe(perf_counter() - started)
+
+    def release_write(self):
+        with self._mutex:
+            self._writer = False
+            if self._sleepers:
+                self._cond.notify_all()
+
+
+class StripedLocks:
+    """
+    A fixed table of RWLocks; every key maps to one stripe. Memory is constant no
+    matter how many accounts exist, at the cost of unrelated keys occasionally
+    sharing a stripe.
+    """
+
+    def __init__(self, num_stripes: int = 1024):
+        # Power of two so the stripe is a mask instead of a modulo
+        size = 1
+        while size < num_stripes:
+            size <<= 1
+        self._mask = size - 1
+        self.stripes = [RWLock() for _ in range(size)]
+
+    def __len__(self):
+        return len(self.stripes)
+
+    def stripe_id(self, key: str) -> int:
+        return hash(key) & self._mask
+
+    def for_key(self, key: str) -> RWLock:
+        return self.stripes[hash(key) & self._mask]
+
+
+class StateView(Mapping):
+    """
+    Read-only dict-like view of an AccountState (what `state_store` used to be).
+    """
+
+    def __init__(self, state):
+        self._state = state
+
+    def __getitem__(self, key):
+        if key not in self._state:
+            raise KeyError(key)
+        return self._state.read(key)
+
+    def __contains__(self, key):
+        return key in self._state
+
+    def __iter__(self):
+        return self._state.keys()
+
+    def __len__(self):
+        return sum(1 for _ in self._state.keys())
 
-    def ensure_lock_exists(self, key: str):
-        if key not in self.locks:
-            self.locks[key] = threading.Lock()
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class AccountState:
+    """
+    The global ledger. Integer balances live in a compact array-backed BalanceTable
+    (a key -> slot map plus int64 arrays); any other value goes to a fallback dict,
+    which takes precedence when a key holds both. Concurrency control is a fixed-size
+    table of striped reader/writer locks: reads of a key share its stripe, writes take
+    it exclusively.
+
+    Engines that own the whole state for a block (e.g. VectorizedExecutor) may reserve
+    slots and work on `balances` arrays directly; slot allocation and table growth are
+    serialized by _index_lock, and growth also takes every stripe so no locked access
+    can be holding the old arrays.
+
+    fork() returns a copy-on-write StateOverlay for speculative execution, and
+    snapshot() a frozen, lock-free view (see state_overlay.py). A snapshot shares the
+    arrays and fallback dict with the live state; the first write afterwards copies
+    them, so the snapshot itself never changes.
+
+    attach_backing() puts a read-only mapping (e.g. a memory-mapped on-disk snapshot)
+    underneath everything: keys missing from the table and fallback dict are read from
+    it, and a key is copied into the table the first time reserve() allocates it.
+    """
+
+    def __init__(self, num_stripes: int = 1024, capacity: int = 1024):
+        self.balances = BalanceTable(capacity)
+        self.other: Dict[str, object] = {}
+        self.stripes = StripedLocks(num_stripes)
+        self._index_lock = threading.Lock()
+        self._shared = False  # storage is referenced by a live snapshot
+        self._snapshots = weakref.WeakSet()
+        self.backing = None
+
+    @property
+    def state_store(self) -> StateView:
+        return StateView(self)
+
+    def attach_backing(self, backing):
+        """
+        Serves keys this state hasn't loaded from backing, which needs get(key,
+        default), `in` and keys(). Attach before the state is used.
+        """
+        self.backing = backing
+
+    def __contains__(self, key) -> bool:
+        if key in self.other or key in self.balances:
+            return True
+        return self.backing is not None and key in self.backing
+
+    def keys(self):
+        other = self.other
+        present = self.balances.present
+        for key, idx in list(self.balances.index.items()):
+            if present[idx] and key not in other:
+                yield key
+        yield from list(other)
+        backing = self.backing
+        if backing is not None:
+            index = self.balances.index
+            for key in backing.keys():
+                if key not in other and (key not in index or not present[index[key]]):
+                    yield key
 
     def read(self, key: str):
-        return self.state_store.get(key, 0)
+        lock = self.stripes.for_key(key)
+        lock.acquire_read()
+        try:
+            # _read_unlocked inlined: this is the hottest call in every engine
+            other = self.other
+            if other and key in other:
+                return other[key]
+            table = self.balances
+            idx = table.index.get(key)
+            if idx is None or not table.present[idx]:
+                backing = self.backing
+                return 0 if backing is None else backing.get(key, 0)
+            return table.values.item(idx)
+        finally:
+            lock.release_read()
+
+    def _read_unlocked(self, key: str):
+        if key in self.other:
+            return self.other[key]
+        value = self.balances.get(key, _MISSING)
+        if value is _MISSING:
+            backing = self.backing
+            return 0 if backing is None else backing.get(key, 0)
+        return value
 
     def write(self, key: str, value):
-        self.state_store[key] = value
+        if is_int64(value) and key not in self.balances.index:
+            # Allocate before taking the stripe: growth needs every stripe
+            self.reserve((key,))
+        lock = self.stripes.for_key(key)
+        while True:
+            lock.acquire_write()
+            # snapshot() holds every stripe while it flips _shared, so it's stable here
+            if not self._shared:
+                break
+            lock.release_write()
+            self.ensure_private()
+        try:
+            self._write_unlocked(key, value)
+        finally:
+            lock.release_write()
+
+    def _write_unlocked(self, key: str, value):
+        if is_int64(value):
+            idx = self.balances.index[key]
+            self.balances.values[idx] = value
+            self.balances.present[idx] = True
+            self.other.pop(key, None)
+        else:
+            self.other[key] = value
+
+    def write_many(self, updates: Dict):
+        for key, value in updates.items():
+            self.write(key, value)
+
+    def reserve(self, keys: Iterable[str]):
+        """
+        Makes sure every key has a balance slot and returns the slots (a NumPy array).
+        """
+        with self._index_lock:
+            table = self.balances
+            keys = list(keys)
+            missing = [k for k in keys if k not in table.index]
+            if len(table.index) + len(missing) > table.capacity:
+                self._grow(len(table.index) + len(missing))
+            slots = table.slots(keys)
+            if missing and self.backing is not None:
+                self._fault_in(missing)
+            return slots
+
+    def _fault_in(self, keys):
+        # Copies backing values into newly allocated slots. Concurrent readers see
+        # the same value either way: the slot isn't present until it is filled.
+        backing, table, other = self.backing, self.balances, self.other
+        for key in keys:
+            if key in other:
+                continue
+            value = backing.get(key, _MISSING)
+            if value is _MISSING:
+                continue
+            if is_int64(value):
+                idx = table.index[key]
+                table.values[idx] = value
+                table.present[idx] = True
+            else:
+                other[key] = value
+
+    def _grow(self, needed: int):
+        with self._all_stripes():
+            self.balances.grow(needed)
+
+    @contextmanager
+    def _all_stripes(self):
+        stripes = self.stripes.stripes
+        for lock in stripes:
+            lock.acquire_write()
+        try:
+            yield
+        finally:
+            for lock in reversed(stripes):
+                lock.release_write()
+
+    def fork(self):
+        """
+        O(1) copy-on-write child: reads fall through to this state, writes stay in the
+        overlay until it is committed or discarded.
+        """
+        from concurrency.state_overlay import StateOverlay
+        return StateOverlay(self)
+
+    def snapshot(self):
+        """
+        A consistent, lock-free, read-only view of the state as of now.
+        """
+        from concurrency.state_overlay import StateSnapshot
+        with self._index_lock, self._all_stripes():
+            snap = StateSnapshot(self.balances.index, self.balances.values,
+                                 self.balances.present, self.other, self.backing)
+            self._snapshots.add(snap)
+            self._shared = True
+        return snap
+
+    def ensure_private(self):
+        """
+        Copies storage still shared with a live snapshot. Writers call this before
+        mutating; engines that write the arrays directly call it once per batch.
+        """
+        if not self._shared:
+            return
+        with self._index_lock, self._all_stripes():
+            if not self._shared:
+                return
+            if self._snapshots:
+                table = self.balances
+                table.values = table.values.copy()
+                table.present = table.present.copy()
+                self.other = dict(self.other)
+            self._shared = False
+
+    @contextmanager
+    def locked(self, read_keys: Iterable[str] = (), write_keys: Iterable[str] = ()):
+        """
+        Holds the stripes of a transaction's keys (write mode wins when a stripe
+        covers both), acquired in stripe order so concurrent callers can't deadlock.
+        Use read_unlocked / write_unlocked inside.
+        """
+        write_keys = tuple(write_keys)
+        self.reserve(write_keys)
+        modes = {}
+        for key in read_keys:
+            modes.setdefault(self.stripes.stripe_id(key), False)
+        for key in write_keys:
+            modes[self.stripes.stripe_id(key)] = True
+        while True:
+            acquired = self._acquire_stripes(modes)
+            if not (self._shared and any(modes.values())):
+                break
+            # A snapshot slipped in before we got the stripes: unshare and retry
+            self._release_stripes(acquired)
+            self.ensure_private()
+        try:
+            yield self
+        finally:
+            self._release_stripes(acquired)
+
+    def _acquire_stripes(self, modes: Dict[int, bool]):
+        acquired = []
+        for sid in sorted(modes):
+            lock = self.stripes.stripes[sid]
+            if modes[sid]:
+                lock.acquire_write()
+            else:
+                lock.acquire_read()
+            acquired.append((lock, modes[sid]))
+        return acquired
+
+    @staticmethod
+    def _release_stripes(acquired):
+        for lock, exclusive in reversed(acquired):
+            if exclusive:
+                lock.release_write()
+            else:
+                lock.release_read()
+
+    read_unlocked = _read_unlocked
+
+    def write_unlocked(self, key: str, value):
+        if is_int64(value) and key not in self.balances.index:
+            raise KeyError(f"{key} has no balance slot; reserve() it before locking")
+        self._write_unlocked(key, value)
@@ -0,0 +1,80 @@
+# concurrency/balance_table.py
+
+from typing import Dict, Iterable
+
+import numpy as np
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+def is_int64(value) -> bool:
+    # bool is an int subclass but must keep its type, so it isn't a balance
+    return type(value) is int and INT64_MIN <= value <= INT64_MAX
+
+
+class BalanceTable:
+    """
+    Array-backed int64 balances: a key -> slot map plus contiguous NumPy arrays, so a
+    whole group of balance updates can be applied with a few array operations.
+    A slot can exist before its key holds a value; `present` tells the two apart.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        capacity = max(capacity, 1)
+        self.index: Dict[str, int] = {}
+        self.values = np.zeros(capacity, dtype=np.int64)
+        self.present = np.zeros(capacity, dtype=np.bool_)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        idx = self.index.get(key)
+        return idx is not None and bool(self.present[idx])
+
+    @property
+    def capacity(self) -> int:
+        return len(self.values)
+
+    def slot(self, key: str) -> int:
+        """
+        Slot of key, allocating a zeroed one if needed.
+        """
+        idx = self.index.get(key)
+        if idx is None:
+            idx = len(self.index)
+            if idx >= len(self.values):
+                self.grow(idx + 1)
+            self.index[key] = idx
+        return idx
+
+    def slots(self, keys: Iterable[str]) -> np.ndarray:
+        keys = list(keys)
+        get = self.index.get
+        out = [get(k) for k in keys]
+        if None in out:
+            out = [self.slot(k) if i is None else i for k, i in zip(keys, out)]
+        return np.array(out, dtype=np.int64)
+
+    def grow(self, needed: int):
+        new_size = max(needed, len(self.values) * 2)
+        values = np.zeros(new_size, dtype=np.int64)
+        present = np.zeros(new_size, dtype=np.bool_)
+        values[: len(self.values)] = self.values
+        present[: len(self.present)] = self.present
+        self.values, self.present = values, present
+
+    def get(self, key: str, default=0):
+        idx = self.index.get(key)
+        if idx is None or not self.present[idx]:
+            return default
+        return self.values.item(idx)
+
+    def set(self, key: str, value: int):
+        idx = self.slot(key)  # may grow (and replace) the arrays
+        self.values[idx] = value
+        self.present[idx] = True
+
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.present.nbytes
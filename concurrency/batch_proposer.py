@@ -1,36 +1,92 @@
 # concurrency/batch_proposer.py
 
 import time
-import random
+import weakref
+from typing import Iterable, List, Optional
+
 from concurrency.transaction import Transaction
+from concurrency.tx_bucket import FinalizedTxIndex, TxBucket
+from metrics.registry import METRICS
+
+
+def _bucket_gauge(ref, bucket: str, attr: str):
+    # Reads the proposer through a weak reference, so the gauge doesn't keep it alive
+    def read():
+        proposer = ref()
+        if proposer is None:
+            return None
+        b = getattr(proposer, bucket)
+        return len(b) if attr == "txs" else b.bytes
+    return read
+
 
 class BatchProposer:
     """
     Each BatchProposer has a primary bucket (trans) and a secondary bucket (backups).
     In practice, you'd determine which transactions you 'own' (primary) by hashing the Tx ID or so.
+
+    Both buckets are TxBuckets: duplicates are dropped on arrival, batches come out in
+    fee order within max_batch_txs / max_batch_bytes, and each bucket is capped at
+    max_bucket_txs / max_bucket_bytes by evicting the cheapest entries. Primary
+    transactions pending longer than `timeout` seconds move to the secondary bucket
+    (keeping their arrival time) the next time a batch is formed or expire() runs.
+    Ids in `finalized` are never batched; pass one FinalizedTxIndex to every proposer
+    and call mark_finalized() with each finalized block's transactions.
+
+    Bucket depths are exported as the proposer_bucket_txs / proposer_bucket_bytes
+    gauges, read when metrics are collected.
     """
 
-    def __init__(self, proposer_id):
+    def __init__(self, proposer_id, timeout: float = 30.0, max_batch_txs: Optional[int] = None,
+                 max_batch_bytes: Optional[int] = None, max_bucket_txs: Optional[int] = None,
+                 max_bucket_bytes: Optional[int] = None, finalized: Optional[FinalizedTxIndex] = None):
         self.proposer_id = proposer_id
-        self.primary_bucket = []
-        self.secondary_bucket = []
+        self.timeout = timeout
+        self.max_batch_txs = max_batch_txs
+        self.max_batch_bytes = max_batch_bytes
+        self.finalized = finalized if finalized is not None else FinalizedTxIndex()
+        self.primary_bucket = TxBucket(max_bucket_txs, max_bucket_bytes, self.finalized)
+        self.secondary_bucket = TxBucket(max_bucket_txs, max_bucket_bytes, self.finalized)
+        ref = weakref.ref(self)
+        for bucket in ("primary", "secondary"):
+            for attr in ("txs", "bytes"):
+                METRICS.gauge(f"proposer_bucket_{attr}", f"Pending {attr} in a proposer bucket",
+                              fn=_bucket_gauge(ref, f"{bucket}_bucket", attr),
+                              proposer=str(proposer_id), bucket=bucket)
 
-    def add_to_primary(self, tx: Transaction):
-        self.primary_bucket.append(tx)
+    def add_to_primary(self, tx: Transaction) -> bool:
+        return self.primary_bucket.add(tx)
 
-    def add_to_secondary(self, tx: Transaction):
-        self.secondary_bucket.append(tx)
+    def add_to_secondary(self, tx: Transaction) -> bool:
+        return self.secondary_bucket.add(tx)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Moves timed-out primary transactions to the secondary bucket; returns how many.
+        """
+        now = time.monotonic() if now is None else now
+        expired = self.primary_bucket.pop_expired(now - self.timeout)
+        for tx, arrived_at in expired:
+            self.secondary_bucket.add(tx, arrived_at)
+        return len(expired)
+
+    def mark_finalized(self, txs: Iterable):
+        """
+        Records transactions (or ids) included in a finalized block and drops them here.
+        """
+        ids = [tx if isinstance(tx, str) else tx.tx_id for tx in txs]
+        self.finalized.add_many(ids)
+        self.primary_bucket.discard_many(ids)
+        self.secondary_bucket.discard_many(ids)
 
-    def form_batch(self, fallback=False):
+    def form_batch(self, fallback=False, max_txs: Optional[int] = None,
+                   max_bytes: Optional[int] = None) -> List[Transaction]:
         """
         If fallback==False, use primary bucket, else use secondary's timed-out or unfinalized txs
         """
-        if fallback:
-            chosen = list(self.secondary_bucket)
-            self.secondary_bucket.clear()
-        else:
-            chosen = list(self.primary_bucket)
-            self.primary_bucket.clear()
-
-        # In a real system, you'd also remove duplicates or check if they've already been included
-        return chosen
+        self.expire()
+        bucket = self.secondary_bucket if fallback else self.primary_bucket
+        return bucket.pop_batch(
+            max_txs=self.max_batch_txs if max_txs is None else max_txs,
+            max_bytes=self.max_batch_bytes if max_bytes is None else max_bytes,
+        )
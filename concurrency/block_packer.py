@@ -0,0 +1,208 @@
+# concurrency/block_packer.py
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from concurrency.access_lists import ConflictTracker
+
+
+class ContentionTracker:
+    """
+    Per-key write demand with exponential decay: every block, a key's counter gains one
+    per transaction that wanted to write it, and all counters halve every
+    half_life blocks. Decay is applied lazily when a key is touched or read, so a
+    block costs O(keys written) no matter how many keys are tracked; keys that have
+    cooled below `forget_below` are dropped every `prune_every` blocks.
+    """
+
+    def __init__(self, half_life: float = 8.0, forget_below: float = 0.05, prune_every: int = 64):
+        self.half_life = half_life
+        self.forget_below = forget_below
+        self.prune_every = prune_every
+        self.block = 0
+        self._counters: Dict[str, Tuple[float, int]] = {}  # key -> (value, block it was decayed to)
+
+    def _decayed(self, value: float, since: int) -> float:
+        age = self.block - since
+        return value * 0.5 ** (age / self.half_life) if age else value
+
+    def hotness(self, key: str) -> float:
+        entry = self._counters.get(key)
+        return self._decayed(*entry) if entry is not None else 0.0
+
+    def observe(self, txs: Sequence):
+        """
+        Records one block's worth of demand (every candidate, admitted or not -- a key
+        whose writers were capped is still hot) and advances the clock.
+        """
+        self.block += 1
+        counters = self._counters
+        for tx in txs:
+            for key in tx.write_keys:
+                entry = counters.get(key)
+                value = self._decayed(*entry) if entry is not None else 0.0
+                counters[key] = (value + 1.0, self.block)
+        if self.block % self.prune_every == 0:
+            self._counters = {k: e for k, e in counters.items() if self._decayed(*e) >= self.forget_below}
+
+    def hottest(self, n: int = 10) -> List[Tuple[str, float]]:
+        scored = ((k, self._decayed(*e)) for k, e in self._counters.items())
+        return sorted(scored, key=lambda kv: -kv[1])[:n]
+
+    def __len__(self):
+        return len(self._counters)
+
+
+@dataclass
+class PackResult:
+    """
+    The outcome of packing one block.
+      - txs: admitted transactions, in block order
+      - deferred: candidates left out (hot-key cap, lane price or depth budget), to go
+        back to the proposer's bucket
+      - lane_prices: clearing fee of each hot key's lane, i.e. the lowest fee admitted
+        for it (the fee a transaction on that key needed to get in this block)
+      - critical_path: longest dependency chain in txs; parallelism = len(txs) / that
+    """
+    txs: List
+    deferred: List
+    lane_prices: Dict[str, float] = field(default_factory=dict)
+    critical_path: int = 0
+    reasons: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def parallelism(self) -> float:
+        return len(self.txs) / self.critical_path if self.critical_path else 0.0
+
+    def summary(self) -> Dict:
+        return {
+            "txs": len(self.txs),
+            "deferred": len(self.deferred),
+            "critical_path": self.critical_path,
+            "parallelism": round(self.parallelism, 2),
+            "lanes": {k: round(v, 6) for k, v in self.lane_prices.items()},
+            "deferred_by": dict(self.reasons),
+        }
+
+
+class BlockPacker:
+    """
+    Chooses which pending transactions go into a block, between BatchProposer.form_batch
+    and BlockBuilder.build_block, so that a hot account can't serialize the block.
+
+    A key is hot when its decayed write demand (ContentionTracker) reaches
+    hot_threshold, or when this block's candidates alone would write it more than
+    hot_key_cap times. Transactions writing a hot key compete in that key's fee lane:
+    at most hot_key_cap of them are admitted per block, highest fee first, and each
+    must pay at least lane_base_fee * hotness. Everything else competes on fee across
+    the whole block.
+
+    Candidates are considered in fee order (ties keep their input order) and placed
+    with a ConflictTracker; a transaction that would push the block's critical path
+    past max_depth is deferred. The block is therefore filled with the best-paying
+    transactions that keep block size / critical path -- the parallelism the engine
+    can reach -- high. Fee only decides who gets in: admitted transactions keep their
+    input order (the proposer's, e.g. synergy, ordering). That order can chain them
+    deeper than fee order did, so depth is checked again in input order and any
+    transaction that would now reach max_depth is deferred as well.
+    """
+
+    def __init__(self, max_txs: Optional[int] = None, hot_key_cap: int = 8,
+                 max_depth: Optional[int] = None, hot_threshold: float = 32.0,
+                 lane_base_fee: float = 0.0, tracker: Optional[ContentionTracker] = None):
+        self.max_txs = max_txs
+        self.hot_key_cap = hot_key_cap
+        # A capped hot key alone forms a chain of hot_key_cap writes
+        self.max_depth = max_depth if max_depth is not None else hot_key_cap
+        self.hot_threshold = hot_threshold
+        self.lane_base_fee = lane_base_fee
+        self.tracker = tracker or ContentionTracker()
+
+    def hot_keys(self, candidates: Sequence) -> Dict[str, float]:
+        """
+        Hot keys for this set of candidates, with their hotness (decayed demand,
+        including this block's).
+        """
+        demand: Dict[str, int] = {}
+        for tx in candidates:
+            for key in tx.write_keys:
+                demand[key] = demand.get(key, 0) + 1
+        hot = {}
+        for key, count in demand.items():
+            hotness = self.tracker.hotness(key) + count
+            if count > self.hot_key_cap or hotness >= self.hot_threshold:
+                hot[key] = hotness
+        return hot
+
+    def pack(self, candidates: Sequence) -> PackResult:
+        hot = self.hot_keys(candidates)
+        order = sorted(range(len(candidates)), key=lambda i: -float(candidates[i].fee))
+        conflicts = ConflictTracker()
+        lane_counts: Dict[str, int] = {}
+        lane_prices: Dict[str, float] = {}
+        reasons = {"full": 0, "hot_key_cap": 0, "lane_fee": 0, "depth": 0}
+        admitted, deferred = set(), []
+
+        for i in order:
+            tx = candidates[i]
+            fee = float(tx.fee)
+            lanes = [key for key in tx.write_keys if key in hot]
+            if self.max_txs is not None and len(admitted) >= self.max_txs:
+                reason = "full"
+            elif any(lane_counts.get(key, 0) >= self.hot_key_cap for key in lanes):
+                reason = "hot_key_cap"
+            elif any(fee < self.lane_base_fee * hot[key] for key in lanes):
+                reason = "lane_fee"
+            elif conflicts.level_for(tx.read_keys, tx.write_keys) >= self.max_depth:
+                reason = "depth"
+            else:
+                reason = None
+            if reason is not None:
+                reasons[reason] += 1
+                deferred.append(tx)
+                continue
+            conflicts.add(tx.read_keys, tx.write_keys)
+            for key in lanes:
+                lane_counts[key] = lane_counts.get(key, 0) + 1
+                lane_prices[key] = fee  # fee order: the latest admitted is the cheapest
+            admitted.add(i)
+
+        self.tracker.observe(candidates)
+        txs = []
+        conflicts = ConflictTracker()
+        depth = 0
+        for i, tx in enumerate(candidates):
+            if i not in admitted:
+                continue
+            level = conflicts.level_for(tx.read_keys, tx.write_keys)
+            if level >= self.max_depth:
+                reasons["depth"] += 1
+                deferred.append(tx)
+                continue
+            conflicts.add(tx.read_keys, tx.write_keys)
+            depth = max(depth, level + 1)
+            txs.append(tx)
+        return PackResult(
+            txs=txs,
+            deferred=deferred,
+            lane_prices=lane_prices,
+            critical_path=depth,
+            reasons={k: v for k, v in reasons.items() if v},
+        )
+
+    def pack_batches(self, batches: Sequence[Sequence]) -> Tuple[List[list], PackResult]:
+        """
+        Packs the union of several batches as one block and splits the admitted
+        transactions back into their batches, so each keeps its own DAQC.
+        """
+        result = self.pack([tx for batch in batches for tx in batch])
+        admitted = {id(tx) for tx in result.txs}
+        return [[tx for tx in batch if id(tx) in admitted] for batch in batches], result
+
+
+def critical_path(txs: Sequence) -> int:
+    """
+    Longest dependency chain of txs executed in the given order.
+    """
+    conflicts = ConflictTracker()
+    return max((conflicts.add(tx.read_keys, tx.write_keys) + 1 for tx in txs), default=0)
@@ -0,0 +1,189 @@
+# concurrency/codec.py
+
+import struct
+from typing import Tuple
+
+# Deterministic, length-prefixed binary encoding for ledger values. The same value
+# always encodes to the same bytes (dicts are written in sorted-key order), so the
+# output can be hashed, journaled, or sent between processes.
+
+_U32 = struct.Struct(">I")
+_I64 = struct.Struct(">q")
+_F64 = struct.Struct(">d")
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+class CodecError(ValueError):
+    pass
+
+
+def pack_bytes(data: bytes) -> bytes:
+    return _U32.pack(len(data)) + data
+
+
+def pack_str(text: str) -> bytes:
+    return pack_bytes(text.encode("utf-8"))
+
+
+def unpack_bytes(buf, offset: int) -> Tuple[bytes, int]:
+    (length,) = _U32.unpack_from(buf, offset)
+    start = offset + 4
+    end = start + length
+    if end > len(buf):
+        raise CodecError("truncated buffer")
+    return bytes(buf[start:end]), end
+
+
+def unpack_str(buf, offset: int) -> Tuple[str, int]:
+    raw, offset = unpack_bytes(buf, offset)
+    return raw.decode("utf-8"), offset
+
+
+def pack_varint(n: int) -> bytes:
+    """
+    Unsigned LEB128: 7 bits per byte, high bit set on all but the last byte.
+    """
+    if n < 0:
+        raise CodecError("varint must be non-negative")
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def unpack_varint(buf, offset: int) -> Tuple[int, int]:
+    if offset < len(buf) and buf[offset] < 0x80:
+        return buf[offset], offset + 1  # one-byte fast path: lengths and counts < 128
+    result = shift = 0
+    while True:
+        if offset >= len(buf):
+            raise CodecError("truncated varint")
+        byte = buf[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+def pack_vstr(text: str) -> bytes:
+    """
+    A varint length followed by the UTF-8 bytes; the compact form used in
+    transaction encodings.
+    """
+    raw = text.encode("utf-8")
+    return pack_varint(len(raw)) + raw
+
+
+def unpack_vstr(buf, offset: int) -> Tuple[str, int]:
+    length = buf[offset] if offset < len(buf) else 0x80
+    if length < 0x80:
+        offset += 1
+    else:
+        length, offset = unpack_varint(buf, offset)
+    end = offset + length
+    if end > len(buf):
+        raise CodecError("truncated buffer")
+    return str(buf[offset:end], "utf-8"), end
+
+
+def encode_value(value) -> bytes:
+    out = bytearray()
+    _encode(value, out)
+    return bytes(out)
+
+
+def _encode(value, out: bytearray):
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif type(value) is int:
+        if INT64_MIN <= value <= INT64_MAX:
+            out += b"i"
+            out += _I64.pack(value)
+        else:
+            raw = value.to_bytes((value.bit_length() + 8) // 8, "big", signed=True)
+            out += b"I"
+            out += pack_bytes(raw)
+    elif type(value) is float:
+        out += b"f"
+        out += _F64.pack(value)
+    elif isinstance(value, str):
+        out += b"s"
+        out += pack_str(value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        out += b"y"
+        out += pack_bytes(bytes(value))
+    elif isinstance(value, (list, tuple)):
+        out += b"l" if isinstance(value, list) else b"t"
+        out += _U32.pack(len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, (set, frozenset)):
+        items = sorted(encode_value(v) for v in value)
+        out += b"e"
+        out += _U32.pack(len(items))
+        for item in items:
+            out += item
+    elif isinstance(value, dict):
+        items = sorted((encode_value(k), v) for k, v in value.items())
+        out += b"d"
+        out += _U32.pack(len(items))
+        for key_bytes, item in items:
+            out += key_bytes
+            _encode(item, out)
+    else:
+        raise CodecError(f"cannot encode {type(value).__name__}")
+
+
+def decode_value(buf, offset: int = 0) -> Tuple[object, int]:
+    """
+    Decodes one value starting at offset; returns (value, offset after it).
+    """
+    tag = buf[offset:offset + 1]
+    offset += 1
+    if tag == b"N":
+        return None, offset
+    if tag == b"T":
+        return True, offset
+    if tag == b"F":
+        return False, offset
+    if tag == b"i":
+        return _I64.unpack_from(buf, offset)[0], offset + 8
+    if tag == b"I":
+        raw, offset = unpack_bytes(buf, offset)
+        return int.from_bytes(raw, "big", signed=True), offset
+    if tag == b"f":
+        return _F64.unpack_from(buf, offset)[0], offset + 8
+    if tag == b"s":
+        return unpack_str(buf, offset)
+    if tag == b"y":
+        return unpack_bytes(buf, offset)
+    if tag in (b"l", b"t", b"e"):
+        (count,) = _U32.unpack_from(buf, offset)
+        offset += 4
+        items = []
+        for _ in range(count):
+            item, offset = decode_value(buf, offset)
+            items.append(item)
+        if tag == b"t":
+            return tuple(items), offset
+        if tag == b"e":
+            return set(items), offset
+        return items, offset
+    if tag == b"d":
+        (count,) = _U32.unpack_from(buf, offset)
+        offset += 4
+        out = {}
+        for _ in range(count):
+            key, offset = decode_value(buf, offset)
+            out[key], offset = decode_value(buf, offset)
+        return out, offset
+    raise CodecError(f"unknown tag {bytes(tag)!r} at offset {offset - 1}")
@@ -1,76 +1,151 @@
 # concurrency/concurrency_engine.py
 
-import threading
-from typing import List
+import copy
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from concurrency.access_lists import AccessListScheduler, Schedule
+from concurrency.state_commitment import dirty_keys_of
+from metrics.registry import METRICS
+
+_BLOCK_S = METRICS.histogram("engine_block_seconds", "Engine time per block")
+_WAVES = METRICS.histogram("engine_block_waves", "Conflict waves per block", scale=1)
+_TXS = METRICS.counter("engine_txs_total", "Transactions executed")
+_FAILED = METRICS.counter("engine_tx_failures_total", "Transactions that failed without writes")
+_EDGES = METRICS.counter("engine_conflict_edges_total", "Conflict edges between transactions of a block")
+_RE_EXECUTED = METRICS.counter("engine_re_executions_total", "Optimistic executions redone after a conflict")
+
+
+def record_block_metrics(report, results):
+    """
+    Reports one executed block (its last_report and results) to METRICS, if enabled;
+    shared by every engine.
+    """
+    if not METRICS.enabled:
+        return
+    _BLOCK_S.observe(report["elapsed_s"])
+    _TXS.inc(report["txs"])
+    if "waves" in report:
+        _WAVES.observe(report["waves"])
+    if "edges" in report:
+        _EDGES.inc(report["edges"])
+    if report.get("re_executions"):
+        _RE_EXECUTED.inc(report["re_executions"])
+    failed = sum(1 for ok, _ in results.values() if not ok)
+    if failed:
+        _FAILED.inc(failed)
+
 
 class ConcurrencyEngine:
     """
-    A simplistic approach to 'Sealevel-like' concurrency. We run transactions in parallel 
-    if their write sets do not overlap. If there's overlap, we lock sequentially.
+    A 'Sealevel-like' concurrency engine. Each block is partitioned into conflict-free
+    waves from the transactions' declared read/write keys (see access_lists.py); the
+    waves run one after another, and the transactions inside a wave are spread over a
+    bounded, reusable worker pool. Since a wave never holds two transactions touching
+    the same written key, no per-key locking is needed while it runs.
     """
 
-    def __init__(self, account_state):
+    def __init__(self, account_state, max_workers: Optional[int] = None, min_parallel_wave: int = 2):
+        """
+        :param max_workers: size of the worker pool (defaults to the CPU count)
+        :param min_parallel_wave: waves smaller than this run inline on the caller's thread
+        """
         self.account_state = account_state
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_parallel_wave = min_parallel_wave
+        self.scheduler = AccessListScheduler()
+        self.last_schedule: Optional[Schedule] = None
+        self.last_report = {}
+        self.last_dirty_keys = set()
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="concurrency-engine"
+            )
+        return self._pool
+
+    def bind(self, account_state):
+        """
+        A view of this engine that executes against another state (e.g. a fork from
+        AccountState.fork()) while sharing the worker pool.
+        """
+        self._get_pool()
+        bound = copy.copy(self)
+        bound.account_state = account_state
+        return bound
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
 
     def execute_block_of_transactions(self, tx_list: List, use_multithreading=True):
         """
-        We can chunk the tx_list by non-overlapping sets or attempt to run them in parallel threads.
-        In practice, a schedule step is needed, but we'll show a naive approach.
+        Runs the block wave by wave and returns {tx_id: (ok, updates_or_error)}.
+        The outcome matches running tx_list serially in order.
         """
         results = {}
-        # Naive approach: if use_multithreading, spawn threads for non-conflicting sets
-        # We'll show an example of lock-based parallel
-
-        # 1. Group transactions that do not conflict
-        #    For demonstration, we'll just try to run them all in parallel 
-        #    and lock as needed inside each transaction.
-        threads = []
-        for tx in tx_list:
-            t = threading.Thread(
-                target=self._run_single_tx, args=(tx, results)
-            )
-            t.start()
-            threads.append(t)
+        started = time.perf_counter()
+        schedule = self.scheduler.schedule(tx_list)
+        self.last_schedule = schedule
 
-        for thread in threads:
-            thread.join()
+        busy = 0.0
+        slowest_wave = (0.0, -1)
+        for wave_no, wave in enumerate(schedule.waves):
+            wave_started = time.perf_counter()
+            if not use_multithreading or len(wave) < self.min_parallel_wave or self.max_workers == 1:
+                busy += self._run_chunk([tx_list[i] for i in wave], results)
+            else:
+                busy += self._run_wave_parallel([tx_list[i] for i in wave], results)
+            wave_elapsed = time.perf_counter() - wave_started
+            if wave_elapsed > slowest_wave[0]:
+                slowest_wave = (wave_elapsed, wave_no)
 
+        elapsed = time.perf_counter() - started
+        report = schedule.summary()
+        report["elapsed_s"] = elapsed
+        report["slowest_wave"] = {"index": slowest_wave[1], "elapsed_s": slowest_wave[0]}
+        # Time spent inside transactions divided by wall time: 1.0 means fully serial
+        report["achieved_parallelism"] = round(busy / elapsed, 2) if elapsed > 0 else 0.0
+        self.last_report = report
+        self.last_dirty_keys = dirty_keys_of(results)
+        record_block_metrics(report, results)
         return results
 
-    def _run_single_tx(self, tx, results):
-        # Acquire write locks for each key in the transaction
-        # Then read from state, call tx.action_fn, then write results.
-        # Actually, for read-keys, we might not lock or might do a read lock. 
-        # We'll do a simplistic approach with a single write lock per key.
+    def _run_wave_parallel(self, wave_txs: List, results):
+        # One task per worker, each running a contiguous chunk of the wave, so a
+        # wide wave costs max_workers futures rather than one per transaction.
+        n_chunks = min(self.max_workers, len(wave_txs))
+        chunk_size = (len(wave_txs) + n_chunks - 1) // n_chunks
+        pool = self._get_pool()
+        futures = [
+            pool.submit(self._run_chunk, wave_txs[i:i + chunk_size], results)
+            for i in range(0, len(wave_txs), chunk_size)
+        ]
+        return sum(fut.result() for fut in futures)
 
-        # Sort keys to avoid deadlocks in real code. For demonstration, no sorting.
-        for wkey in tx.write_keys:
-            self.account_state.ensure_lock_exists(wkey)
+    def _run_chunk(self, txs: List, results) -> float:
+        started = time.perf_counter()
+        for tx in txs:
+            self._run_single_tx(tx, results)
+        return time.perf_counter() - started
 
-        # Acquire all locks
-        locked_list = []
+    def _run_single_tx(self, tx, results):
+        # The wave guarantees nobody else writes our keys right now: read, act, write.
         try:
-            for wkey in sorted(tx.write_keys):
-                lock = self.account_state.locks[wkey]
-                lock.acquire()
-                locked_list.append(lock)
-
-            # READ
             read_values = {}
             for rkey in tx.read_keys:
                 read_values[rkey] = self.account_state.read(rkey)
 
-            # ACTION
             updates = tx.action_fn(read_values)
 
-            # WRITE
             for k, v in updates.items():
                 self.account_state.write(k, v)
 
             results[tx.tx_id] = (True, updates)
         except Exception as e:
             results[tx.tx_id] = (False, str(e))
-        finally:
-            # release locks
-            for lk in reversed(locked_list):
-                lk.release()
@@ -1,14 +1,152 @@
 # concurrency/daqc.py
 
 import hashlib
+import struct
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from concurrency.erasure import ReedSolomon
+from concurrency.tx_batch import TransactionBatch
+from metrics.registry import METRICS, perf_counter
+
+# Shards per batch: any DATA_SHARDS of the DATA_SHARDS + PARITY_SHARDS rebuild it
+DATA_SHARDS = 8
+PARITY_SHARDS = 4
+
+_CERT_HEADER = struct.Struct(">HHQ")
+_EMPTY = bytes(32)
+
+_DAQC_HELP = "DAQC time per batch by phase"
+_SERIALIZE_S = METRICS.histogram("daqc_seconds", _DAQC_HELP, phase="serialize")
+_ERASURE_S = METRICS.histogram("daqc_seconds", _DAQC_HELP, phase="erasure")
+_HASH_S = METRICS.histogram("daqc_seconds", _DAQC_HELP, phase="hash")
+_DAQC_BYTES = METRICS.counter("daqc_bytes_total", "Serialized batch bytes certified")
+
+
+def _sha256(data) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+@lru_cache(maxsize=None)
+def get_coder(k: int = DATA_SHARDS, m: int = PARITY_SHARDS) -> ReedSolomon:
+    # One coder (and worker pool) per shape, shared by every batch
+    return ReedSolomon(k, m)
+
+
+def serialize_batch(transactions) -> bytes:
+    """
+    The canonical bytes of a batch: a TransactionBatch of the transactions' encodings.
+    """
+    if isinstance(transactions, TransactionBatch):
+        return transactions.tobytes()
+    return TransactionBatch.from_transactions(transactions).buffer
+
+
+def shard_leaf(index: int, shard) -> bytes:
+    h = hashlib.sha256(b"\x00" + index.to_bytes(2, "big"))
+    h.update(shard)  # no copy of the shard itself
+    return h.digest()
+
+
+def _merkle_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    size = 1
+    while size < len(leaves):
+        size <<= 1
+    level = leaves + [_EMPTY] * (size - len(leaves))
+    levels = [level]
+    while len(level) > 1:
+        level = [_sha256(b"\x01" + level[i] + level[i + 1]) for i in range(0, len(level), 2)]
+        levels.append(level)
+    return levels
+
+
+def certificate_of(k: int, m: int, length: int, shard_root: bytes) -> bytes:
+    return _sha256(b"DAQC" + _CERT_HEADER.pack(k, m, length) + shard_root)
+
+
+@dataclass
+class DAQC:
+    """
+    A data availability certificate for one batch, plus the coded shards it covers.
+
+    shard_root is a Merkle root over the k + m shards; certificate binds it to the
+    coding parameters and payload length, and is what blocks reference.
+    """
+    k: int
+    m: int
+    length: int
+    shard_root: bytes
+    certificate: bytes
+    shards: List[memoryview] = field(repr=False)
+    levels: List[List[bytes]] = field(repr=False)  # Merkle levels, leaves first
+
+    def proof(self, index: int) -> List[bytes]:
+        """
+        Sibling hashes from shard `index` up to shard_root.
+        """
+        path = []
+        for level in self.levels[:-1]:
+            path.append(level[index ^ 1])
+            index >>= 1
+        return path
+
+
+def verify_shard(certificate: bytes, k: int, m: int, length: int, shard_root: bytes,
+                 index: int, shard, proof: List[bytes]) -> bool:
+    if certificate_of(k, m, length, shard_root) != certificate:
+        return False
+    h = shard_leaf(index, shard)
+    for sibling in proof:
+        h = _sha256(b"\x01" + sibling + h) if index & 1 else _sha256(b"\x01" + h + sibling)
+        index >>= 1
+    return h == shard_root
+
+
+def encode_batch(transactions, k: int = DATA_SHARDS, m: int = PARITY_SHARDS,
+                 payload: Optional[bytes] = None) -> DAQC:
+    """
+    Serializes (unless payload is given), erasure-codes and certifies a batch.
+    """
+    timed = METRICS.enabled
+    t0 = perf_counter() if timed else 0.0
+    data = serialize_batch(transactions) if payload is None else payload
+    t1 = perf_counter() if timed else 0.0
+    coder = get_coder(k, m)
+    coded = coder.encode(data)
+    shards = [memoryview(row) for row in coded]
+    t2 = perf_counter() if timed else 0.0
+    if coded.shape[1] >= coder.parallel_threshold and coder.max_workers > 1:
+        # hashlib releases the GIL on large buffers
+        leaves = list(coder.executor().map(shard_leaf, range(len(shards)), shards))
+    else:
+        leaves = [shard_leaf(i, s) for i, s in enumerate(shards)]
+    levels = _merkle_levels(leaves)
+    root = levels[-1][0]
+    if timed:
+        _SERIALIZE_S.observe(t1 - t0)
+        _ERASURE_S.observe(t2 - t1)
+        _HASH_S.observe(perf_counter() - t2)
+        _DAQC_BYTES.inc(len(data))
+    return DAQC(k=k, m=m, length=len(data), shard_root=root,
+                certificate=certificate_of(k, m, len(data), root),
+                shards=shards, levels=levels)
+
+
+def reconstruct_batch(shards: Dict[int, object], k: int, m: int, length: int) -> bytes:
+    """
+    Rebuilds the serialized batch from any k shards ({shard index: bytes-like}).
+    """
+    return get_coder(k, m).decode(shards, length)
+
+
+def reconstruct_transactions(shards: Dict[int, object], k: int, m: int, length: int) -> TransactionBatch:
+    return TransactionBatch(reconstruct_batch(shards, k, m, length))
+
 
 def compute_daqc(transactions):
     """
-    A stub for an erasure-coded RBC. We'll just hash them all for demonstration.
-    Real RBC would split them into coded shards & gather partial signatures.
+    Erasure-codes the batch into k data + m parity shards and returns its certificate
+    (see DAQC). Call encode_batch() to also get the shards for broadcast.
     """
-    m = hashlib.sha256()
-    for tx in transactions:
-        m.update(str(tx).encode('utf-8'))
-    # This hash is the 'batch cert' in simplified form
-    return m.digest()
+    return encode_batch(transactions).certificate
@@ -1,31 +1,160 @@
 # concurrency/epoch_manager.py
 
-import random
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_SEED_DOMAIN = b"postfiat-epoch-clans-v1"
+
+
+def epoch_seed(epoch: int, poh_hash: bytes) -> int:
+    """
+    256-bit seed for an epoch's shuffle: SHA-256 over the epoch number and the PoH
+    hash it starts from, so every node derives the same one.
+    """
+    digest = hashlib.sha256(_SEED_DOMAIN + epoch.to_bytes(8, "big") + poh_hash).digest()
+    return int.from_bytes(digest, "big")
+
+
+class ClanAssignment:
+    """
+    One epoch's clans, as arrays over node indices:
+
+      - clan_of[i]: clan of node i
+      - members[offsets[c]:offsets[c + 1]]: nodes of clan c (by node index)
+      - clan_stake[c]: total stake of clan c
+    """
+
+    __slots__ = ("epoch", "node_ids", "node_index", "clan_of", "members", "offsets", "clan_stake")
+
+    def __init__(self, epoch: int, node_ids: Sequence[str], node_index: Dict[str, int],
+                 clan_of: np.ndarray, members: np.ndarray, stakes: np.ndarray):
+        self.epoch = epoch
+        self.node_ids = node_ids
+        self.node_index = node_index
+        self.clan_of = clan_of
+        self.members = members
+        clan_count = int(clan_of.max()) + 1 if len(clan_of) else 0
+        self.offsets = np.zeros(clan_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(clan_of, minlength=clan_count), out=self.offsets[1:])
+        self.clan_stake = np.bincount(clan_of, weights=stakes, minlength=clan_count).astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def clan_of_node(self, node_id: str) -> int:
+        return int(self.clan_of[self.node_index[node_id]])
+
+    def members_of(self, clan: int) -> List[str]:
+        ids = self.node_ids
+        return [ids[i] for i in self.members[self.offsets[clan]:self.offsets[clan + 1]]]
+
+    def clan_sizes(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def to_lists(self) -> List[List[str]]:
+        return [self.members_of(c) for c in range(len(self))]
+
 
 class EpochManager:
     """
-    Demonstrates how you might shuffle nodes into subcommittees each epoch.
-    For a large system, you might have 50+ nodes or more, dividing them into 'clans' or 'shards.'
+    Shuffles nodes into subcommittees ('clans') each epoch.
+
+    The shuffle is a permutation seeded by epoch_seed(epoch, poh_hash): a PCG64
+    stream gives every node a 64-bit sort key (raw bit-generator output, which
+    NumPy keeps stable across versions). Every node therefore computes the same
+    clans locally, with nothing to distribute. Clans are balanced by stake: nodes
+    are dealt in stake order (ties in shuffled order) in laps of k, one node to
+    each clan per lap, and the same stream shuffles which clan gets which node in
+    every lap. Clan sizes differ by at most one, clan stakes stay close, and the
+    clans still change with the seed when every stake is distinct. Without stakes
+    every node weighs 1.
+
+    start_new_epoch() only records the seed; an epoch's assignment is computed
+    the first time it is looked up. Only the last `history` epochs are kept.
     """
 
-    def __init__(self, all_nodes):
-        self.all_nodes = all_nodes[:]  # copy
+    def __init__(self, all_nodes, stakes: Optional[Dict[str, int]] = None, history: int = 8):
+        self.history = history
         self.current_epoch = 0
-        self.clans_by_epoch = {}
+        self._epochs: "OrderedDict[int, object]" = OrderedDict()  # epoch -> ClanAssignment or pending args
+        self.set_nodes(all_nodes, stakes)
 
-    def start_new_epoch(self, clan_size=3):
+    def set_nodes(self, all_nodes, stakes: Optional[Dict[str, int]] = None):
         """
-        Increments the epoch, randomizes 'all_nodes', splits them into clans of clan_size.
+        Replaces the node set (and stakes) for epochs started from now on.
+        """
+        self.all_nodes = list(all_nodes)
+        self.node_index = {n: i for i, n in enumerate(self.all_nodes)}
+        if len(self.node_index) != len(self.all_nodes):
+            raise ValueError("duplicate node ids")
+        stakes = stakes or {}
+        self.stakes = np.fromiter((stakes.get(n, 1) for n in self.all_nodes), dtype=np.int64,
+                                  count=len(self.all_nodes))
+
+    def start_new_epoch(self, clan_size=3, poh_hash: bytes = b"") -> int:
         """
+        Increments the epoch and fixes its seed from poh_hash. Its ceil(n / clan_size)
+        clans, of at most clan_size nodes each, are computed on first use.
+        """
+        if clan_size < 1:
+            raise ValueError("clan_size must be positive")
         self.current_epoch += 1
-        random.shuffle(self.all_nodes)
-        # chunk into groups
-        new_clans = []
-        for i in range(0, len(self.all_nodes), clan_size):
-            chunk = self.all_nodes[i:i+clan_size]
-            new_clans.append(chunk)
-        self.clans_by_epoch[self.current_epoch] = new_clans
-        print(f"[EpochManager] Starting epoch {self.current_epoch}, clans: {new_clans}")
+        self._epochs[self.current_epoch] = (bytes(poh_hash), clan_size, self.all_nodes,
+                                            self.node_index, self.stakes)
+        while len(self._epochs) > self.history:
+            self._epochs.popitem(last=False)
+        clans = -(-len(self.all_nodes) // clan_size)
+        print(f"[EpochManager] Starting epoch {self.current_epoch}: {len(self.all_nodes)} nodes "
+              f"in {clans} clans")
+        return self.current_epoch
+
+    def assignment(self, epoch: Optional[int] = None) -> ClanAssignment:
+        """
+        The clans of `epoch` (default: current); KeyError if it is outside the history.
+        """
+        epoch = self.current_epoch if epoch is None else epoch
+        entry = self._epochs[epoch]
+        if not isinstance(entry, ClanAssignment):
+            entry = self._epochs[epoch] = self._assign(epoch, *entry)
+        return entry
+
+    @staticmethod
+    def _assign(epoch: int, poh_hash: bytes, clan_size: int, node_ids, node_index, stakes) -> ClanAssignment:
+        n = len(node_ids)
+        clans = -(-n // clan_size)
+        bits = np.random.PCG64(epoch_seed(epoch, poh_hash))
+        keys = bits.random_raw(n)
+        dealt = np.argsort(keys)
+        ordered = keys[dealt]
+        if (ordered[1:] == ordered[:-1]).any():
+            dealt = np.argsort(keys, kind="stable")  # tied keys must break the same way everywhere
+        if n and stakes.min() != stakes.max():
+            dealt = dealt[np.argsort(-stakes[dealt], kind="stable")]
+        # Deal position p goes to lap p // clans, and within a lap to a clan picked by
+        # a seeded permutation. Laid out as a laps x clans grid, column c lists clan
+        # c's positions in order, so no sort is needed to group members
+        laps = -(-n // clans) if clans else 0
+        turns = bits.random_raw(laps * clans).reshape(laps, clans)
+        grid = np.argsort(turns, axis=1, kind="stable").astype(np.int64)
+        grid += np.arange(0, laps * clans, clans, dtype=np.int64)[:, None]
+        by_clan = grid.T.ravel()
+        by_clan = by_clan[by_clan < n]
+        members = dealt[by_clan].astype(np.int32)
+        sizes = (grid < n).sum(axis=0)
+        clan_of = np.empty(n, dtype=np.int32)
+        clan_of[members] = np.repeat(np.arange(clans, dtype=np.int32), sizes)
+        return ClanAssignment(epoch, node_ids, node_index, clan_of, members, stakes)
+
+    def clan_of(self, node_id: str, epoch: Optional[int] = None) -> int:
+        return self.assignment(epoch).clan_of_node(node_id)
+
+    def clan_members(self, clan: int, epoch: Optional[int] = None) -> List[str]:
+        return self.assignment(epoch).members_of(clan)
 
     def get_current_clans(self):
-        return self.clans_by_epoch.get(self.current_epoch, [])
+        if self.current_epoch not in self._epochs:
+            return []
+        return self.assignment().to_lists()
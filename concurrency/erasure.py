@@ -0,0 +1,194 @@
+# concurrency/erasure.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# GF(2^8) with the usual Reed-Solomon polynomial x^8 + x^4 + x^3 + x^2 + 1
+_POLY = 0x11D
+
+
+def _build_tables():
+    exp = np.zeros(512, dtype=np.uint8)
+    log = np.zeros(256, dtype=np.int64)
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= _POLY
+    exp[255:510] = exp[:255]
+    a = np.arange(256)
+    mul = exp[log[a][:, None] + log[a][None, :]]
+    mul[0, :] = 0
+    mul[:, 0] = 0
+    inv = np.zeros(256, dtype=np.uint8)
+    inv[1:] = exp[255 - log[1:]]
+    return mul, inv
+
+
+# GF_MUL[a] is the 256-byte "multiply by a" table, so a * shard is GF_MUL[a].take(shard)
+GF_MUL, GF_INV = _build_tables()
+
+
+def gf_matrix_inverse(matrix: np.ndarray) -> np.ndarray:
+    """
+    Gauss-Jordan inversion over GF(256); raises ValueError if singular.
+    """
+    n = len(matrix)
+    work = np.concatenate([matrix.astype(np.uint8), np.eye(n, dtype=np.uint8)], axis=1)
+    for col in range(n):
+        pivots = np.nonzero(work[col:, col])[0]
+        if not len(pivots):
+            raise ValueError("matrix is singular")
+        pivot = col + pivots[0]
+        if pivot != col:
+            work[[col, pivot]] = work[[pivot, col]]
+        work[col] = GF_MUL[GF_INV[work[col, col]]].take(work[col])
+        for row in range(n):
+            factor = work[row, col]
+            if row != col and factor:
+                work[row] ^= GF_MUL[factor].take(work[col])
+    return work[:, n:]
+
+
+def cauchy_matrix(rows: int, cols: int) -> np.ndarray:
+    """
+    rows x cols Cauchy matrix 1 / (x_i + y_j) with x_i = cols + i, y_j = j. Stacked
+    under an identity, every cols x cols submatrix is invertible, which is exactly the
+    "any k of the k + m shards" property.
+    """
+    x = np.arange(cols, cols + rows)[:, None]
+    y = np.arange(cols)[None, :]
+    return GF_INV[x ^ y]
+
+
+class ReedSolomon:
+    """
+    Systematic Reed-Solomon over GF(256): k data shards are the payload itself, and m
+    parity shards are Cauchy-matrix combinations of them. Any k of the k + m shards
+    reconstruct the payload.
+
+    Shard arithmetic is NumPy table lookups (a multiply is GF_MUL[c].take(row)) plus
+    XOR. Shards of at least parallel_threshold bytes are cut into column ranges that
+    run on a thread pool; take() and ^ release the GIL, so this scales across cores.
+    """
+
+    def __init__(self, k: int, m: int, max_workers: Optional[int] = None,
+                 parallel_threshold: int = 256 << 10):
+        if k < 1 or m < 0 or k + m > 256:
+            raise ValueError("need 1 <= k and k + m <= 256")
+        self.k = k
+        self.m = m
+        self.parity_matrix = cauchy_matrix(m, k)
+        self.generator = np.concatenate([np.eye(k, dtype=np.uint8), self.parity_matrix])
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self._pool = None
+        self._decoders: Dict[tuple, np.ndarray] = {}  # surviving shard set -> inverse
+
+    @property
+    def total(self) -> int:
+        return self.k + self.m
+
+    def shard_size(self, length: int) -> int:
+        return max(1, -(-length // self.k))
+
+    def encode(self, data) -> np.ndarray:
+        """
+        Returns a (k + m, shard_size) uint8 array; row i is shard i. The payload is
+        zero-padded to k * shard_size, so keep its length to decode.
+        """
+        size = self.shard_size(len(data))
+        shards = np.zeros((self.total, size), dtype=np.uint8)
+        flat = shards[: self.k].reshape(-1)
+        flat[: len(data)] = np.frombuffer(data, dtype=np.uint8)
+        if self.m:
+            self._combine(self.parity_matrix, list(shards[: self.k]), list(shards[self.k:]))
+        return shards
+
+    def decode(self, shards: Dict[int, object], length: int) -> bytes:
+        """
+        Rebuilds the payload from any k shards, given as {shard index: bytes-like}.
+        """
+        if len(shards) < self.k:
+            raise ValueError(f"need {self.k} shards, got {len(shards)}")
+        # Prefer data shards: each one present is a row we don't have to compute
+        chosen = sorted(shards, key=lambda i: (i >= self.k, i))[: self.k]
+        rows = [np.frombuffer(shards[i], dtype=np.uint8) for i in chosen]
+        size = len(rows[0])
+        if any(len(r) != size for r in rows):
+            raise ValueError("shards differ in size")
+
+        out = np.empty((self.k, size), dtype=np.uint8)
+        missing = [j for j in range(self.k) if j not in shards]
+        for j in range(self.k):
+            if j in shards:
+                out[j] = np.frombuffer(shards[j], dtype=np.uint8)
+        if missing:
+            key = tuple(chosen)
+            decoder = self._decoders.get(key)
+            if decoder is None:
+                if len(self._decoders) >= 1024:
+                    self._decoders.clear()
+                decoder = self._decoders[key] = gf_matrix_inverse(self.generator[chosen])
+            self._combine(decoder[missing], rows, [out[j] for j in missing])
+        return out.reshape(-1)[:length].tobytes()
+
+    def _combine(self, coeffs: np.ndarray, inputs: Sequence[np.ndarray], out_rows: List[np.ndarray]):
+        """
+        out_rows[i] = XOR_j coeffs[i, j] * inputs[j], written in place; large shards
+        are split into column ranges on the pool.
+        """
+        size = len(inputs[0])
+        workers = min(self.max_workers, size // self.parallel_threshold)
+        if workers <= 1:
+            _combine_range(coeffs, inputs, out_rows, 0, size)
+            return
+        step = -(-size // workers)
+        step += -step % 4096  # page-aligned column ranges
+        pool = self.executor()
+        futures = [
+            pool.submit(_combine_range, coeffs, inputs, out_rows, lo, min(lo + step, size))
+            for lo in range(0, size, step)
+        ]
+        for fut in futures:
+            fut.result()
+
+    def executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="erasure")
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+_BLOCK = 32 << 10
+
+
+def _combine_range(coeffs: np.ndarray, inputs, out_rows: List[np.ndarray], lo: int, hi: int):
+    # Work through the columns in cache-sized blocks so every input block is reused
+    # for all output rows while it is still in cache
+    coeff_rows = [row.tolist() for row in coeffs]
+    tmp = np.empty(min(_BLOCK, hi - lo), dtype=np.uint8)
+    for start in range(lo, hi, _BLOCK):
+        end = min(start + _BLOCK, hi)
+        scratch = tmp[: end - start]
+        for row, acc in zip(coeff_rows, out_rows):
+            acc = acc[start:end]
+            acc[:] = 0
+            for j, c in enumerate(row):
+                if c == 0:
+                    continue
+                src = inputs[j][start:end]
+                if c == 1:
+                    acc ^= src
+                else:
+                    GF_MUL[c].take(src, out=scratch)
+                    acc ^= scratch
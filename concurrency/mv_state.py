@@ -0,0 +1,119 @@
+# concurrency/mv_state.py
+
+import threading
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (writer position in the block, incarnation) -- None means "read from base state"
+Version = Optional[Tuple[int, int]]
+
+
+class MultiVersionState:
+    """
+    A per-block multi-version view over an AccountState, as used by Block-STM.
+
+    Every transaction incarnation writes its own version of a key, tagged with its
+    position in the block. A read by transaction i sees the version written by the
+    highest position below i, or falls through to the base AccountState. Keeping all
+    versions lets speculative transactions run out of order and be validated later.
+    """
+
+    def __init__(self, base_state):
+        self.base = base_state
+        self._values: Dict[str, Dict[int, Tuple[int, object]]] = {}  # key -> {pos: (incarnation, value)}
+        self._writers: Dict[str, List[int]] = {}  # key -> sorted positions with a version
+        self._lock = threading.Lock()
+
+    def read(self, key: str, txn_idx: int) -> Tuple[Version, object]:
+        with self._lock:
+            writers = self._writers.get(key)
+            if writers:
+                i = bisect_left(writers, txn_idx)
+                if i:
+                    pos = writers[i - 1]
+                    incarnation, value = self._values[key][pos]
+                    return (pos, incarnation), value
+        return None, self.base.read(key)
+
+    def record(self, txn_idx: int, incarnation: int, updates: Dict, prev_keys: Iterable[str]):
+        """
+        Publishes one incarnation's writes and drops versions for keys the previous
+        incarnation wrote but this one didn't.
+        """
+        with self._lock:
+            for key, value in updates.items():
+                versions = self._values.get(key)
+                if versions is None:
+                    versions = self._values[key] = {}
+                    self._writers[key] = []
+                if txn_idx not in versions:
+                    insort(self._writers[key], txn_idx)
+                versions[txn_idx] = (incarnation, value)
+            for key in prev_keys:
+                if key not in updates:
+                    self._remove(key, txn_idx)
+
+    def _remove(self, key: str, txn_idx: int):
+        versions = self._values.get(key)
+        if versions and versions.pop(txn_idx, None) is not None:
+            writers = self._writers[key]
+            del writers[bisect_left(writers, txn_idx)]
+
+    def validate(self, txn_idx: int, read_set: Dict[str, Version]) -> bool:
+        """
+        True if every key the transaction read would still resolve to the same version.
+        """
+        for key, version in read_set.items():
+            if self.read(key, txn_idx)[0] != version:
+                return False
+        return True
+
+    def final_writes(self) -> Dict:
+        """
+        The last version of every key written in the block, i.e. the post-block delta.
+        """
+        out = {}
+        for key, writers in self._writers.items():
+            if writers:
+                out[key] = self._values[key][writers[-1]][1]
+        return out
+
+    def commit(self) -> Dict:
+        writes = self.final_writes()
+        for key, value in writes.items():
+            self.base.write(key, value)
+        return writes
+
+
+class TrackedReads(Mapping):
+    """
+    The read_data handed to a speculative action_fn. It exposes exactly the declared
+    read keys (like the dict the lock-based engine builds), but resolves each one lazily
+    against the multi-version state and remembers the version actually observed, so
+    declared-but-unused keys never cause a re-execution.
+    """
+
+    __slots__ = ("_mv", "_txn_idx", "_declared", "read_set")
+
+    def __init__(self, mv: MultiVersionState, txn_idx: int, declared):
+        self._mv = mv
+        self._txn_idx = txn_idx
+        self._declared = declared
+        self.read_set: Dict[str, Version] = {}
+
+    def __getitem__(self, key):
+        if key not in self._declared:
+            raise KeyError(key)
+        version, value = self._mv.read(key, self._txn_idx)
+        self.read_set[key] = version
+        return value
+
+    def __contains__(self, key):
+        return key in self._declared
+
+    def __iter__(self):
+        return iter(self._declared)
+
+    def __len__(self):
+        return len(self._declared)
@@ -0,0 +1,183 @@
+# concurrency/ops.py
+
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, Sequence, Set, Tuple
+
+from concurrency.codec import CodecError, decode_value, encode_value, pack_vstr, unpack_vstr
+
+
+class OpError(ValueError):
+    """
+    Raised when a declarative op can't be applied; the transaction fails without writes.
+    """
+
+
+def _check_amount(amount):
+    if type(amount) not in (int, float) or amount < 0:
+        raise ValueError(f"op amount must be a non-negative number, got {amount!r}")
+
+
+@dataclass(frozen=True)
+class Credit:
+    key: str
+    amount: int
+
+    def __post_init__(self):
+        _check_amount(self.amount)
+
+
+@dataclass(frozen=True)
+class Debit:
+    key: str
+    amount: int
+
+    def __post_init__(self):
+        _check_amount(self.amount)
+
+
+@dataclass(frozen=True)
+class Transfer:
+    src: str
+    dst: str
+    amount: int
+
+    def __post_init__(self):
+        _check_amount(self.amount)
+
+
+@dataclass(frozen=True)
+class SetValue:
+    key: str
+    value: Any
+
+
+@dataclass(frozen=True)
+class CompareAndSet:
+    key: str
+    expected: Any
+    new: Any
+
+
+def op_keys(op) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    (read_keys, write_keys) of a single op.
+    """
+    if isinstance(op, Transfer):
+        return (op.src, op.dst), (op.src, op.dst)
+    if isinstance(op, (Credit, Debit, CompareAndSet)):
+        return (op.key,), (op.key,)
+    if isinstance(op, SetValue):
+        return (), (op.key,)
+    raise TypeError(f"unknown op {op!r}")
+
+
+def ops_access_lists(ops: Sequence) -> Tuple[Set[str], Set[str]]:
+    reads, writes = set(), set()
+    for op in ops:
+        r, w = op_keys(op)
+        reads.update(r)
+        writes.update(w)
+    return reads, writes
+
+
+def insufficient_funds(key, balance, amount) -> OpError:
+    # Shared with the vectorized executor so both paths report identical errors
+    return OpError(f"insufficient funds: {key} has {balance}, needs {amount}")
+
+
+def apply_ops(ops: Sequence, read_data: Dict) -> Dict:
+    """
+    The action_fn of an op-based transaction: applies the ops in order against
+    read_data and returns the writes. Any failing op fails the whole transaction.
+    """
+    updates = {}
+
+    def current(key):
+        if key in updates:
+            return updates[key]
+        return read_data.get(key, 0)
+
+    for op in ops:
+        if isinstance(op, Credit):
+            updates[op.key] = current(op.key) + op.amount
+        elif isinstance(op, Debit):
+            bal = current(op.key)
+            if bal < op.amount:
+                raise insufficient_funds(op.key, bal, op.amount)
+            updates[op.key] = bal - op.amount
+        elif isinstance(op, Transfer):
+            bal = current(op.src)
+            if bal < op.amount:
+                raise insufficient_funds(op.src, bal, op.amount)
+            updates[op.src] = bal - op.amount
+            updates[op.dst] = current(op.dst) + op.amount
+        elif isinstance(op, SetValue):
+            updates[op.key] = op.value
+        elif isinstance(op, CompareAndSet):
+            cur = current(op.key)
+            if cur != op.expected:
+                raise OpError(f"compare-and-set failed on {op.key}: expected {op.expected!r}, found {cur!r}")
+            updates[op.key] = op.new
+        else:
+            raise TypeError(f"unknown op {op!r}")
+    return updates
+
+
+def ops_action(ops: Sequence):
+    """
+    A picklable action_fn for a tuple of ops.
+    """
+    return partial(apply_ops, tuple(ops))
+
+
+# Wire tags for encode_op / decode_op; never renumber, only append
+_OP_TAGS = {Credit: 1, Debit: 2, Transfer: 3, SetValue: 4, CompareAndSet: 5}
+_OP_TYPES = {tag: cls for cls, tag in _OP_TAGS.items()}
+
+
+def encode_op(op) -> bytes:
+    """
+    One op as a tag byte followed by its fields: keys as varint-length strings,
+    amounts and values in the concurrency.codec value encoding.
+    """
+    tag = _OP_TAGS.get(type(op))
+    if tag is None:
+        raise CodecError(f"cannot encode op {op!r}")
+    out = bytearray((tag,))
+    if tag == 3:
+        out += pack_vstr(op.src)
+        out += pack_vstr(op.dst)
+        out += encode_value(op.amount)
+    elif tag == 4:
+        out += pack_vstr(op.key)
+        out += encode_value(op.value)
+    elif tag == 5:
+        out += pack_vstr(op.key)
+        out += encode_value(op.expected)
+        out += encode_value(op.new)
+    else:
+        out += pack_vstr(op.key)
+        out += encode_value(op.amount)
+    return bytes(out)
+
+
+def decode_op(buf, offset: int):
+    """
+    Returns (op, offset after it).
+    """
+    cls = _OP_TYPES.get(buf[offset])
+    if cls is None:
+        raise CodecError(f"unknown op tag {buf[offset]} at offset {offset}")
+    offset += 1
+    if cls is Transfer:
+        src, offset = unpack_vstr(buf, offset)
+        dst, offset = unpack_vstr(buf, offset)
+        amount, offset = decode_value(buf, offset)
+        return Transfer(src, dst, amount), offset
+    key, offset = unpack_vstr(buf, offset)
+    first, offset = decode_value(buf, offset)
+    if cls is CompareAndSet:
+        new, offset = decode_value(buf, offset)
+        return CompareAndSet(key, first, new), offset
+    return cls(key, first), offset
@@ -0,0 +1,143 @@
+# concurrency/optimistic_engine.py
+
+import copy
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from concurrency.concurrency_engine import record_block_metrics
+from concurrency.mv_state import MultiVersionState, TrackedReads
+
+
+class OptimisticConcurrencyEngine:
+    """
+    A Block-STM style alternative to ConcurrencyEngine for blocks whose access lists
+    can't be trusted. Declared keys are only used to limit what action_fn may read;
+    scheduling is driven by what transactions actually read and write.
+
+    Each round executes every pending transaction speculatively against a
+    MultiVersionState, then validates the block in order: a transaction whose reads
+    no longer resolve to the versions it saw is re-executed in the next round. The
+    lowest invalid transaction always reads a final prefix when it re-runs, so every
+    round finalizes at least one more transaction and the end state is exactly that
+    of serial execution in block order.
+    """
+
+    def __init__(self, account_state, max_workers: Optional[int] = None):
+        self.account_state = account_state
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.last_report = {}
+        self.last_dirty_keys = set()
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="optimistic-engine"
+            )
+        return self._pool
+
+    def bind(self, account_state):
+        """
+        A view of this engine that executes against another state (e.g. a fork from
+        AccountState.fork()) while sharing the worker pool.
+        """
+        self._get_pool()
+        bound = copy.copy(self)
+        bound.account_state = account_state
+        return bound
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def execute_block_of_transactions(self, tx_list: List, use_multithreading=True):
+        """
+        Same contract as ConcurrencyEngine: returns {tx_id: (ok, updates_or_error)}
+        and leaves account_state as if tx_list had run serially.
+        """
+        started = time.perf_counter()
+        n = len(tx_list)
+        mv = MultiVersionState(self.account_state)
+        incarnations = [0] * n
+        read_sets = [None] * n
+        outcomes = [None] * n
+        written = [()] * n
+
+        def execute(idx):
+            tx = tx_list[idx]
+            incarnation = incarnations[idx]
+            reads = TrackedReads(mv, idx, tx.read_keys)
+            try:
+                updates = tx.action_fn(reads)
+                outcome = (True, updates)
+            except Exception as e:
+                updates = {}
+                outcome = (False, str(e))
+            mv.record(idx, incarnation, updates, written[idx])
+            written[idx] = tuple(updates)
+            read_sets[idx] = reads.read_set
+            outcomes[idx] = outcome
+            incarnations[idx] = incarnation + 1
+
+        def execute_stride(indexes):
+            for idx in indexes:
+                execute(idx)
+
+        pending = list(range(n))
+        rounds = executions = 0
+        while pending:
+            rounds += 1
+            ready = self._ready(mv, pending, read_sets) if rounds > 1 else pending
+            executions += len(ready)
+            if use_multithreading and self.max_workers > 1 and len(ready) > 1:
+                # Strided split keeps every worker moving through the block in order,
+                # so low positions publish their writes early in the round.
+                workers = min(self.max_workers, len(ready))
+                pool = self._get_pool()
+                futures = [pool.submit(execute_stride, ready[w::workers]) for w in range(workers)]
+                for fut in futures:
+                    fut.result()
+            else:
+                execute_stride(ready)
+
+            # Everything before the lowest pending position was final already
+            pending = [
+                idx for idx in range(pending[0], n)
+                if not mv.validate(idx, read_sets[idx])
+            ]
+
+        self.last_dirty_keys = set(mv.commit())
+        results = {tx.tx_id: outcomes[i] for i, tx in enumerate(tx_list)}
+        self.last_report = {
+            "txs": n,
+            "rounds": rounds,
+            "executions": executions,
+            "re_executions": executions - n,
+            "elapsed_s": time.perf_counter() - started,
+        }
+        record_block_metrics(self.last_report, results)
+        return results
+
+    @staticmethod
+    def _ready(mv: MultiVersionState, pending: List[int], read_sets: List) -> List[int]:
+        """
+        Invalid transactions worth re-running now. One that read a key currently owned
+        by a lower, still-invalid transaction will almost surely fail validation again,
+        so it waits for that writer (the role ESTIMATE markers play in Block-STM).
+        The lowest pending transaction is always ready, which guarantees progress.
+        """
+        pending_set = set(pending)
+        ready = []
+        for idx in pending:
+            blocked = False
+            for key in read_sets[idx]:
+                version = mv.read(key, idx)[0]
+                if version is not None and version[0] in pending_set:
+                    blocked = True
+                    break
+            if not blocked:
+                ready.append(idx)
+        return ready
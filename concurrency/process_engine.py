@@ -0,0 +1,406 @@
+# concurrency/process_engine.py
+
+import multiprocessing
+import os
+import pickle
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+from concurrency.access_lists import AccessListScheduler
+from concurrency.concurrency_engine import record_block_metrics
+from concurrency.state_commitment import dirty_keys_of
+from concurrency.transaction import Transaction
+from concurrency.tx_batch import TransactionBatch
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+TAG_OTHER = 0  # absent, or a non-integer value held by the owning shard
+TAG_INT = 1    # integer balance stored in shared memory
+
+
+def shard_of(key: str, num_shards: int) -> int:
+    # Python's hash() is salted per process, so use a stable hash for routing
+    return zlib.crc32(key.encode("utf-8")) % num_shards
+
+
+def _is_int64(value) -> bool:
+    return type(value) is int and INT64_MIN <= value <= INT64_MAX
+
+
+class SharedBalances:
+    """
+    A fixed-capacity block of shared memory holding int64 balances plus a one-byte
+    tag per slot. Parent and shard workers map the same segment, so numeric balances
+    never have to be pickled across the process boundary.
+    """
+
+    def __init__(self, capacity: int, name: Optional[str] = None):
+        self.capacity = capacity
+        size = capacity * 9
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self._raw_values = self.shm.buf[: capacity * 8]
+        self.values = self._raw_values.cast("q")
+        self.tags = self.shm.buf[capacity * 8: size]
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.values.release()
+        self._raw_values.release()
+        self.tags.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _shard_worker(conn, shard_id: int, num_shards: int, shm_name: str, capacity: int):
+    """
+    Worker loop for one shard. It owns every key with shard_of(key) == shard_id:
+    integer balances live in shared memory, anything else in a local dict.
+    """
+    balances = SharedBalances(capacity, name=shm_name)
+    extra = {}
+    staged = {}
+    wave = None
+    written = set()  # keys applied during `wave`
+
+    def enter_wave(w):
+        nonlocal wave
+        if w != wave:
+            wave = w
+            written.clear()
+
+    def read(key, slot):
+        if balances.tags[slot] == TAG_INT:
+            return balances.values[slot]
+        return extra.get(key, 0)
+
+    def apply(key, slot, value):
+        if _is_int64(value):
+            balances.values[slot] = value
+            balances.tags[slot] = TAG_INT
+            extra.pop(key, None)
+        else:
+            extra[key] = value
+            balances.tags[slot] = TAG_OTHER
+        written.add(key)
+
+    while True:
+        msg = conn.recv()
+        kind = msg[0]
+        if kind == "exec":
+            # msg[1]: wave number, msg[2]: TransactionBatch buffer of op-based
+            # transactions, msg[3]: their slot maps, msg[4]: pickled
+            # (tx_id, action_fn, read_keys, slots) closures
+            enter_wave(msg[1])
+            jobs = []
+            if msg[2]:
+                for view, slots in zip(TransactionBatch(msg[2]), msg[3]):
+                    tx = Transaction.decode(view)
+                    jobs.append((tx.tx_id, tx.action_fn, tx.read_keys, slots))
+            jobs.extend(pickle.loads(payload) for payload in msg[4])
+            replies = []
+            for tx_id, action_fn, read_keys, slots in jobs:
+                try:
+                    updates = action_fn({k: read(k, slots[k]) for k in read_keys})
+                except Exception as e:
+                    replies.append((tx_id, False, str(e)))
+                    continue
+                if any(k not in slots or shard_of(k, num_shards) != shard_id for k in updates):
+                    # Wrote outside its declared shard: hand it back for a coordinated commit
+                    replies.append((tx_id, "escalate", updates))
+                    continue
+                int_keys, others = [], {}
+                for k, v in updates.items():
+                    apply(k, slots[k], v)
+                    if _is_int64(v):
+                        int_keys.append(k)
+                    else:
+                        others[k] = v
+                replies.append((tx_id, True, (int_keys, others)))
+            conn.send(replies)
+        elif kind == "load":
+            for key, value in msg[1]:
+                extra[key] = value
+        elif kind == "prepare":
+            # msg[1]: wave number, msg[2]: {tx_id: [(key, slot, value), ...]} in commit
+            # priority order. Vote no for a transaction whose writes hit a key already
+            # written in this wave or staged by an earlier one: its values were
+            # computed from the state at the start of the wave and would overwrite
+            # that write
+            enter_wave(msg[1])
+            rejected = []
+            claimed = set()
+            for tx_id, writes in msg[2].items():
+                if any(k in written or k in claimed for k, _, _ in writes):
+                    rejected.append(tx_id)
+                else:
+                    staged[tx_id] = writes
+                    claimed.update(k for k, _, _ in writes)
+            conn.send(rejected)
+        elif kind == "commit":
+            for tx_id in msg[1]:
+                for key, slot, value in staged.pop(tx_id, ()):
+                    apply(key, slot, value)
+            staged.clear()
+            conn.send(True)
+        elif kind == "remap":
+            balances.close()
+            balances = SharedBalances(msg[2], name=msg[1])
+            conn.send(True)
+        elif kind == "stop":
+            balances.close()
+            conn.close()
+            return
+
+
+class ShardedProcessEngine:
+    """
+    Runs blocks on worker processes so action_fn bodies aren't serialized by the GIL.
+
+    AccountState keys are sharded by a stable hash over num_shards worker processes.
+    Each conflict-free wave (see access_lists.py) is split by owner: a transaction
+    whose keys all live on one shard is shipped to that shard and run there, while
+    cross-shard transactions run in the parent and are committed with a prepare /
+    commit round to every shard they touch. So are transactions a shard hands back
+    because they wrote outside their declared keys; those can collide with a write
+    made earlier in the wave, and any shard that sees such a collision votes no and
+    the transaction aborts on all of them. Integer balances are exchanged through a
+    shared-memory table; only keys and non-numeric values travel over the pipes.
+
+    The parent keeps account_state up to date after every wave, so callers see the
+    same state and the same results dict as with ConcurrencyEngine. Keys are loaded
+    into the shards the first time a block touches them; if account_state is written
+    behind the engine's back afterwards, call resync().
+
+    Op-based transactions travel in a TransactionBatch (their canonical encoding).
+    Other transactions need a picklable action_fn to leave the parent (a module-level
+    function or a functools.partial over one); closures run in the parent like
+    cross-shard work.
+    """
+
+    def __init__(self, account_state, num_shards: Optional[int] = None, capacity: int = 1 << 16,
+                 mp_context: str = "spawn"):
+        self.account_state = account_state
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.scheduler = AccessListScheduler()
+        self.last_report = {}
+        self.last_dirty_keys = set()
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._balances = SharedBalances(capacity)
+        self._slots: Dict[str, int] = {}
+        self._loaded = set()  # keys whose current value the shards hold
+        self._wave_counter = 0
+        self._conns = []
+        self._procs = []
+        for shard_id in range(self.num_shards):
+            parent_conn, child_conn = self._ctx.Pipe()
+            proc = self._ctx.Process(
+                target=_shard_worker,
+                args=(child_conn, shard_id, self.num_shards, self._balances.name, capacity),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._procs.append(proc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def shutdown(self):
+        for conn in self._conns:
+            try:
+                conn.send(("stop",))
+                conn.close()
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+        self._conns, self._procs = [], []
+        if self._balances is not None:
+            self._balances.close()
+            self._balances = None
+
+    def resync(self, keys=None):
+        """
+        Forgets the shard copies of keys (all keys if None) so the next block reloads
+        them from account_state.
+        """
+        if keys is None:
+            self._loaded.clear()
+        else:
+            for key in keys:
+                self._loaded.discard(key)
+
+    def _slot_for(self, key: str, loads: Dict[int, list]) -> int:
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self._slots)
+            if slot >= self._balances.capacity:
+                self._grow()
+            self._slots[key] = slot
+        if key not in self._loaded:
+            self._loaded.add(key)
+            value = self.account_state.read(key)
+            if _is_int64(value):
+                self._balances.values[slot] = value
+                self._balances.tags[slot] = TAG_INT
+            else:
+                self._balances.tags[slot] = TAG_OTHER
+                loads.setdefault(shard_of(key, self.num_shards), []).append((key, value))
+        return slot
+
+    def _grow(self):
+        old = self._balances
+        new = SharedBalances(old.capacity * 2)
+        new.values[: old.capacity] = old.values
+        new.tags[: old.capacity] = old.tags
+        for conn in self._conns:
+            conn.send(("remap", new.name, new.capacity))
+        for conn in self._conns:
+            conn.recv()
+        self._balances = new
+        old.close()
+
+    def _read_parent(self, key: str):
+        # Parent-side view: account_state is current as of the start of the wave
+        return self.account_state.read(key)
+
+    def execute_block_of_transactions(self, tx_list: List, use_multithreading=True):
+        """
+        Returns {tx_id: (ok, updates_or_error)}, the same shape as ConcurrencyEngine.
+        """
+        started = time.perf_counter()
+        results = {}
+        schedule = self.scheduler.schedule(tx_list)
+        shipped = coordinated = aborted = 0
+
+        for wave in schedule.waves:
+            self._wave_counter += 1  # numbers waves across blocks, for the shards' conflict check
+            loads: Dict[int, list] = {}
+            groups: Dict[int, tuple] = {}  # shard -> (op txs, their slots, pickled closures)
+            local = []
+            for pos in wave:
+                tx = tx_list[pos]
+                keys = tx.read_keys | tx.write_keys
+                slots = {k: self._slot_for(k, loads) for k in keys}
+                owners = {shard_of(k, self.num_shards) for k in keys}
+                if use_multithreading and len(owners) == 1:
+                    group = groups.setdefault(owners.pop(), ([], [], []))
+                    if getattr(tx, "ops", None) is not None:
+                        # Op-based: ships as its canonical encoding, no pickling
+                        group[0].append(tx)
+                        group[1].append(slots)
+                        continue
+                    try:
+                        group[2].append(pickle.dumps((tx.tx_id, tx.action_fn, tuple(tx.read_keys), slots)))
+                    except Exception:
+                        local.append(tx)
+                else:
+                    local.append(tx)
+
+            for shard_id, batch in loads.items():
+                self._conns[shard_id].send(("load", batch))
+            loads.clear()
+            for shard_id, (op_txs, op_slots, pickled) in groups.items():
+                buffer = TransactionBatch.from_transactions(op_txs).buffer if op_txs else b""
+                self._conns[shard_id].send(("exec", self._wave_counter, buffer, op_slots, pickled))
+            shipped += sum(len(g[0]) + len(g[2]) for g in groups.values())
+
+            # Overlap: run cross-shard / unpicklable transactions here while shards work.
+            # They go first in pending_commit: their declared keys can't collide, so
+            # only escalated transactions, added after them, can be voted down
+            pending_commit = {}
+            for tx in local:
+                try:
+                    updates = tx.action_fn({k: self._read_parent(k) for k in tx.read_keys})
+                except Exception as e:
+                    results[tx.tx_id] = (False, str(e))
+                    continue
+                pending_commit[tx.tx_id] = updates
+
+            wave_updates = []
+            for shard_id in groups:
+                for tx_id, ok, payload in self._conns[shard_id].recv():
+                    if ok == "escalate":
+                        pending_commit[tx_id] = payload
+                    elif ok:
+                        int_keys, others = payload
+                        updates = {k: self._balances.values[self._slots[k]] for k in int_keys}
+                        updates.update(others)
+                        results[tx_id] = (True, updates)
+                        wave_updates.append(updates)
+                    else:
+                        results[tx_id] = (False, payload)
+
+            if pending_commit:
+                coordinated += len(pending_commit)
+                committed = self._two_phase_commit(pending_commit, loads, self._wave_counter)
+                for tx_id, updates in pending_commit.items():
+                    if tx_id in committed:
+                        results[tx_id] = (True, updates)
+                        wave_updates.append(updates)
+                    else:
+                        aborted += 1
+                        results[tx_id] = (False, "cross-shard commit aborted: conflicting write in the same wave")
+
+            for updates in wave_updates:
+                for k, v in updates.items():
+                    self.account_state.write(k, v)
+
+        self.last_dirty_keys = dirty_keys_of(results)
+        self.last_report = {
+            "txs": len(tx_list),
+            "waves": len(schedule.waves),
+            "shipped_to_shards": shipped,
+            "coordinated_commits": coordinated,
+            "aborted_commits": aborted,
+            "elapsed_s": time.perf_counter() - started,
+        }
+        record_block_metrics(self.last_report, results)
+        return results
+
+    def _two_phase_commit(self, pending: Dict[str, Dict], loads: Dict[int, list], wave: int) -> set:
+        """
+        Prepare every participating shard with its slice of the writes, then commit the
+        transactions no shard rejected; the rest abort everywhere. Returns the
+        committed tx_ids.
+        """
+        per_shard: Dict[int, Dict[str, list]] = {}
+        for tx_id, updates in pending.items():
+            for key, value in updates.items():
+                slot = self._slot_for(key, loads)
+                per_shard.setdefault(shard_of(key, self.num_shards), {}).setdefault(tx_id, []).append(
+                    (key, slot, value)
+                )
+        for shard_id, batch in loads.items():
+            # Keys first seen in these writes
+            self._conns[shard_id].send(("load", batch))
+        loads.clear()
+
+        for shard_id, writes in per_shard.items():
+            self._conns[shard_id].send(("prepare", wave, writes))
+        rejected = set()
+        for shard_id in per_shard:
+            rejected.update(self._conns[shard_id].recv())
+
+        committed = set(pending) - rejected
+        for shard_id in per_shard:
+            self._conns[shard_id].send(("commit", [t for t in per_shard[shard_id] if t in committed]))
+        for shard_id in per_shard:
+            self._conns[shard_id].recv()
+        return committed
@@ -0,0 +1,35 @@
+# concurrency/signatures.py
+
+from typing import Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+# Ed25519 (RFC 8032) via the `cryptography` package
+PUBLIC_KEY_SIZE = 32
+SIGNATURE_SIZE = 64
+
+
+def generate_keypair() -> Tuple[Ed25519PrivateKey, bytes]:
+    """
+    Returns (private key, raw 32-byte public key).
+    """
+    key = Ed25519PrivateKey.generate()
+    return key, public_key_bytes(key)
+
+
+def public_key_bytes(private_key: Ed25519PrivateKey) -> bytes:
+    return private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+
+
+def sign(private_key: Ed25519PrivateKey, message: bytes) -> bytes:
+    return private_key.sign(message)
+
+
+def verify(public_key: bytes, signature: bytes, message: bytes) -> bool:
+    try:
+        Ed25519PublicKey.from_public_bytes(public_key).verify(signature, message)
+        return True
+    except (InvalidSignature, ValueError):
+        return False
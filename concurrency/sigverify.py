@@ -0,0 +1,137 @@
+# concurrency/sigverify.py
+
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from concurrency.signatures import verify
+
+
+_VALID, _INVALID, _DUPLICATE = "valid", "invalid", "duplicate"
+
+
+def verify_batch(items: Sequence[Tuple[bytes, bytes, bytes]]) -> List[bool]:
+    """
+    Verifies (public key, signature, message) triples; runs in a pool worker.
+    """
+    return [verify(pub, sig, msg) for pub, sig, msg in items]
+
+
+@dataclass
+class SigVerifyResult:
+    valid: List = field(default_factory=list)       # in input order
+    invalid: List = field(default_factory=list)     # bad or missing signature
+    duplicates: List = field(default_factory=list)  # repeats of an earlier transaction in the input
+    cache_hits: int = 0
+    verified: int = 0                               # signatures actually checked
+
+
+class SigVerifier:
+    """
+    The pre-execution signature check: only what comes out as valid should reach the
+    ConcurrencyEngine.
+
+    For each batch of transactions:
+      1. repeats of a signed transaction already seen in the batch are dropped
+      2. transactions whose signature was verified recently are accepted from an LRU
+         cache, so a fallback re-proposal isn't verified twice
+      3. the rest are split into chunks of batch_size and verified on a process pool
+         (Ed25519 verification holds the GIL, so threads wouldn't help); with
+         max_workers <= 1 they are verified inline
+
+    Dedup and cache are keyed by tx_hash -- the hash of the signed encoding, which
+    covers the signature, the signer and the signed message -- so a signature can't
+    be replayed from the cache under a different message. Only successful
+    verifications are cached. Unsigned transactions are invalid unless
+    require_signatures is False, in which case they pass through unchecked.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, batch_size: int = 256,
+                 cache_size: int = 1 << 18, require_signatures: bool = True,
+                 mp_context: str = "spawn"):
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.require_signatures = require_signatures
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._pool = None
+        self._cache: "OrderedDict[bytes, None]" = OrderedDict()
+        self.stats = {"valid": 0, "invalid": 0, "duplicates": 0, "cache_hits": 0, "verified": 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._ctx)
+        return self._pool
+
+    def _verify_all(self, items: List[Tuple[bytes, bytes, bytes]]) -> List[bool]:
+        if not items:
+            return []
+        size = self.batch_size
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        if self.max_workers <= 1 or len(chunks) <= 1:
+            return [ok for chunk in chunks for ok in verify_batch(chunk)]
+        return [ok for oks in self._executor().map(verify_batch, chunks) for ok in oks]
+
+    def filter(self, txs: Sequence) -> SigVerifyResult:
+        result = SigVerifyResult()
+        cache = self._cache
+        seen = set()
+        decided: List[Optional[str]] = []  # per tx: _VALID / _INVALID / _DUPLICATE, None = verify
+        pending = []
+        for tx in txs:
+            if not tx.is_signed:
+                decided.append(_INVALID if self.require_signatures else _VALID)
+                continue
+            key = tx.tx_hash
+            if key in seen:
+                decided.append(_DUPLICATE)
+                continue
+            seen.add(key)
+            if key in cache:
+                cache.move_to_end(key)
+                result.cache_hits += 1
+                decided.append(_VALID)
+                continue
+            decided.append(None)
+            pending.append((tx.signer, tx.signature, tx.signing_bytes()))
+
+        checked = iter(self._verify_all(pending))
+        result.verified = len(pending)
+        lists = {_VALID: result.valid, _INVALID: result.invalid, _DUPLICATE: result.duplicates}
+        for tx, outcome in zip(txs, decided):
+            if outcome is None:
+                outcome = _VALID if next(checked) else _INVALID
+                if outcome is _VALID:
+                    self._remember(tx.tx_hash)
+            lists[outcome].append(tx)
+
+        stats = self.stats
+        stats["valid"] += len(result.valid)
+        stats["invalid"] += len(result.invalid)
+        stats["duplicates"] += len(result.duplicates)
+        stats["cache_hits"] += result.cache_hits
+        stats["verified"] += result.verified
+        return result
+
+    def _remember(self, key: bytes):
+        cache = self._cache
+        cache[key] = None
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
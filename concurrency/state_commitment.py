@@ -0,0 +1,261 @@
+# concurrency/state_commitment.py
+
+import hashlib
+import os
+from bisect import bisect_left
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+KEY_BITS = 256
+EMPTY_HASH = bytes(32)
+
+
+def _sha256(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def key_path(key: str) -> int:
+    return int.from_bytes(_sha256(key.encode("utf-8")), "big")
+
+
+def _bit(path: int, depth: int) -> int:
+    return (path >> (KEY_BITS - 1 - depth)) & 1
+
+
+def value_hash(value) -> bytes:
+    """
+    Type-tagged so that 1, "1" and True commit to different leaves.
+    """
+    if isinstance(value, bool):
+        data = b"b" + (b"1" if value else b"0")
+    elif isinstance(value, int):
+        data = b"i" + str(value).encode()
+    elif isinstance(value, float):
+        data = b"f" + repr(value).encode()
+    elif isinstance(value, str):
+        data = b"s" + value.encode("utf-8")
+    elif isinstance(value, bytes):
+        data = b"y" + value
+    else:
+        data = b"r" + repr(value).encode("utf-8")
+    return _sha256(data)
+
+
+def leaf_hash(path: int, vhash: bytes) -> bytes:
+    return _sha256(b"\x00" + path.to_bytes(32, "big") + vhash)
+
+
+def branch_hash(left: Optional[bytes], right: Optional[bytes]) -> bytes:
+    return _sha256(b"\x01" + (left or EMPTY_HASH) + (right or EMPTY_HASH))
+
+
+class _Leaf:
+    __slots__ = ("path", "key", "vhash", "hash")
+
+    def __init__(self, path: int, key: str, vhash: bytes):
+        self.path = path
+        self.key = key
+        self.vhash = vhash
+        self.hash = leaf_hash(path, vhash)
+
+
+class _Branch:
+    __slots__ = ("left", "right", "hash")
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.hash = branch_hash(left.hash if left else None, right.hash if right else None)
+
+
+def _join(left, right):
+    # Canonical form: an empty subtree is None and a subtree holding one leaf *is* that
+    # leaf, so the root depends only on the set of leaves, not on update order.
+    if left is None and isinstance(right, _Leaf):
+        return right
+    if right is None and isinstance(left, _Leaf):
+        return left
+    if left is None and right is None:
+        return None
+    return _Branch(left, right)
+
+
+def _first_with_bit(items: List[Tuple[int, str, bytes]], depth: int) -> int:
+    # Items sorted by path share their bits above depth, so those with bit `depth`
+    # set form a suffix; binary search for where it starts
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _bit(items[mid][0], depth):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _update(node, items: List[Tuple[int, str, bytes]], depth: int):
+    """
+    Returns a new subtree with items (sorted by path, all under this subtree) applied.
+    Untouched subtrees are shared with the old tree, so cost is O(len(items) * height).
+    """
+    if not items:
+        return node
+    if isinstance(node, _Leaf):
+        if not any(path == node.path for path, _, _ in items):
+            pos = bisect_left(items, (node.path,))  # (path,) sorts before (path, key, vhash)
+            items = items[:pos] + [(node.path, node.key, node.vhash)] + items[pos:]
+        node = None
+    if node is None and len(items) == 1:
+        return _Leaf(*items[0])
+    split = _first_with_bit(items, depth)
+    left = _update(node.left if node else None, items[:split], depth + 1)
+    right = _update(node.right if node else None, items[split:], depth + 1)
+    return _join(left, right)
+
+
+@dataclass
+class MerkleProof:
+    """
+    Sibling hashes from the root down to the key's leaf (EMPTY_HASH for empty siblings).
+    """
+    key: str
+    siblings: List[bytes]
+    included: bool
+
+    def verify(self, root: bytes, value) -> bool:
+        if not self.included:
+            return False
+        path = key_path(self.key)
+        h = leaf_hash(path, value_hash(value))
+        for depth in range(len(self.siblings) - 1, -1, -1):
+            sib = self.siblings[depth]
+            if _bit(path, depth):
+                h = _sha256(b"\x01" + sib + h)
+            else:
+                h = _sha256(b"\x01" + h + sib)
+        return h == root
+
+
+class SparseMerkleTree:
+    """
+    An immutable sparse Merkle tree over 256-bit key hashes. Subtrees with a single
+    leaf are collapsed into that leaf, so the height is about log2(accounts) rather
+    than 256. update() returns a new tree sharing every untouched node with this one,
+    which makes it cheap to compute a root speculatively and drop it if the fork loses.
+    """
+
+    def __init__(self, root=None):
+        self._root = root
+
+    @property
+    def root(self) -> bytes:
+        return self._root.hash if self._root is not None else EMPTY_HASH
+
+    def update(self, changes: Dict[str, object], executor: Optional[Executor] = None,
+               parallel_bits: int = 4, parallel_threshold: int = 2048) -> "SparseMerkleTree":
+        items = sorted((key_path(k), k, value_hash(v)) for k, v in changes.items())
+        if executor is None or len(items) < parallel_threshold:
+            return SparseMerkleTree(_update(self._root, items, 0))
+        return SparseMerkleTree(self._parallel_update(items, executor, parallel_bits))
+
+    def _parallel_update(self, items, executor: Executor, bits: int):
+        # Rebuild the 2**bits subtrees below depth `bits` independently, then re-join
+        # the few levels above them.
+        shift = KEY_BITS - bits
+        groups = [[] for _ in range(1 << bits)]
+        for item in items:
+            groups[item[0] >> shift].append(item)
+        futures = [
+            executor.submit(_update, self._subtree(prefix, bits), group, bits) if group else None
+            for prefix, group in enumerate(groups)
+        ]
+        level = [
+            fut.result() if fut is not None else self._subtree(prefix, bits)
+            for prefix, fut in enumerate(futures)
+        ]
+        while len(level) > 1:
+            level = [_join(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+        return level[0]
+
+    def _subtree(self, prefix: int, bits: int):
+        node = self._root
+        for depth in range(bits):
+            if node is None:
+                return None
+            if isinstance(node, _Leaf):
+                return node if node.path >> (KEY_BITS - bits) == prefix else None
+            node = node.right if (prefix >> (bits - 1 - depth)) & 1 else node.left
+        return node
+
+    def prove(self, key: str) -> MerkleProof:
+        path = key_path(key)
+        siblings = []
+        node, depth = self._root, 0
+        while isinstance(node, _Branch):
+            if _bit(path, depth):
+                siblings.append(node.left.hash if node.left else EMPTY_HASH)
+                node = node.right
+            else:
+                siblings.append(node.right.hash if node.right else EMPTY_HASH)
+                node = node.left
+            depth += 1
+        included = isinstance(node, _Leaf) and node.path == path
+        return MerkleProof(key=key, siblings=siblings, included=included)
+
+
+class StateCommitment:
+    """
+    Keeps the sparse Merkle root of the ledger in step with execution. Each block only
+    rehashes the paths of the keys its transactions dirtied, so per-block cost tracks
+    the number of changed keys rather than the size of the ledger.
+
+    preview() computes a candidate tree without adopting it (for speculative forks);
+    apply() adopts it once the block is final.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.tree = SparseMerkleTree()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+
+    @property
+    def root(self) -> bytes:
+        return self.tree.root
+
+    def _executor(self):
+        if self.max_workers <= 1:
+            return None
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="state-root")
+        return self._pool
+
+    def preview(self, state, dirty_keys: Iterable[str]) -> SparseMerkleTree:
+        changes = {key: state.read(key) for key in dirty_keys}
+        return self.tree.update(changes, executor=self._executor())
+
+    def apply(self, tree: SparseMerkleTree) -> bytes:
+        self.tree = tree
+        return tree.root
+
+    def commit(self, state, dirty_keys: Iterable[str]) -> bytes:
+        return self.apply(self.preview(state, dirty_keys))
+
+    def prove(self, key: str) -> MerkleProof:
+        return self.tree.prove(key)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def dirty_keys_of(results: Dict) -> set:
+    """
+    Keys written by the successful transactions in an engine's results dict.
+    """
+    dirty = set()
+    for ok, updates in results.values():
+        if ok:
+            dirty.update(updates)
+    return dirty
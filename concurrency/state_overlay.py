@@ -0,0 +1,128 @@
+# concurrency/state_overlay.py
+
+from typing import Dict
+
+from concurrency.account_state import StateView
+
+
+class StateSnapshot:
+    """
+    A frozen view of an AccountState taken by AccountState.snapshot(). It holds the
+    storage the state had at that moment; the live state copies that storage before
+    its next write, so reads here need no locks and never see later changes.
+    """
+
+    def __init__(self, index: Dict[str, int], values, present, other: Dict, backing=None):
+        # index only ever grows, so the live dict can be shared; slots allocated after
+        # the snapshot are either past the end of our arrays or not present in them
+        self._index = index
+        self._values = values
+        self._present = present
+        self._other = other
+        self._backing = backing  # immutable, so safe to share
+
+    @property
+    def state_store(self) -> StateView:
+        return StateView(self)
+
+    def read(self, key: str):
+        other = self._other
+        if other and key in other:
+            return other[key]
+        idx = self._index.get(key)
+        if idx is None or idx >= len(self._values) or not self._present[idx]:
+            return 0 if self._backing is None else self._backing.get(key, 0)
+        return self._values.item(idx)
+
+    def _loaded(self, key) -> bool:
+        idx = self._index.get(key)
+        return idx is not None and idx < len(self._values) and bool(self._present[idx])
+
+    def __contains__(self, key) -> bool:
+        if key in self._other or self._loaded(key):
+            return True
+        return self._backing is not None and key in self._backing
+
+    def keys(self):
+        size = len(self._values)
+        present, other = self._present, self._other
+        for key, idx in list(self._index.items()):
+            if idx < size and present[idx] and key not in other:
+                yield key
+        yield from list(other)
+        if self._backing is not None:
+            for key in self._backing.keys():
+                if key not in other and not self._loaded(key):
+                    yield key
+
+    def fork(self):
+        return StateOverlay(self)
+
+
+class StateOverlay:
+    """
+    A copy-on-write layer over a parent state (an AccountState, a snapshot, or another
+    overlay). Creating one is O(1); reads fall through to the parent for keys the
+    overlay hasn't written; commit() pushes the dirty keys into the parent and
+    discard() drops them, both in time proportional to the number of dirty keys.
+
+    Overlays are what let a node execute a block before voting finishes, keep several
+    competing forks side by side, and throw the losing ones away.
+    """
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.dirty: Dict[str, object] = {}
+        self._closed = None
+
+    @property
+    def state_store(self) -> StateView:
+        return StateView(self)
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError(f"overlay was already {self._closed}")
+
+    def read(self, key: str):
+        dirty = self.dirty
+        if key in dirty:
+            return dirty[key]
+        return self.parent.read(key)
+
+    def write(self, key: str, value):
+        self._check_open()
+        self.dirty[key] = value
+
+    def write_many(self, updates: Dict):
+        self._check_open()
+        self.dirty.update(updates)
+
+    def __contains__(self, key) -> bool:
+        return key in self.dirty or key in self.parent
+
+    def keys(self):
+        dirty = self.dirty
+        yield from list(dirty)
+        for key in self.parent.keys():
+            if key not in dirty:
+                yield key
+
+    def fork(self):
+        return StateOverlay(self)
+
+    def commit(self) -> int:
+        """
+        Applies the dirty keys to the parent; returns how many were written.
+        """
+        self._check_open()
+        if not hasattr(self.parent, "write_many"):
+            raise RuntimeError("cannot commit into a read-only snapshot")
+        self.parent.write_many(self.dirty)
+        written = len(self.dirty)
+        self._closed = "committed"
+        return written
+
+    def discard(self):
+        self._check_open()
+        self.dirty = {}
+        self._closed = "discarded"
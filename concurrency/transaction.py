@@ -1,7 +1,25 @@
 # concurrency/transaction.py
-# concurrency/transaction.py
 
-from typing import Set, Callable, Dict, Optional
+import hashlib
+import struct
+from functools import partial
+from typing import Set, Callable, Dict, Optional, Sequence
+
+from concurrency.codec import CodecError, pack_varint, pack_vstr, unpack_varint, unpack_vstr
+from concurrency.ops import decode_op, encode_op, ops_access_lists, ops_action
+from concurrency.signatures import PUBLIC_KEY_SIZE, SIGNATURE_SIZE, public_key_bytes, sign, verify
+
+# Encoding format version (first byte of every encoded transaction)
+TX_FORMAT = 1
+_FLAG_OPS = 0x01
+_FLAG_SIGNED = 0x02
+_F64 = struct.Struct(">d")
+
+
+def _opaque_action(tx_id, read_data):
+    raise RuntimeError(f"transaction {tx_id} was decoded without its code; only op-based "
+                       "transactions can be executed after crossing a process or wire boundary")
+
 
 class Transaction:
     """
@@ -11,22 +29,175 @@ class Transaction:
       - action_fn: a function that, given a dict of read_data, returns new {key: value} writes
       - memo: textual data used by the AI aggregator
       - fee: optional local fee structure
+      - ops: declarative ops (see concurrency/ops.py) used instead of action_fn; the
+             access lists are derived from them when not given
+      - signer / signature: Ed25519 public key and signature, set by sign()
+
+    encode() gives the canonical binary form (see below) and tx_hash its SHA-256. Both
+    are computed once and cached, so treat a transaction as immutable after creating it.
     """
+
+    __slots__ = ("tx_id", "read_keys", "write_keys", "action_fn", "memo", "fee", "ops",
+                 "signer", "signature", "_encoded", "_hash")
+
     def __init__(
         self,
         tx_id: str,
-        read_keys: Set[str],
-        write_keys: Set[str],
-        action_fn: Callable[[Dict], Dict],
+        read_keys: Optional[Set[str]],
+        write_keys: Optional[Set[str]],
+        action_fn: Optional[Callable[[Dict], Dict]],
         memo: Optional[str] = None,
-        fee: float = 0.0
+        fee: float = 0.0,
+        ops: Optional[Sequence] = None
     ):
+        if ops is not None:
+            ops = tuple(ops)
+            op_reads, op_writes = ops_access_lists(ops)
+            read_keys = op_reads if read_keys is None else read_keys
+            write_keys = op_writes if write_keys is None else write_keys
+            action_fn = action_fn or ops_action(ops)
+        elif action_fn is None:
+            raise ValueError(f"transaction {tx_id} needs either action_fn or ops")
         self.tx_id = tx_id
-        self.read_keys = read_keys
-        self.write_keys = write_keys
+        self.read_keys = read_keys if read_keys is not None else set()
+        self.write_keys = write_keys if write_keys is not None else set()
         self.action_fn = action_fn
         self.memo = memo or ""
         self.fee = fee
+        self.ops = ops
+        self.signer: Optional[bytes] = None
+        self.signature: Optional[bytes] = None
+        self._encoded = None
+        self._hash = None
+
+    @classmethod
+    def from_ops(cls, tx_id: str, ops: Sequence, memo: Optional[str] = None, fee: float = 0.0):
+        return cls(tx_id, None, None, None, memo=memo, fee=fee, ops=ops)
+
+    def encode(self) -> bytes:
+        """
+        Canonical encoding:
+
+            format (u8) | flags (u8) | tx_id | read keys | write keys | memo | fee (f64)
+            | ops (only if flags has _FLAG_OPS)
+            | signer (32 bytes) | signature (64 bytes)   (only if flags has _FLAG_SIGNED)
+
+        Strings are varint-length-prefixed UTF-8, key sets are a varint count followed
+        by the keys in sorted order, ops are a varint count followed by encode_op()
+        records. An action_fn closure is code, not data, and is not encoded. The
+        signature covers everything before it (signing_bytes()).
+        """
+        if self._encoded is None:
+            if self.signer is not None and self.signature is None:
+                raise ValueError(f"transaction {self.tx_id} has a signer but no signature")
+            body = self.signing_bytes()
+            self._encoded = body + self.signature if self.signer is not None else body
+        return self._encoded
+
+    def signing_bytes(self) -> bytes:
+        if self._encoded is not None:
+            return self._encoded[:-SIGNATURE_SIZE] if self.signer is not None else self._encoded
+        ops = self.ops
+        flags = (_FLAG_OPS if ops is not None else 0) | (_FLAG_SIGNED if self.signer is not None else 0)
+        out = bytearray((TX_FORMAT, flags))
+        out += pack_vstr(self.tx_id)
+        for keys in (self.read_keys, self.write_keys):
+            out += pack_varint(len(keys))
+            for key in sorted(keys):
+                out += pack_vstr(key)
+        out += pack_vstr(self.memo)
+        out += _F64.pack(float(self.fee))
+        if ops is not None:
+            out += pack_varint(len(ops))
+            for op in ops:
+                out += encode_op(op)
+        if self.signer is not None:
+            out += self.signer
+        return bytes(out)
+
+    def sign(self, private_key) -> "Transaction":
+        """
+        Signs with an Ed25519 private key (see concurrency.signatures), replacing any
+        earlier signature. Returns self.
+        """
+        self.signer = public_key_bytes(private_key)
+        self.signature = None
+        self._encoded = self._hash = None
+        body = self.signing_bytes()
+        self.signature = sign(private_key, body)
+        self._encoded = body + self.signature
+        return self
+
+    @property
+    def is_signed(self) -> bool:
+        return self.signature is not None
+
+    def verify_signature(self) -> bool:
+        """
+        Checks the signature on this one transaction; see concurrency.sigverify for
+        batches.
+        """
+        return self.is_signed and verify(self.signer, self.signature, self.signing_bytes())
+
+    @classmethod
+    def decode(cls, buf) -> "Transaction":
+        """
+        Rebuilds a transaction from encode() output (bytes or a memoryview slice). A
+        transaction encoded without ops comes back with an action_fn that raises.
+        """
+        tx, end = cls.decode_from(buf, 0)
+        if end != len(buf):
+            raise CodecError(f"{len(buf) - end} trailing bytes after transaction")
+        return tx
+
+    @classmethod
+    def decode_from(cls, buf, offset: int):
+        """
+        Decodes one transaction at offset; returns (transaction, offset after it).
+        """
+        start = offset
+        if buf[offset] != TX_FORMAT:
+            raise CodecError(f"unsupported transaction format {buf[offset]}")
+        flags = buf[offset + 1]
+        tx_id, offset = unpack_vstr(buf, offset + 2)
+        key_sets = []
+        for _ in range(2):
+            count, offset = unpack_varint(buf, offset)
+            keys = set()
+            for _ in range(count):
+                key, offset = unpack_vstr(buf, offset)
+                keys.add(key)
+            key_sets.append(keys)
+        memo, offset = unpack_vstr(buf, offset)
+        (fee,) = _F64.unpack_from(buf, offset)
+        offset += 8
+        ops = None
+        if flags & _FLAG_OPS:
+            count, offset = unpack_varint(buf, offset)
+            ops = []
+            for _ in range(count):
+                op, offset = decode_op(buf, offset)
+                ops.append(op)
+        signer = signature = None
+        if flags & _FLAG_SIGNED:
+            end = offset + PUBLIC_KEY_SIZE + SIGNATURE_SIZE
+            if end > len(buf):
+                raise CodecError("truncated signature")
+            signer = bytes(buf[offset:offset + PUBLIC_KEY_SIZE])
+            signature = bytes(buf[offset + PUBLIC_KEY_SIZE:end])
+            offset = end
+        action_fn = None if ops is not None else partial(_opaque_action, tx_id)
+        tx = cls(tx_id, key_sets[0], key_sets[1], action_fn, memo=memo, fee=fee, ops=ops)
+        tx.signer = signer
+        tx.signature = signature
+        tx._encoded = bytes(buf[start:offset])
+        return tx, offset
+
+    @property
+    def tx_hash(self) -> bytes:
+        if self._hash is None:
+            self._hash = hashlib.sha256(self.encode()).digest()
+        return self._hash
 
     def __repr__(self):
         short_memo = self.memo[:30] + "..." if len(self.memo) > 30 else self.memo
@@ -0,0 +1,98 @@
+# concurrency/tx_batch.py
+
+import hashlib
+import struct
+from typing import Iterable, Iterator, List
+
+from concurrency.codec import CodecError
+from concurrency.transaction import Transaction
+
+# Layout: magic | count (u32) | count + 1 end-relative offsets (u32) | encodings
+#   transaction i is body[offsets[i]:offsets[i + 1]], i.e. Transaction.encode() output
+_MAGIC = b"PFTB"
+_HEAD = struct.Struct(">4sI")
+
+
+class TransactionBatch:
+    """
+    Many encoded transactions packed into one contiguous buffer with an offset table,
+    so a batch can be hashed, erasure-coded, written or sent between processes as a
+    single bytes object. Indexing and iteration return memoryview slices of that
+    buffer: no copies and no Transaction objects unless decode() is asked for.
+
+    Wrapping an existing buffer (bytes, bytearray, mmap, memoryview) only validates the
+    header and offset table.
+    """
+
+    __slots__ = ("buffer", "_view", "_offsets", "_body")
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if view.ndim != 1 or view.itemsize != 1:
+            view = view.cast("B")
+        if len(view) < _HEAD.size:
+            raise CodecError("truncated transaction batch")
+        magic, count = _HEAD.unpack_from(view, 0)
+        if magic != _MAGIC:
+            raise CodecError("not a transaction batch")
+        table_end = _HEAD.size + 4 * (count + 1)
+        if len(view) < table_end:
+            raise CodecError("truncated transaction batch")
+        offsets = struct.unpack_from(f">{count + 1}I", view, _HEAD.size)
+        if offsets[0] != 0 or offsets[-1] != len(view) - table_end:
+            raise CodecError("transaction batch offsets don't match its size")
+        self.buffer = buffer
+        self._view = view
+        self._offsets = offsets
+        self._body = view[table_end:]
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[Transaction]) -> "TransactionBatch":
+        encoded = [tx.encode() for tx in transactions]
+        offsets = [0]
+        for blob in encoded:
+            offsets.append(offsets[-1] + len(blob))
+        buffer = b"".join([
+            _HEAD.pack(_MAGIC, len(encoded)),
+            struct.pack(f">{len(offsets)}I", *offsets),
+            *encoded,
+        ])
+        return cls(buffer)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> memoryview:
+        """
+        The encoding of transaction i, as a view into the batch buffer.
+        """
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._body[self._offsets[i]:self._offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        body, offsets = self._body, self._offsets
+        for i in range(len(offsets) - 1):
+            yield body[offsets[i]:offsets[i + 1]]
+
+    def hashes(self) -> List[bytes]:
+        """
+        tx_hash of every transaction, computed straight from the buffer.
+        """
+        sha256 = hashlib.sha256
+        return [sha256(view).digest() for view in self]
+
+    def decode(self, i: int) -> Transaction:
+        return Transaction.decode(self[i])
+
+    def transactions(self) -> List[Transaction]:
+        return [Transaction.decode(view) for view in self]
+
+    def tobytes(self) -> bytes:
+        return self._view.tobytes() if not isinstance(self.buffer, bytes) else self.buffer
+
+    def __bytes__(self):
+        return self.tobytes()
+
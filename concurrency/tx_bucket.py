@@ -0,0 +1,225 @@
+# concurrency/tx_bucket.py
+
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Iterable, Iterator, List, Optional
+
+from concurrency.transaction import Transaction
+
+
+class FinalizedTxIndex:
+    """
+    Ids of transactions already in a finalized block, so fallback batches don't carry
+    them again. Holds the newest `capacity` ids; older ones are forgotten first-in,
+    first-out (by then their buckets have long since dropped them). Can be shared by
+    every proposer on a node.
+    """
+
+    def __init__(self, capacity: int = 1_000_000):
+        self.capacity = capacity
+        self._ids = set()
+        self._order = deque()
+        self._lock = threading.Lock()
+
+    def add_many(self, tx_ids: Iterable[str]):
+        with self._lock:
+            for tx_id in tx_ids:
+                if tx_id in self._ids:
+                    continue
+                self._ids.add(tx_id)
+                self._order.append(tx_id)
+                if len(self._order) > self.capacity:
+                    self._ids.discard(self._order.popleft())
+
+    def __contains__(self, tx_id) -> bool:
+        return tx_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class _Entry:
+    __slots__ = ("tx", "fee", "seq", "size", "arrived_at")
+
+    def __init__(self, tx, fee, seq, size, arrived_at):
+        self.tx = tx
+        self.fee = fee
+        self.seq = seq
+        self.size = size
+        self.arrived_at = arrived_at
+
+
+class TxBucket:
+    """
+    Pending transactions, indexed for a bucket holding hundreds of thousands of them:
+
+      - a tx_id -> entry dict, so duplicates are rejected in O(1)
+      - a max-heap on (fee, arrival) for batch forming and a min-heap on the same key
+        for eviction, both O(log n) and lazily cleaned (entries that left the bucket
+        are skipped when they surface)
+      - an arrival-ordered index, so expiring the oldest entries costs O(1) each
+
+    Size is the transaction's canonical encoding length. When either max_txs or
+    max_bytes is exceeded the lowest-fee (then newest) entries are evicted. Safe to
+    use from several threads.
+    """
+
+    def __init__(self, max_txs: Optional[int] = None, max_bytes: Optional[int] = None,
+                 finalized: Optional[FinalizedTxIndex] = None):
+        self.max_txs = max_txs
+        self.max_bytes = max_bytes
+        self.finalized = finalized
+        self._entries = {}
+        self._by_fee = []        # (-fee, seq, tx_id)
+        self._by_low_fee = []    # (fee, -seq, tx_id)
+        self._arrivals = OrderedDict()  # tx_id -> None, oldest first
+        self._seq = 0
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.stats = {"added": 0, "duplicates": 0, "evicted": 0, "finalized_skipped": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, tx_id) -> bool:
+        return tx_id in self._entries
+
+    def __iter__(self) -> Iterator[Transaction]:
+        """
+        Pending transactions in arrival order (a snapshot; the bucket is unchanged).
+        """
+        with self._lock:
+            return iter([self._entries[tx_id].tx for tx_id in self._arrivals])
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    # --- insertion / removal ----------------------------------------------------
+
+    def add(self, tx: Transaction, arrived_at: Optional[float] = None) -> bool:
+        """
+        Adds tx unless its id is already pending or finalized. Returns whether it was
+        kept (it may be evicted at once if it is the cheapest entry of a full bucket).
+        """
+        tx_id = tx.tx_id
+        with self._lock:
+            if tx_id in self._entries or (self.finalized is not None and tx_id in self.finalized):
+                self.stats["duplicates"] += 1
+                return False
+            self._insert(tx, time.monotonic() if arrived_at is None else arrived_at)
+            self.stats["added"] += 1
+            self._enforce_limits()
+            self._maybe_compact()
+            return tx_id in self._entries
+
+    def _insert(self, tx, arrived_at):
+        seq = self._seq
+        self._seq += 1
+        fee = float(tx.fee)
+        entry = _Entry(tx, fee, seq, len(tx.encode()), arrived_at)
+        self._entries[tx.tx_id] = entry
+        self._arrivals[tx.tx_id] = None
+        self._bytes += entry.size
+        heapq.heappush(self._by_fee, (-fee, seq, tx.tx_id))
+        heapq.heappush(self._by_low_fee, (fee, -seq, tx.tx_id))
+
+    def _live(self, tx_id, seq) -> Optional[_Entry]:
+        entry = self._entries.get(tx_id)
+        return entry if entry is not None and entry.seq == seq else None
+
+    def _remove(self, tx_id) -> Optional[_Entry]:
+        entry = self._entries.pop(tx_id, None)
+        if entry is not None:
+            del self._arrivals[tx_id]
+            self._bytes -= entry.size
+        return entry
+
+    def _maybe_compact(self):
+        # Lazy deletion leaves dead heap items behind; rebuild once they dominate
+        live = len(self._entries)
+        if len(self._by_fee) > 2 * live + 1024:
+            self._by_fee = [(-e.fee, e.seq, k) for k, e in self._entries.items()]
+            heapq.heapify(self._by_fee)
+        if len(self._by_low_fee) > 2 * live + 1024:
+            self._by_low_fee = [(e.fee, -e.seq, k) for k, e in self._entries.items()]
+            heapq.heapify(self._by_low_fee)
+
+    def _enforce_limits(self):
+        heap = self._by_low_fee
+        while heap and ((self.max_txs is not None and len(self._entries) > self.max_txs)
+                        or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            _, neg_seq, tx_id = heapq.heappop(heap)
+            if self._live(tx_id, -neg_seq) is not None:
+                self._remove(tx_id)
+                self.stats["evicted"] += 1
+
+    def discard_many(self, tx_ids: Iterable[str]) -> int:
+        """
+        Drops the given ids (e.g. included in a finalized block elsewhere).
+        """
+        with self._lock:
+            removed = sum(1 for tx_id in tx_ids if self._remove(tx_id) is not None)
+            self._maybe_compact()
+            return removed
+
+    # --- expiry -----------------------------------------------------------------
+
+    def pop_expired(self, older_than: float) -> List[tuple]:
+        """
+        Removes and returns (tx, arrived_at) for every entry that arrived before
+        older_than, oldest first. Stops at the first younger entry.
+        """
+        out = []
+        with self._lock:
+            arrivals = self._arrivals
+            while arrivals:
+                tx_id = next(iter(arrivals))
+                entry = self._entries[tx_id]
+                if entry.arrived_at >= older_than:
+                    break
+                self._remove(tx_id)
+                out.append((entry.tx, entry.arrived_at))
+            self._maybe_compact()
+        return out
+
+    # --- batches ----------------------------------------------------------------
+
+    def pop_batch(self, max_txs: Optional[int] = None, max_bytes: Optional[int] = None,
+                  max_skips: int = 64) -> List[Transaction]:
+        """
+        Removes and returns the highest-fee transactions (ties by arrival) that fit in
+        max_txs / max_bytes. A transaction too large for the remaining space stays in
+        the bucket; after max_skips of those in a row the batch is considered full.
+        Already-finalized transactions are dropped on the way.
+        """
+        batch = []
+        skipped = []
+        misses = 0
+        used = 0
+        with self._lock:
+            heap = self._by_fee
+            while heap and (max_txs is None or len(batch) < max_txs) and misses < max_skips:
+                item = heapq.heappop(heap)
+                neg_fee, seq, tx_id = item
+                entry = self._live(tx_id, seq)
+                if entry is None:
+                    continue
+                if self.finalized is not None and tx_id in self.finalized:
+                    self._remove(tx_id)
+                    self.stats["finalized_skipped"] += 1
+                    continue
+                if max_bytes is not None and used + entry.size > max_bytes:
+                    skipped.append(item)
+                    misses += 1
+                    continue
+                misses = 0
+                self._remove(tx_id)
+                batch.append(entry.tx)
+                used += entry.size
+            for item in skipped:
+                heapq.heappush(heap, item)
+            self._maybe_compact()
+        return batch
@@ -0,0 +1,153 @@
+# concurrency/vector_executor.py
+
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from concurrency.balance_table import is_int64
+from concurrency.concurrency_engine import ConcurrencyEngine, record_block_metrics
+from concurrency.ops import Credit, Debit, Transfer, insufficient_funds, op_keys
+from concurrency.state_commitment import dirty_keys_of
+
+
+class VectorizedExecutor(ConcurrencyEngine):
+    """
+    A ConcurrencyEngine that applies payment-style transactions as array operations.
+
+    Within each conflict-free wave, transactions made of a single Credit, Debit or
+    Transfer op with integer amounts are grouped by op type and applied straight to
+    the AccountState's BalanceTable with NumPy gathers and scatters -- no
+    per-transaction action_fn call. Keys are unique within a wave, so plain
+    fancy-index assignment is safe. Everything else (closures, multi-op transactions,
+    non-integer balances, results that would overflow int64) runs through the regular
+    per-transaction path, with identical results and error messages.
+
+    Like every engine here, it assumes it is the only writer while a block runs.
+    """
+
+    VECTOR_OPS = (Credit, Debit, Transfer)
+
+    def execute_block_of_transactions(self, tx_list: List, use_multithreading=True):
+        state = self.account_state
+        if getattr(state, "balances", None) is None:
+            # No array-backed store to work on (e.g. a state overlay)
+            return super().execute_block_of_transactions(tx_list, use_multithreading)
+
+        results = {}
+        started = time.perf_counter()
+        schedule = self.scheduler.schedule(tx_list)
+        self.last_schedule = schedule
+        vectorized = 0
+
+        if getattr(state, "backing", None) is not None:
+            # Fault snapshot-backed keys into the table up front, so the `other` check
+            # below sees any non-integer values they hold
+            keys = set()
+            for tx in tx_list:
+                op = self._vector_op(tx)
+                if op is not None:
+                    keys.update(op_keys(op)[1])
+            state.reserve(keys)
+
+        for wave in schedule.waves:
+            groups: Dict[type, list] = {Credit: [], Debit: [], Transfer: []}
+            fallback = []
+            other = state.other
+            for pos in wave:
+                tx = tx_list[pos]
+                op = self._vector_op(tx)
+                # Keys holding non-integer values can't go through the arrays
+                if op is None or (other and not other.keys().isdisjoint(op_keys(op)[1])):
+                    fallback.append(tx)
+                else:
+                    groups[type(op)].append((tx, op))
+
+            if any(groups.values()):
+                # Direct array writes bypass write(), so unshare from snapshots first
+                state.ensure_private()
+            for kind, items in groups.items():
+                if items:
+                    vectorized += self._apply_group(kind, items, state, results, fallback)
+
+            if fallback:
+                if use_multithreading and len(fallback) >= self.min_parallel_wave and self.max_workers > 1:
+                    self._run_wave_parallel(fallback, results)
+                else:
+                    self._run_chunk(fallback, results)
+
+        report = schedule.summary()
+        report["vectorized"] = vectorized
+        report["fallback"] = len(tx_list) - vectorized
+        report["elapsed_s"] = time.perf_counter() - started
+        self.last_report = report
+        self.last_dirty_keys = dirty_keys_of(results)
+        record_block_metrics(report, results)
+        return results
+
+    def _vector_op(self, tx):
+        ops = getattr(tx, "ops", None)
+        if not ops or len(ops) != 1:
+            return None
+        op = ops[0]
+        if not isinstance(op, self.VECTOR_OPS) or not is_int64(op.amount):
+            return None
+        if isinstance(op, Transfer) and op.src == op.dst:
+            return None
+        return op
+
+    def _apply_group(self, kind, items, state, results, fallback) -> int:
+        """
+        Applies one homogeneous group; returns how many transactions it settled.
+        Rows that would overflow int64 are pushed onto fallback instead.
+        """
+        amt = np.fromiter((op.amount for _, op in items), dtype=np.int64, count=len(items))
+
+        if kind is Transfer:
+            src = state.reserve([op.src for _, op in items])
+            dst = state.reserve([op.dst for _, op in items])
+            vals, present = state.balances.values, state.balances.present
+            bal_src = vals[src]
+            bal_dst = vals[dst]
+            funded = bal_src >= amt
+            new_src = bal_src - amt
+            new_dst = bal_dst + amt
+            overflow = funded & (new_dst < bal_dst)
+            ok = funded & ~overflow
+            vals[src[ok]] = new_src[ok]
+            vals[dst[ok]] = new_dst[ok]
+            present[src[ok]] = True
+            present[dst[ok]] = True
+            new_src_l, new_dst_l = new_src.tolist(), new_dst.tolist()
+            bal_src_l = bal_src.tolist()
+            for i, (tx, op) in enumerate(items):
+                if ok[i]:
+                    results[tx.tx_id] = (True, {op.src: new_src_l[i], op.dst: new_dst_l[i]})
+                elif overflow[i]:
+                    fallback.append(tx)
+                else:
+                    results[tx.tx_id] = (False, str(insufficient_funds(op.src, bal_src_l[i], op.amount)))
+            return len(items) - int(overflow.sum())
+
+        idx = state.reserve([op.key for _, op in items])
+        vals, present = state.balances.values, state.balances.present
+        bal = vals[idx]
+        if kind is Credit:
+            new = bal + amt
+            overflow = new < bal
+            ok = ~overflow
+        else:
+            new = bal - amt
+            overflow = np.zeros(len(items), dtype=bool)
+            ok = bal >= amt
+        vals[idx[ok]] = new[ok]
+        present[idx[ok]] = True
+        new_l, bal_l = new.tolist(), bal.tolist()
+        for i, (tx, op) in enumerate(items):
+            if ok[i]:
+                results[tx.tx_id] = (True, {op.key: new_l[i]})
+            elif overflow[i]:
+                fallback.append(tx)
+            else:
+                results[tx.tx_id] = (False, str(insufficient_funds(op.key, bal_l[i], op.amount)))
+        return len(items) - int(overflow.sum())
@@ -1,7 +1,7 @@
 # consensus/block.py
 
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 @dataclass
 class Block:
@@ -10,6 +10,10 @@ class Block:
     daqc_refs: List[bytes]    # references to data availability certificates
     prev_block_id: int
     votes: dict               # Tower BFT votes
+    state_root: bytes = b""   # sparse Merkle root of the ledger after executing this block
+    # Set when state_root is the root after an earlier block (pipelined production,
+    # where execution trails voting); None means after this block
+    executed_block_id: Optional[int] = None
     # In a real system, we'd store more metadata (leader ID, version, etc.)
 
     def __repr__(self):
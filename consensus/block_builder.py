@@ -15,15 +15,17 @@ class BlockBuilder:
         self.block_counter = 0
         self.last_block_id = -1
 
-    def build_block(self, daqc_list):
+    def build_block(self, daqc_list, state_root: bytes = b""):
         # We produce a new block referencing the current poh, + previous block ID
+        # state_root is the post-execution root from StateCommitment, if the caller has it
         poh_ref = self.poh.get_current_poh()
         block = Block(
             block_id=self.block_counter,
             poh_ref=poh_ref,
             daqc_refs=daqc_list,
             prev_block_id=self.last_block_id,
-            votes={}
+            votes={},
+            state_root=state_root
         )
         self.block_counter += 1
         self.last_block_id = block.block_id
@@ -0,0 +1,329 @@
+# consensus/block_pipeline.py
+
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from concurrency.daqc import compute_daqc
+from metrics.registry import METRICS
+
+_STOP = object()
+
+_BLOCK_LATENCY = METRICS.histogram("pipeline_block_latency_seconds", "Submit-to-executed time of a block")
+
+
+@dataclass
+class BlockJob:
+    """
+    One block moving through the pipeline.
+    """
+    seq: int
+    batches: List[list]
+    meta: dict
+    submitted_at: float
+    txs: List = field(default_factory=list)
+    rejected: List = field(default_factory=list)  # failed signature verification
+    daqcs: List[bytes] = field(default_factory=list)
+    block: object = None
+    finalized: bool = False
+    results: Dict = field(default_factory=dict)
+    finished_at: float = 0.0
+
+
+class _Stage:
+    """
+    A single worker thread between two bounded queues. Work runs in order, one job
+    at a time; `busy` is time spent in fn, `blocked` time spent waiting for room
+    downstream (backpressure), and queue depth is sampled on every take. The same
+    figures go to METRICS as pipeline_stage_seconds / pipeline_stage_blocked_seconds
+    and a pipeline_queue_depth gauge.
+    """
+
+    def __init__(self, name: str, fn: Callable[[BlockJob], Optional[BlockJob]],
+                 inbox: queue.Queue, outbox: Optional[queue.Queue], on_error):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.on_error = on_error
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.items = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self._service = METRICS.histogram("pipeline_stage_seconds", "Time a stage spends on one block", stage=name)
+        self._blocked = METRICS.histogram("pipeline_stage_blocked_seconds",
+                                          "Time a stage waits for room downstream", stage=name)
+        METRICS.gauge("pipeline_queue_depth", "Blocks waiting in a stage's inbox", fn=inbox.qsize, stage=name)
+        self.thread = threading.Thread(target=self._run, name=f"pipeline-{name}", daemon=True)
+
+    def _run(self):
+        while True:
+            depth = self.inbox.qsize()
+            job = self.inbox.get()
+            if job is _STOP:
+                if self.outbox is not None:
+                    self.outbox.put(_STOP)
+                return
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+            started = time.perf_counter()
+            try:
+                out = self.fn(job)
+            except Exception as e:
+                self.on_error(self.name, job, e)
+                out = None
+            finished = time.perf_counter()
+            self.busy += finished - started
+            self.items += 1
+            if METRICS.enabled:
+                self._service.observe(finished - started)
+            if out is not None and self.outbox is not None:
+                self.outbox.put(out)
+                blocked = time.perf_counter() - finished
+                self.blocked += blocked
+                if METRICS.enabled:
+                    self._blocked.observe(blocked)
+
+    def report(self, wall: float) -> dict:
+        return {
+            "items": self.items,
+            "busy_s": round(self.busy, 6),
+            "occupancy": round(self.busy / wall, 4) if wall else 0.0,
+            "blocked_s": round(self.blocked, 6),
+            "mean_service_ms": round(self.busy / self.items * 1e3, 3) if self.items else 0.0,
+            "mean_queue_depth": round(self.depth_total / self.items, 2) if self.items else 0.0,
+            "max_queue_depth": self.depth_max,
+        }
+
+
+class BlockPipeline:
+    """
+    Block production as five pipelined stages, each on its own thread:
+
+        sigverify -> collect -> daqc -> vote -> execute
+
+    sigverify drops transactions that fail the SigVerifier (when one is given), so
+    only valid ones are packed and executed; collect runs collect_fn on the batches
+    (e.g. packing or reordering), daqc computes a certificate per batch, vote mixes
+    the certificates into PoH and builds and finalizes the block through
+    BlockBuilder, and execute applies finalized blocks to the ledger. While block N is being voted on, block N+1 is being certified and
+    block N-1 executed. Queues between stages hold at most queue_size jobs; a full
+    queue stalls the stage feeding it, up to submit() itself.
+
+    Because execution trails voting, block N carries the state root after the
+    finalized blocks up to N - state_lag (Block.executed_block_id names the last
+    of them). The vote stage waits for block N - state_lag to leave the pipeline
+    before building block N, so the root a block commits to never depends on
+    thread timing. state_lag=2 lets block N's vote overlap block N-1's execution;
+    state_lag=1 serializes voting behind execution.
+
+    report() gives each stage's occupancy (busy time / wall time) -- the bottleneck is
+    the stage closest to 1.0 -- and the submit-to-executed latency distribution of
+    the last latency_window blocks. Only counts and that window are kept, so a
+    long-running pipeline holds no finished jobs.
+    """
+
+    STAGES = ("sigverify", "collect", "daqc", "vote", "execute")
+
+    def __init__(self, block_builder, engine, state_commitment=None, ledger=None,
+                 collect_fn: Optional[Callable[[List[list], dict], List[list]]] = None,
+                 daqc_fn: Callable[[list], bytes] = compute_daqc,
+                 on_executed: Optional[Callable[[BlockJob], None]] = None,
+                 sigverifier=None, queue_size: int = 4, state_lag: int = 2,
+                 latency_window: int = 10_000):
+        if state_lag < 1:
+            raise ValueError("state_lag must be at least 1: execution follows voting")
+        self.builder = block_builder
+        self.engine = engine
+        self.state_commitment = state_commitment
+        self.ledger = ledger
+        self.collect_fn = collect_fn
+        self.daqc_fn = daqc_fn
+        self.on_executed = on_executed
+        self.sigverifier = sigverifier
+        self.state_lag = state_lag
+
+        self.executed_root = state_commitment.root if state_commitment is not None else b""
+        self.executed_block_id: Optional[int] = None
+        self.blocks_executed = 0
+        self.blocks_dropped = 0
+        self.rejected_txs = 0
+        self.error_count = 0
+        self.errors = deque(maxlen=100)  # (stage, seq, error), most recent
+        self._latencies = deque(maxlen=latency_window)
+        self._seq = 0
+        self._done = 0
+        self._left = set()        # seqs that have left the pipeline past _left_through
+        self._left_through = -1   # every seq <= this has left the pipeline
+        # (seq, root, block_id) after each executed block, oldest first; the first
+        # entry is the newest one at or before the last seq the vote stage asked for
+        self._roots = deque([(-1, self.executed_root, None)])
+        self._cond = threading.Condition()
+        self._started_at = None
+        self._stopped_at = None
+
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in self.STAGES]
+        fns = (self._sigverify, self._collect, self._certify, self._vote, self._execute)
+        self._stages = [
+            _Stage(name, fn, self._queues[i], self._queues[i + 1] if i + 1 < len(self._queues) else None,
+                   self._on_error)
+            for i, (name, fn) in enumerate(zip(self.STAGES, fns))
+        ]
+
+    # --- lifecycle --------------------------------------------------------------
+
+    def start(self):
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+            for stage in self._stages:
+                stage.thread.start()
+        return self
+
+    def submit(self, batches: List[list], timeout: Optional[float] = None, **meta) -> int:
+        """
+        Queues one block's worth of batches; blocks while the pipeline is full.
+        Returns the job's sequence number.
+        """
+        with self._cond:
+            seq = self._seq
+            self._seq += 1
+        job = BlockJob(seq=seq, batches=[list(b) for b in batches], meta=meta,
+                       submitted_at=time.perf_counter())
+        self._queues[0].put(job, timeout=timeout)
+        return seq
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every submitted block has left the pipeline.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._done >= self._seq, timeout=timeout)
+
+    def close(self):
+        if self._started_at is None or self._stopped_at is not None:
+            return
+        self._queues[0].put(_STOP)
+        for stage in self._stages:
+            stage.thread.join()
+        self._stopped_at = time.perf_counter()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- stages -----------------------------------------------------------------
+
+    def _sigverify(self, job: BlockJob) -> BlockJob:
+        if self.sigverifier is not None:
+            batches = []
+            for batch in job.batches:
+                result = self.sigverifier.filter(batch)
+                batches.append(result.valid)
+                job.rejected.extend(result.invalid)
+            job.batches = batches
+        return job
+
+    def _collect(self, job: BlockJob) -> BlockJob:
+        if self.collect_fn is not None:
+            job.batches = self.collect_fn(job.batches, job.meta)
+        job.txs = [tx for batch in job.batches for tx in batch]
+        return job
+
+    def _certify(self, job: BlockJob) -> BlockJob:
+        job.daqcs = [self.daqc_fn(batch) for batch in job.batches]
+        return job
+
+    def _root_before(self, seq: int):
+        # Waits until block seq - state_lag has left the pipeline, then returns the
+        # (root, block_id) after the last block executed at or before it
+        target = seq - self.state_lag
+        with self._cond:
+            self._cond.wait_for(lambda: self._left_through >= target)
+            roots = self._roots
+            while len(roots) > 1 and roots[1][0] <= target:
+                roots.popleft()
+            return roots[0][1], roots[0][2]
+
+    def _vote(self, job: BlockJob) -> Optional[BlockJob]:
+        root, executed_block_id = self._root_before(job.seq)
+        self.builder.poh.record_event(b"".join(job.daqcs))
+        block = self.builder.build_block(job.daqcs, state_root=root)
+        block.executed_block_id = executed_block_id
+        job.block = block
+        job.finalized = self.builder.finalize_block(block)
+        if not job.finalized:
+            self.blocks_dropped += 1
+            self._finish(job)
+            return None
+        return job
+
+    def _execute(self, job: BlockJob) -> None:
+        engine = self.engine
+        with METRICS.profile_block(job.seq):
+            job.results = engine.execute_block_of_transactions(job.txs)
+            dirty = engine.last_dirty_keys
+            if self.state_commitment is not None:
+                self.executed_root = self.state_commitment.commit(engine.account_state, dirty)
+        self.executed_block_id = job.block.block_id
+        with self._cond:
+            self._roots.append((job.seq, self.executed_root, self.executed_block_id))
+        if self.ledger is not None:
+            self.ledger.record_block(job.block, {k: engine.account_state.read(k) for k in dirty})
+            # Only this thread writes the state, so it holds still while a snapshot is taken
+            self.ledger.maybe_snapshot(engine.account_state, job.block.block_id, self.executed_root)
+        self.blocks_executed += 1
+        self.rejected_txs += len(job.rejected)
+        if self.on_executed is not None:
+            self.on_executed(job)
+        self._finish(job)
+
+    def _finish(self, job: BlockJob):
+        job.finished_at = time.perf_counter()
+        latency = job.finished_at - job.submitted_at
+        if METRICS.enabled:
+            _BLOCK_LATENCY.observe(latency)
+        with self._cond:
+            self._latencies.append(latency)
+            self._done += 1
+            self._left.add(job.seq)
+            while self._left_through + 1 in self._left:
+                self._left_through += 1
+                self._left.discard(self._left_through)
+            self._cond.notify_all()
+
+    def _on_error(self, stage: str, job: BlockJob, error: Exception):
+        # A failed job leaves the pipeline; later blocks keep flowing
+        with self._cond:  # any stage thread may fail
+            self.errors.append((stage, job.seq, error))
+            self.error_count += 1
+        self._finish(job)
+
+    # --- metrics ----------------------------------------------------------------
+
+    def report(self) -> dict:
+        end = self._stopped_at or time.perf_counter()
+        wall = end - self._started_at if self._started_at else 0.0
+        stages = {stage.name: stage.report(wall) for stage in self._stages}
+        with self._cond:
+            lat = sorted(self._latencies)
+
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1e3, 3) if lat else 0.0
+
+        return {
+            "blocks": self.blocks_executed,
+            "dropped": self.blocks_dropped,
+            "rejected_txs": self.rejected_txs,
+            "errors": self.error_count,
+            "wall_s": round(wall, 6),
+            "bottleneck": max(stages, key=lambda n: stages[n]["occupancy"]) if stages else None,
+            "stages": stages,
+            "latency_ms": {"mean": round(sum(lat) / len(lat) * 1e3, 3) if lat else 0.0,
+                           "p50": pct(0.50), "p99": pct(0.99), "max": pct(1.0)},
+        }
@@ -0,0 +1,313 @@
+# consensus/poh_service.py
+
+import hashlib
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
+import os
+from typing import Callable, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from metrics.registry import METRICS, perf_counter
+
+GENESIS_HASH = hashlib.sha256(b"GENESIS").digest()
+
+_HASHES = METRICS.counter("poh_hashes_total", "PoH hashes computed (ticks and mixins)")
+_HASH_RUN_S = METRICS.histogram("poh_hash_run_seconds", "Time to hash one run up to a tick or event boundary")
+_EVENT_WAIT_S = METRICS.histogram("poh_event_wait_seconds", "record_event() latency until the data is mixed in")
+
+
+class PoHEntry(NamedTuple):
+    """
+    One recorded point of the hash chain. num_hashes counts the hashes since the
+    previous entry, including the final one; when mixin is set, that final hash is
+    sha256(prev + mixin) instead of sha256(prev).
+    """
+    height: int                # total hashes after this entry
+    num_hashes: int
+    hash: bytes
+    mixin: Optional[bytes]     # sha256 of the event data, if this entry records one
+    checkpoint: bool           # True at every checkpoint_ticks-th tick boundary
+
+
+def verify_segment(start_hash: bytes, entries: Sequence[Tuple[int, bytes, Optional[bytes]]]) -> bool:
+    """
+    Replays (num_hashes, hash, mixin) entries from start_hash. Module-level so a
+    process pool can run it.
+    """
+    sha256 = hashlib.sha256
+    h = start_hash
+    for num_hashes, expected, mixin in entries:
+        plain = num_hashes - 1 if mixin is not None else num_hashes
+        for _ in range(plain):
+            h = sha256(h).digest()
+        if mixin is not None:
+            h = sha256(h + mixin).digest()
+        if h != expected:
+            return False
+    return True
+
+
+class PoHService:
+    """
+    Continuous Proof of History: a dedicated thread extends the SHA-256 chain
+    h[n+1] = sha256(h[n]) non-stop. Every hashes_per_tick hashes is a tick; when
+    tick_rate is set, the thread sleeps whenever it gets ahead of that many ticks per
+    second, so its CPU share is bounded (tick_rate=None hashes flat out).
+
+    Events are mixed in as h[n+1] = sha256(h[n] + sha256(data)): either as soon as
+    possible or at an exact tick height (the first hash after that tick boundary).
+    Only event entries and a checkpoint entry every checkpoint_ticks ticks are kept,
+    which is all PoHVerifier needs to re-check the chain segment by segment.
+
+    Drop-in for PoHGenerator: record_event() and get_current_poh() work the same way,
+    with record_event() waiting until the event is in the chain.
+    """
+
+    def __init__(self, hashes_per_tick: int = 1000, tick_rate: Optional[float] = 160.0,
+                 checkpoint_ticks: int = 64, max_entries: int = 1 << 20,
+                 start_hash: bytes = GENESIS_HASH):
+        if hashes_per_tick < 1 or checkpoint_ticks < 1:
+            raise ValueError("hashes_per_tick and checkpoint_ticks must be positive")
+        self.hashes_per_tick = hashes_per_tick
+        self.tick_rate = tick_rate
+        self.checkpoint_ticks = checkpoint_ticks
+        self.start_hash = start_hash
+
+        self._lock = threading.Lock()
+        self._hash = start_hash
+        self._height = 0
+        self._last_entry_height = 0
+        self.entries: deque = deque(maxlen=max_entries)
+        self._asap: deque = deque()     # (mixin, future)
+        self._scheduled: list = []      # heap of (height, seq, mixin, future)
+        self._seq = 0
+        self._subscribers: List[Callable[[PoHEntry], None]] = []
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = None
+
+    # --- lifecycle --------------------------------------------------------------
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self.started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name="poh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- public API -------------------------------------------------------------
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @property
+    def tick_height(self) -> int:
+        return self._height // self.hashes_per_tick
+
+    def get_current_poh(self) -> bytes:
+        return self._hash
+
+    def subscribe(self, callback: Callable[[PoHEntry], None]):
+        """
+        callback(entry) runs on the PoH thread for every checkpoint; keep it short.
+        """
+        self._subscribers.append(callback)
+
+    def submit_event(self, data: bytes, at_tick: Optional[int] = None) -> Future:
+        """
+        Queues data to be mixed in; the future resolves to its PoHEntry.
+        """
+        fut = Future()
+        mixin = hashlib.sha256(data).digest()
+        with self._lock:
+            if at_tick is None:
+                self._asap.append((mixin, fut))
+            else:
+                height = at_tick * self.hashes_per_tick
+                if height < self._height:
+                    raise ValueError(f"tick {at_tick} has already passed (now at tick {self.tick_height})")
+                heapq.heappush(self._scheduled, (height, self._seq, mixin, fut))
+                self._seq += 1
+        self._wake.set()
+        if self._thread is None:
+            # Not running: mix in synchronously so the service also works stopped
+            self._drain_stopped()
+        return fut
+
+    def record_event(self, data: bytes, at_tick: Optional[int] = None) -> bytes:
+        if not METRICS.enabled:
+            return self.submit_event(data, at_tick).result().hash
+        started = perf_counter()
+        entry = self.submit_event(data, at_tick).result()
+        _EVENT_WAIT_S.observe(perf_counter() - started)
+        return entry.hash
+
+    def entries_between(self, start_height: int, end_height: Optional[int] = None) -> Tuple[bytes, List[PoHEntry]]:
+        """
+        (hash at start_height, entries after it up to end_height). start_height must
+        be 0 or the height of a retained entry, e.g. a checkpoint.
+        """
+        with self._lock:
+            entries = list(self.entries)
+        if start_height == 0:
+            start = self.start_hash
+        else:
+            match = [e for e in entries if e.height == start_height]
+            if not match:
+                raise KeyError(f"no retained entry at height {start_height}")
+            start = match[0].hash
+        end = end_height if end_height is not None else float("inf")
+        return start, [e for e in entries if start_height < e.height <= end]
+
+    def checkpoints(self) -> List[PoHEntry]:
+        with self._lock:
+            return [e for e in self.entries if e.checkpoint]
+
+    # --- the hashing thread -----------------------------------------------------
+
+    def _run(self):
+        sha256 = hashlib.sha256
+        hpt = self.hashes_per_tick
+        while not self._stop.is_set():
+            with self._lock:
+                h, height = self._hash, self._height
+                mix = bool(self._asap or (self._scheduled and self._scheduled[0][0] <= height))
+                if mix:
+                    self._mix_locked()
+                else:
+                    # Hash up to the next tick boundary or scheduled event, whichever is first
+                    target = (height // hpt + 1) * hpt
+                    if self._scheduled:
+                        target = min(target, self._scheduled[0][0])
+            if not mix:
+                timed = METRICS.enabled
+                started = perf_counter() if timed else 0.0
+                for _ in range(target - height):
+                    h = sha256(h).digest()
+                if timed:
+                    _HASH_RUN_S.observe(perf_counter() - started)
+                    _HASHES.inc(target - height)
+                with self._lock:
+                    self._hash, self._height = h, target
+            elif METRICS.enabled:
+                _HASHES.inc()
+            with self._lock:
+                height = self._height
+                entry = self._maybe_checkpoint_locked()
+            if entry is not None:
+                for callback in self._subscribers:
+                    callback(entry)
+            if height % hpt == 0:
+                self._pace(height // hpt)
+
+    def _pace(self, tick: int):
+        if not self.tick_rate:
+            return
+        delay = self.started_at + tick / self.tick_rate - time.perf_counter()
+        if delay > 0:
+            self._wake.clear()
+            # An event arriving while we're ahead of schedule wakes us early
+            self._wake.wait(delay)
+
+    def _maybe_checkpoint_locked(self) -> Optional[PoHEntry]:
+        height = self._height
+        if height % (self.hashes_per_tick * self.checkpoint_ticks):
+            return None
+        entry = PoHEntry(height, height - self._last_entry_height, self._hash, None, True)
+        self.entries.append(entry)
+        self._last_entry_height = height
+        return entry
+
+    def _mix_locked(self):
+        # One mixin hash per queued event, scheduled ones first (their height is due)
+        if self._scheduled and self._scheduled[0][0] <= self._height:
+            _, _, mixin, fut = heapq.heappop(self._scheduled)
+        else:
+            mixin, fut = self._asap.popleft()
+        self._hash = hashlib.sha256(self._hash + mixin).digest()
+        self._height += 1
+        entry = PoHEntry(self._height, self._height - self._last_entry_height, self._hash, mixin, False)
+        self.entries.append(entry)
+        self._last_entry_height = self._height
+        fut.set_result(entry)
+
+    def _drain_stopped(self):
+        with self._lock:
+            while self._asap:
+                self._mix_locked()
+            while self._scheduled and self._scheduled[0][0] <= self._height:
+                self._mix_locked()
+
+
+def split_at_checkpoints(start_hash: bytes, entries: Sequence[PoHEntry]):
+    """
+    Cuts entries into independent segments: each starts at the previous checkpoint's
+    hash and ends at (and includes) the next checkpoint.
+    """
+    segments, current, seg_start = [], [], start_hash
+    for entry in entries:
+        current.append((entry.num_hashes, entry.hash, entry.mixin))
+        if entry.checkpoint:
+            segments.append((seg_start, current))
+            seg_start, current = entry.hash, []
+    if current:
+        segments.append((seg_start, current))
+    return segments
+
+
+class PoHVerifier:
+    """
+    Re-derives a PoH sequence in parallel. The entries are split at checkpoints; each
+    segment only needs its start hash, so segments are verified independently on a
+    process pool (SHA-256 of 32-byte inputs doesn't release the GIL, so threads
+    wouldn't help) and the sequence is valid iff every segment is.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, mp_context: str = "spawn"):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._ctx)
+        return self._pool
+
+    def verify(self, start_hash: bytes, entries: Iterable[PoHEntry]) -> bool:
+        segments = split_at_checkpoints(start_hash, list(entries))
+        if self.max_workers <= 1 or len(segments) <= 1:
+            return all(verify_segment(start, seg) for start, seg in segments)
+        starts, bodies = zip(*segments)
+        chunksize = max(1, len(segments) // (self.max_workers * 4))
+        return all(self._executor().map(verify_segment, starts, bodies, chunksize=chunksize))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
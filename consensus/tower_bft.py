@@ -1,22 +1,246 @@
 # consensus/tower_bft.py
 
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+MAX_LOCKOUT_HISTORY = 31
+
+
+class Vote(NamedTuple):
+    validator: str
+    slot: int
+
+
+class Lockout:
+    """
+    One entry of a vote tower. A vote with n confirmations locks the validator out of
+    voting on any fork that excludes `slot` until slot + 2**n.
+    """
+
+    __slots__ = ("slot", "confirmations")
+
+    def __init__(self, slot: int, confirmations: int = 1):
+        self.slot = slot
+        self.confirmations = confirmations
+
+    @property
+    def expiration(self) -> int:
+        return self.slot + (1 << self.confirmations)
+
+
 class TowerBFT:
     """
-    A simplified Tower BFT stub. Real Tower BFT includes vote locking,
-    chain selection, etc. We show minimal structure here:
+    Stake-weighted Tower BFT.
+
+    Every validator keeps a tower: a stack of at most MAX_LOCKOUT_HISTORY votes. A new
+    vote pops the votes whose lockout has expired, is rejected if a still-locked vote
+    is not an ancestor of the new slot (that would be switching forks while locked
+    out), and otherwise is pushed; each vote buried deeper than its confirmation count
+    then doubles its lockout. Votes that fall off the bottom become that validator's root.
+
+    For every slot the tower keeps the stake of validators whose tower holds a vote on
+    it with at least confirmation_depth confirmations. Those tallies change only for
+    the votes a new vote pushes, pops or deepens -- at most MAX_LOCKOUT_HISTORY of
+    them -- so ingesting a vote costs the same no matter how many validators exist.
+    A slot with more than 2/3 of the stake is finalized together with its ancestors,
+    becomes the cluster root, and everything at or below it is pruned: pending blocks
+    on dead forks, per-slot tallies, and tower entries. Finalized Block objects are
+    kept for the last retain_finalized slots only, and is_finalized() answers from
+    compact slot ranges over the same window: slots below finalized_watermark are
+    forgotten and report False.
+
+    With no stakes given, the node is the only (local) validator, so vote_on_block()
+    finalizes at once, as before.
     """
-    def __init__(self):
-        self.lockouts = {}  # track how many times we've voted on a particular branch
-        self.finalized_blocks = {}
+
+    def __init__(self, stakes: Optional[Dict[str, int]] = None, local_validator: str = "local",
+                 confirmation_depth: int = 1, retain_finalized: int = 1024):
+        if stakes is None:
+            stakes = {local_validator: 1}
+        self.stakes = dict(stakes)
+        self.total_stake = sum(self.stakes.values())
+        if self.total_stake <= 0:
+            raise ValueError("total stake must be positive")
+        self.local_validator = local_validator
+        self.confirmation_depth = confirmation_depth
+        self.retain_finalized = retain_finalized
+
+        self.towers: Dict[str, List[Lockout]] = {v: [] for v in self.stakes}
+        self.validator_roots: Dict[str, Optional[int]] = {v: None for v in self.stakes}
+        self.root: Optional[int] = None
+        self.blocks: Dict[int, object] = {}       # not yet finalized
+        self._parents: Dict[int, int] = {}        # slot -> parent slot, for unrooted slots
+        self._stake: Dict[int, int] = {}          # slot -> stake with a deep-enough vote on it
+        self.finalized_blocks: "OrderedDict[int, object]" = OrderedDict()
+        self._finalized_runs: List[List[int]] = []  # sorted, disjoint [first, last] slot ranges
+        self.finalized_watermark = 0  # runs cover no slot below this
+        self.lockouts = self.towers  # older name
+        self.stats = {"votes": 0, "rejected_lockout": 0, "rejected_stale": 0, "rejected_unknown": 0}
+
+    # --- blocks -----------------------------------------------------------------
+
+    def add_block(self, block):
+        """
+        Registers a block (and its parent link) so votes on it can be fork-checked.
+        """
+        slot = block.block_id
+        if self.root is not None and slot <= self.root:
+            return
+        self.blocks[slot] = block
+        self._parents[slot] = block.prev_block_id
+
+    def _is_ancestor(self, ancestor: int, slot: int) -> bool:
+        """
+        True if ancestor is slot or lies on slot's chain. Unknown (or pruned) links
+        count as connected: without the block we can't prove a fork switch.
+        """
+        parents = self._parents
+        while slot > ancestor:
+            parent = parents.get(slot)
+            if parent is None:
+                return True
+            slot = parent
+        return slot == ancestor
+
+    # --- votes ------------------------------------------------------------------
 
     def vote_on_block(self, block):
         """
-        In real Tower BFT, you'd broadcast a 'vote' referencing the PoH height,
-        then lock out alternative branches if you keep voting on the same chain.
+        Records the block and casts the local validator's vote on it.
         """
-        # For demonstration, we just store a vote
-        self.finalized_blocks[block.block_id] = block
+        self.add_block(block)
+        self.ingest_votes([Vote(self.local_validator, block.block_id)])
         return True
 
+    def ingest_votes(self, votes: Iterable[Tuple[str, int]]) -> List[int]:
+        """
+        Applies a batch of (validator, slot) votes, then checks finality once for
+        every slot whose tally moved. Returns the newly finalized slots, oldest first.
+        """
+        touched = set()
+        for validator, slot in votes:
+            self._apply_vote(validator, slot, touched)
+        return self._check_finality(touched)
+
+    def _apply_vote(self, validator: str, slot: int, touched: set):
+        stake = self.stakes.get(validator)
+        if stake is None:
+            self.stats["rejected_unknown"] += 1
+            return
+        tower = self.towers[validator]
+        root = self.root
+        if (tower and slot <= tower[-1].slot) or (root is not None and (slot <= root or not self._is_ancestor(root, slot))):
+            self.stats["rejected_stale"] += 1
+            return
+
+        # Pop expired votes, then refuse to switch forks past a live lockout
+        depth = self.confirmation_depth
+        tally = self._stake
+        popped = 0
+        while len(tower) > popped and tower[-1 - popped].expiration < slot:
+            popped += 1
+        if len(tower) > popped and not self._is_ancestor(tower[-1 - popped].slot, slot):
+            self.stats["rejected_lockout"] += 1
+            return
+        for _ in range(popped):
+            old = tower.pop()
+            if old.confirmations >= depth and old.slot in tally:
+                tally[old.slot] -= stake
+                touched.add(old.slot)
+
+        tower.append(Lockout(slot))
+        size = len(tower)
+        for i, lockout in enumerate(tower):
+            if size > i + lockout.confirmations:
+                lockout.confirmations += 1
+                if lockout.confirmations == depth:
+                    self._credit(lockout.slot, stake, touched)
+        if depth <= 1:
+            self._credit(slot, stake, touched)
+        if size > MAX_LOCKOUT_HISTORY:
+            self.validator_roots[validator] = tower.pop(0).slot
+        # Entries at or below the cluster root no longer matter
+        if root is not None:
+            while tower and tower[0].slot <= root:
+                tower.pop(0)
+        self.stats["votes"] += 1
+
+    def _credit(self, slot: int, stake: int, touched: set):
+        if self.root is None or slot > self.root:
+            self._stake[slot] = self._stake.get(slot, 0) + stake
+            touched.add(slot)
+
+    # --- finality ---------------------------------------------------------------
+
+    def _supermajority(self, stake: int) -> bool:
+        return 3 * stake > 2 * self.total_stake
+
+    def _check_finality(self, touched: Iterable[int]) -> List[int]:
+        best = None
+        for slot in touched:
+            if self._supermajority(self._stake.get(slot, 0)) and (best is None or slot > best):
+                best = slot
+        if best is None or (self.root is not None and best <= self.root):
+            return []
+        return self._set_root(best)
+
+    def _set_root(self, new_root: int) -> List[int]:
+        # The new root and its unfinalized ancestors become final
+        chain = []
+        slot = new_root
+        while self.root is None or slot > self.root:
+            chain.append(slot)
+            slot = self._parents.get(slot)
+            if slot not in self._parents:
+                break  # genesis parent, or a block we never saw
+        chain.reverse()
+        for slot in chain:
+            self._mark_finalized(slot, self.blocks.pop(slot, None))
+        self.root = new_root
+
+        # Prune everything at or below the root; blocks that don't descend from it are dead
+        self._stake = {s: v for s, v in self._stake.items() if s > new_root}
+        parents = {s: p for s, p in self._parents.items() if s > new_root}
+        self._parents = parents
+        for slot in [s for s in self.blocks if s <= new_root or not self._is_ancestor(new_root, s)]:
+            del self.blocks[slot]
+            parents.pop(slot, None)
+        return chain
+
+    def _mark_finalized(self, slot: int, block):
+        runs = self._finalized_runs
+        if runs and runs[-1][1] == slot - 1:
+            runs[-1][1] = slot
+        else:
+            runs.append([slot, slot])
+        # Slide the window: drop runs that ended below it and clip the first one
+        watermark = slot - self.retain_finalized + 1
+        if watermark > self.finalized_watermark:
+            self.finalized_watermark = watermark
+            if runs[0][0] < watermark:
+                i = bisect_right(runs, [watermark, float("inf")]) - 1
+                if runs[i][1] < watermark:
+                    i += 1
+                del runs[:i]
+                runs[0][0] = max(runs[0][0], watermark)
+        if block is not None:
+            self.finalized_blocks[slot] = block
+            while len(self.finalized_blocks) > self.retain_finalized:
+                self.finalized_blocks.popitem(last=False)
+
+    def restore_finalized(self, block):
+        """
+        Re-registers a block finalized before a restart (see storage.durable_ledger).
+        """
+        slot = block.block_id
+        if self.root is None or slot > self.root:
+            self._mark_finalized(slot, block)
+            self.root = slot
+
     def is_finalized(self, block_id):
-        return block_id in self.finalized_blocks
+        if block_id < self.finalized_watermark:
+            return False
+        runs = self._finalized_runs
+        i = bisect_right(runs, [block_id, float("inf")]) - 1
+        return i >= 0 and runs[i][0] <= block_id <= runs[i][1]
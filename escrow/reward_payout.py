@@ -0,0 +1,152 @@
+# escrow/reward_payout.py
+
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from concurrency.ops import Credit, Debit
+from concurrency.transaction import Transaction
+
+ESCROW_KEY = "ESCROW_POOL"
+
+
+def balance_key(node_id: str) -> str:
+    return f"BAL_{node_id}"
+
+
+def split_pool(pool: int, scores: np.ndarray) -> np.ndarray:
+    """
+    Splits `pool` integer units in proportion to scores (negative scores count as 0)
+    by largest remainder: everyone gets the floor of their exact share, and the
+    units left over go one each to the largest fractional parts (ties to the lower
+    index). The result sums to exactly `pool`, or is all zeros if no score is
+    positive.
+    """
+    weights = np.clip(np.asarray(scores, dtype=np.float64), 0.0, None)
+    total = weights.sum()
+    if pool <= 0 or total <= 0:
+        return np.zeros(len(weights), dtype=np.int64)
+    exact = weights * (pool / total)
+    amounts = np.floor(exact).astype(np.int64)
+    # Float error can push the floors a unit either way; the remainder step absorbs it
+    leftover = pool - int(amounts.sum())
+    if leftover > 0:
+        order = np.argsort(-(exact - amounts), kind="stable")
+        amounts[order[:leftover]] += 1
+    elif leftover < 0:
+        order = np.argsort(exact - amounts, kind="stable")
+        order = order[amounts[order] > 0]
+        amounts[order[:-leftover]] -= 1
+    return amounts
+
+
+class RewardPayout:
+    """
+    One synergy payout, as transactions that parallelize:
+
+      - debit_tx: a single Debit of the whole amount from ESCROW_POOL
+      - credit transactions: Credits to BAL_<node>, credits_per_tx nodes each. No
+        two share a key, so a block of them is one conflict-free wave, and
+        single-Credit transactions take the vectorized executor's array path
+
+    Amounts are computed up front (split_pool), but the credit transactions are
+    built lazily, block by block, by credit_blocks(). Only the debit moves funds
+    out of escrow, so the credits are released only once confirm_debit() has seen
+    the debit succeed in an executed block. confirm_credits() records which credit
+    transactions went through; credit_blocks() then yields only the rest, so a
+    failed or lost credit can be resubmitted without paying anyone twice.
+
+    scores keeps the scores the payout was computed from, so they can be handed
+    back (AINodeAggregator.restore_payout) if the debit fails.
+    """
+
+    def __init__(self, payout_id: str, scores: Dict[str, float], pool: int,
+                 credits_per_tx: int = 1, memo: str = "Monthly synergy distribution from AI aggregator"):
+        if credits_per_tx < 1:
+            raise ValueError("credits_per_tx must be positive")
+        self.payout_id = payout_id
+        self.scores = dict(scores)
+        self.memo = memo
+        self.credits_per_tx = credits_per_tx
+        node_ids = sorted(scores)
+        amounts = split_pool(int(pool), np.fromiter((scores[n] for n in node_ids), dtype=np.float64,
+                                                     count=len(node_ids)))
+        paid = np.nonzero(amounts)[0]
+        self.node_ids: List[str] = [node_ids[i] for i in paid]
+        self.amounts = amounts[paid]
+        self.total = int(self.amounts.sum())
+        self.debit_confirmed = False
+        self._credited = np.zeros(len(self), dtype=bool)  # by credit transaction index
+
+    def __len__(self) -> int:
+        """
+        Number of credit transactions.
+        """
+        return -(-len(self.node_ids) // self.credits_per_tx)
+
+    @property
+    def debit_tx_id(self) -> str:
+        return f"{self.payout_id}_DEBIT"
+
+    def debit_tx(self) -> Transaction:
+        return Transaction.from_ops(self.debit_tx_id, [Debit(ESCROW_KEY, self.total)], memo=self.memo)
+
+    def confirm_debit(self, results: Dict) -> bool:
+        """
+        Checks an executed block's results for the debit; returns whether it went
+        through (credits may then be issued).
+        """
+        outcome = results.get(self.debit_tx_id)
+        if outcome is not None:
+            self.debit_confirmed = bool(outcome[0])
+        return self.debit_confirmed
+
+    def confirm_credits(self, results: Dict) -> int:
+        """
+        Records the credit transactions that succeeded in an executed block's
+        results; returns how many are still outstanding.
+        """
+        prefix = f"{self.payout_id}_CREDIT_"
+        for tx_id, outcome in results.items():
+            if tx_id.startswith(prefix) and outcome[0]:
+                self._credited[int(tx_id[len(prefix):])] = True
+        return self.credits_outstanding()
+
+    def credits_outstanding(self) -> int:
+        return len(self) - int(self._credited.sum())
+
+    def payouts(self) -> Dict[str, int]:
+        return dict(zip(self.node_ids, self.amounts.tolist()))
+
+    def credit_txs(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Transaction]:
+        """
+        Credit transactions start..stop (by transaction index), skipping those
+        confirm_credits() has seen succeed.
+        """
+        per = self.credits_per_tx
+        stop = len(self) if stop is None else min(stop, len(self))
+        ids = self.node_ids
+        credited = self._credited
+        for t in range(start, stop):
+            if credited[t]:
+                continue
+            lo = t * per
+            amounts = self.amounts[lo:lo + per].tolist()
+            ops = [Credit(balance_key(n), a) for n, a in zip(ids[lo:lo + per], amounts)]
+            yield Transaction.from_ops(f"{self.payout_id}_CREDIT_{t}", ops, memo=self.memo)
+
+    def credit_blocks(self, txs_per_block: int = 4096) -> Iterator[List[Transaction]]:
+        """
+        The credit transactions not yet confirmed, in blocks of up to txs_per_block;
+        each block is built only when requested.
+        """
+        if not self.debit_confirmed:
+            raise RuntimeError(f"payout {self.payout_id}: escrow debit not confirmed")
+        block = []
+        for tx in self.credit_txs():
+            block.append(tx)
+            if len(block) == txs_per_block:
+                yield block
+                block = []
+        if block:
+            yield block
@@ -0,0 +1,143 @@
+# ingest/loadgen.py
+#
+# Load generator for ingest.server: streams pre-encoded transactions over several
+# connections and reports throughput and ingest latency (send -> status byte back).
+#
+#   python -m ingest.loadgen --spawn --connections 4 --txs 200000
+#   python -m ingest.loadgen --spawn --server-processes 8 --connections 32 --txs 2000000
+#   python -m ingest.loadgen --port 7070 --txs 1000000 --rate 150000
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import deque
+from typing import List, Optional
+
+from concurrency.ops import Transfer
+from concurrency.transaction import Transaction
+from ingest.server import ACCEPTED, DUPLICATE, FRAME_HEADER, INVALID
+
+
+def make_frames(count: int, accounts: int, seed: int, prefix: str) -> List[bytes]:
+    rng = random.Random(seed)
+    frames = []
+    for i in range(count):
+        src, dst = rng.randrange(accounts), rng.randrange(accounts)
+        tx = Transaction.from_ops(f"{prefix}-{i}", [Transfer(f"acct{src}", f"acct{dst}", 1)],
+                                  fee=round(rng.random(), 4))
+        payload = tx.encode()
+        frames.append(FRAME_HEADER.pack(len(payload)) + payload)
+    return frames
+
+
+async def run_connection(frames: List[bytes], host, port, path, batch: int,
+                         rate: Optional[float], latencies: List[float], counts: List[int]):
+    if path:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    sent = deque()  # (send time, frames in that write), in order
+
+    async def receive():
+        remaining = len(frames)
+        pending_at, pending_n = 0.0, 0
+        while remaining:
+            header = await reader.readexactly(4)
+            (n,) = FRAME_HEADER.unpack(header)
+            status = await reader.readexactly(n)
+            now = time.perf_counter()
+            for code in status:
+                if not pending_n:
+                    pending_at, pending_n = sent.popleft()
+                pending_n -= 1
+                latencies.append(now - pending_at)
+                counts[code] += 1
+            remaining -= n
+
+    receiver = asyncio.create_task(receive())
+    started = time.perf_counter()
+    for i in range(0, len(frames), batch):
+        chunk = frames[i:i + batch]
+        if rate:
+            # Open-loop pacing: hold back until this batch's scheduled send time
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        sent.append((time.perf_counter(), len(chunk)))
+        writer.write(b"".join(chunk))
+        await writer.drain()
+    await receiver
+    writer.close()
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+async def run(args) -> dict:
+    per_conn = args.txs // args.connections
+    frames = [make_frames(per_conn, args.accounts, args.seed + c, f"lg{os.getpid()}-{c}")
+              for c in range(args.connections)]
+    latencies: List[float] = []
+    counts = [0, 0, 0]
+    rate = args.rate / args.connections if args.rate else None
+    started = time.perf_counter()
+    await asyncio.gather(*(run_connection(f, args.host, args.port, args.unix, args.batch, rate,
+                                          latencies, counts) for f in frames))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    ms = lambda p: round(percentile(latencies, p) * 1e3, 3)
+    return {
+        "connections": args.connections,
+        "txs": per_conn * args.connections,
+        "elapsed_s": round(elapsed, 3),
+        "tx_per_s": round(per_conn * args.connections / elapsed),
+        "accepted": counts[ACCEPTED],
+        "duplicate": counts[DUPLICATE],
+        "invalid": counts[INVALID],
+        "latency_ms": {"p50": ms(0.50), "p90": ms(0.90), "p99": ms(0.99), "p999": ms(0.999),
+                       "max": ms(1.0)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest load generator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--unix", default=None, help="connect to this Unix socket instead")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--txs", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=256, help="frames per socket write")
+    parser.add_argument("--rate", type=float, default=None, help="target tx/s overall (default: as fast as possible)")
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="start an ingest.server subprocess for the run")
+    parser.add_argument("--server-processes", type=int, default=1, help="--processes for the spawned server")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        cmd = [sys.executable, "-m", "ingest.server", "--port", str(args.port)]
+        if args.unix:
+            cmd += ["--unix", args.unix]
+        if args.server_processes > 1:
+            cmd += ["--processes", str(args.server_processes)]
+        server = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+        server.stdout.readline()  # "[ingest] listening on ..."
+    try:
+        print(json.dumps(asyncio.run(run(args)), indent=2))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# ingest/server.py
+#
+# Transaction intake over TCP or a Unix socket.
+#
+#   python -m ingest.server --port 7070 --proposers 4
+#   python -m ingest.server --port 7070 --processes 8    # one acceptor per core
+
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import signal
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from concurrency.batch_proposer import BatchProposer
+from concurrency.ops import ops_access_lists
+from concurrency.transaction import Transaction
+
+# Wire format, both directions: u32 big-endian length + payload.
+#   client -> server: payload is one Transaction.encode()
+#   server -> client: payload is one status byte per transaction of a received chunk,
+#                     in the order they were sent
+FRAME_HEADER = struct.Struct(">I")
+
+ACCEPTED = 0
+DUPLICATE = 1     # already pending (or already finalized)
+INVALID = 2       # undecodable, or not something the ledger can execute
+
+DECODE_ERRORS = (ValueError, IndexError, struct.error)
+
+
+class FrameError(Exception):
+    pass
+
+
+def split_frames(buf: bytearray, max_frame: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Finds the complete frames at the start of buf. Returns (bytes consumed,
+    [(payload start, payload end), ...]).
+    """
+    spans = []
+    offset = 0
+    size = len(buf)
+    unpack = FRAME_HEADER.unpack_from
+    while size - offset >= 4:
+        (length,) = unpack(buf, offset)
+        if length > max_frame:
+            raise FrameError(f"frame of {length} bytes exceeds the {max_frame} byte limit")
+        end = offset + 4 + length
+        if end > size:
+            break
+        spans.append((offset + 4, end))
+        offset = end
+    return offset, spans
+
+
+def validate(tx: Transaction) -> bool:
+    """
+    Wire transactions must be op-based (closures don't survive the wire) with a
+    finite, non-negative fee, and must declare every key their ops touch: the
+    scheduler and the locks go by the declared sets, so an undeclared write would
+    escape conflict detection.
+    """
+    if not (tx.tx_id and tx.ops is not None and math.isfinite(tx.fee) and tx.fee >= 0):
+        return False
+    try:
+        reads, writes = ops_access_lists(tx.ops)
+    except TypeError:
+        return False
+    return reads <= tx.read_keys and writes <= tx.write_keys
+
+
+class IngestServer:
+    """
+    Accepts length-prefixed encoded transactions and feeds them to BatchProposers.
+
+    Each connection's reads are cut into chunks of whole frames. A chunk is decoded,
+    validated and routed on a worker pool: the tx-id hash picks the primary proposer
+    (the transaction goes into its primary bucket) and the next proposer round the
+    ring gets it in its secondary bucket. Per-transaction status bytes go back to
+    the client in send order, one response frame per chunk.
+
+    Backpressure:
+      - per connection, at most max_inflight chunks may be in flight; the handler
+        stops reading until one is acknowledged, so TCP flow control slows the sender
+      - globally, when the primary buckets together hold high_water transactions,
+        every connection stops reading until they drain below low_water (checked
+        before each read, so the buckets can overshoot by one read's worth)
+    """
+
+    def __init__(self, proposers: Sequence[BatchProposer], workers: Optional[int] = None,
+                 max_frame: int = 64 << 10, read_size: int = 256 << 10, max_inflight: int = 4,
+                 high_water: int = 500_000, low_water: Optional[int] = None):
+        if not proposers:
+            raise ValueError("at least one proposer is required")
+        self.proposers = list(proposers)
+        self.max_frame = max_frame
+        self.read_size = read_size
+        self.max_inflight = max_inflight
+        self.high_water = high_water
+        self.low_water = low_water if low_water is not None else high_water * 3 // 4
+        self._pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                        thread_name_prefix="ingest-decode")
+        self._server = None
+        self._handlers = {}  # connection task -> its writer
+        self._paused = False
+        self._stats_lock = threading.Lock()
+        self.stats = {"connections": 0, "frames": 0, "accepted": 0, "duplicate": 0,
+                      "invalid": 0, "protocol_errors": 0, "paused_s": 0.0}
+
+    # --- routing ----------------------------------------------------------------
+
+    def route(self, tx_id: str) -> Tuple[BatchProposer, Optional[BatchProposer]]:
+        n = len(self.proposers)
+        h = zlib.crc32(tx_id.encode("utf-8")) % n
+        return self.proposers[h], self.proposers[(h + 1) % n] if n > 1 else None
+
+    def pending(self) -> int:
+        return sum(len(p.primary_bucket) for p in self.proposers)
+
+    def _ingest_chunk(self, chunk: bytes, spans: List[Tuple[int, int]]) -> bytes:
+        # Runs on the worker pool; buckets are thread-safe
+        view = memoryview(chunk)
+        status = bytearray(len(spans))
+        counts = [0, 0, 0]
+        for i, (start, end) in enumerate(spans):
+            try:
+                tx = Transaction.decode(view[start:end])
+            except DECODE_ERRORS:
+                tx = None
+            if tx is None or not validate(tx):
+                code = INVALID
+            else:
+                primary, secondary = self.route(tx.tx_id)
+                code = ACCEPTED if primary.add_to_primary(tx) else DUPLICATE
+                if code == ACCEPTED and secondary is not None:
+                    secondary.add_to_secondary(tx)
+            status[i] = code
+            counts[code] += 1
+        with self._stats_lock:
+            stats = self.stats
+            stats["frames"] += len(spans)
+            stats["accepted"] += counts[ACCEPTED]
+            stats["duplicate"] += counts[DUPLICATE]
+            stats["invalid"] += counts[INVALID]
+        return bytes(status)
+
+    # --- backpressure -----------------------------------------------------------
+
+    async def _wait_for_space(self):
+        if not self._paused and self.pending() < self.high_water:
+            return
+        started = time.perf_counter()
+        self._paused = True
+        while self.pending() >= self.low_water:
+            await asyncio.sleep(0.005)
+        if self._paused:
+            self._paused = False
+            self.stats["paused_s"] += time.perf_counter() - started
+
+    # --- connections ------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        self._handlers[asyncio.current_task()] = writer
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_inflight)
+        inflight: deque = deque()
+        more = asyncio.Event()
+        done = False
+
+        async def acknowledge():
+            # Replies strictly in chunk order, whatever order the pool finishes in
+            while inflight or not done:
+                if not inflight:
+                    more.clear()
+                    await more.wait()
+                    continue
+                status = await inflight.popleft()
+                writer.write(FRAME_HEADER.pack(len(status)) + status)
+                await writer.drain()
+                slots.release()
+
+        acker = asyncio.create_task(acknowledge())
+        buf = bytearray()
+        try:
+            while True:
+                await self._wait_for_space()
+                data = await reader.read(self.read_size)
+                if not data:
+                    break
+                buf += data
+                consumed, spans = split_frames(buf, self.max_frame)
+                if not spans:
+                    continue
+                chunk = bytes(buf[:consumed])
+                del buf[:consumed]
+                await slots.acquire()
+                inflight.append(loop.run_in_executor(self._pool, self._ingest_chunk, chunk, spans))
+                more.set()
+        except FrameError:
+            self.stats["protocol_errors"] += 1
+        except ConnectionError:
+            pass
+        finally:
+            done = True
+            more.set()
+            try:
+                await acker
+            except ConnectionError:
+                pass
+            writer.close()
+            self._handlers.pop(asyncio.current_task(), None)
+
+    # --- lifecycle --------------------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 7070, path: Optional[str] = None,
+                    reuse_port: bool = False):
+        """
+        Listens on a Unix socket when path is given, else on host:port (port 0 picks
+        a free one; see .address). With reuse_port, several servers (one per process)
+        can listen on the same port and the kernel spreads connections over them.
+        """
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, reuse_port=reuse_port)
+        return self
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname() if self._server else None
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Closing the transports ends each handler's read loop
+            handlers = list(self._handlers)
+            for writer in self._handlers.values():
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+        self._pool.shutdown(wait=True)
+
+
+def drain_proposers(proposers: Sequence[BatchProposer], batch_size: int, interval: float,
+                    stop: threading.Event):
+    """
+    Stands in for block production when the server runs alone: forms a batch from
+    every proposer every interval seconds and marks it finalized.
+    """
+    while not stop.wait(interval):
+        for proposer in proposers:
+            batch = proposer.form_batch(max_txs=batch_size)
+            if batch:
+                proposer.mark_finalized(batch)
+
+
+async def _serve(args, shard: int = 0, ready=None):
+    from concurrency.tx_bucket import FinalizedTxIndex
+
+    finalized = FinalizedTxIndex()
+    # Secondary buckets are only drained by fallback batches; the cap keeps them bounded
+    proposers = [BatchProposer(f"Node{shard * args.proposers + i}", finalized=finalized,
+                               max_bucket_txs=args.high_water)
+                 for i in range(args.proposers)]
+    server = IngestServer(proposers, workers=args.workers, high_water=args.high_water)
+    await server.start(args.host, args.port, args.unix, reuse_port=args.processes > 1)
+    if ready is not None:
+        ready.set()
+    else:
+        print(f"[ingest] listening on {args.unix or server.address}", flush=True)
+    stop = threading.Event()
+    if args.drain_batch:
+        threading.Thread(target=drain_proposers, args=(proposers, args.drain_batch, args.drain_interval, stop),
+                         name="ingest-drain", daemon=True).start()
+    try:
+        await server.serve_forever()
+    finally:
+        stop.set()
+        await server.close()
+        print(f"[ingest{f' {shard}' if ready is not None else ''}] {server.stats}", flush=True)
+
+
+def _run_shard(args, shard: int, ready):
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(_serve(args, shard, ready))
+    except KeyboardInterrupt:
+        pass
+
+
+def serve_sharded(args):
+    """
+    Runs args.processes acceptor processes on one SO_REUSEPORT port. Decoding and
+    validation are pure Python, so one process is bound to one core however many
+    worker threads it has; separate processes spread intake over the cores. Each
+    process is a shard with its own proposers (args.proposers of them), finalized
+    index and duplicate check: a transaction resent on a connection the kernel hands
+    to another process is not recognized as a duplicate at intake.
+    """
+    shards = []
+    for shard in range(args.processes):
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=_run_shard, args=(args, shard, ready),
+                                          name=f"ingest-{shard}")
+        process.start()
+        shards.append((process, ready))
+    try:
+        for process, ready in shards:
+            while not ready.wait(0.1):
+                if not process.is_alive():
+                    raise SystemExit(f"[ingest] {process.name} exited with code {process.exitcode}")
+        print(f"[ingest] listening on {(args.host, args.port)} with {args.processes} processes", flush=True)
+        for process, _ in shards:
+            process.join()
+    finally:
+        for process, _ in shards:
+            if process.is_alive():
+                process.terminate()
+        for process, _ in shards:
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transaction intake server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket path instead")
+    parser.add_argument("--proposers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None, help="decode threads per process")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="acceptor processes sharing --port via SO_REUSEPORT, each with its own proposers")
+    parser.add_argument("--high-water", type=int, default=500_000)
+    parser.add_argument("--drain-batch", type=int, default=20_000,
+                        help="txs per proposer taken every --drain-interval (0 disables)")
+    parser.add_argument("--drain-interval", type=float, default=0.1)
+    args = parser.parse_args()
+    if args.processes > 1 and (args.unix or not args.port):
+        parser.error("--processes needs a fixed TCP --port")
+    # Stop cleanly (and print stats) on SIGTERM too
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        if args.processes > 1:
+            serve_sharded(args)
+        else:
+            asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
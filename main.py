@@ -5,31 +5,58 @@ import os
 
 from concurrency.account_state import AccountState
 from concurrency.concurrency_engine import ConcurrencyEngine
-from concurrency.daqc import compute_daqc
 from concurrency.transaction import Transaction
 from concurrency.batch_proposer import BatchProposer
+from concurrency.block_packer import BlockPacker
+from concurrency.sigverify import SigVerifier
+from concurrency.tx_bucket import FinalizedTxIndex
 from concurrency.epoch_manager import EpochManager
+from concurrency.state_commitment import StateCommitment
 
-from consensus.poh import PoHGenerator
+from consensus.poh_service import PoHService
 from consensus.tower_bft import TowerBFT
 from consensus.block_builder import BlockBuilder
+from consensus.block_pipeline import BlockPipeline
 
+from aggregator.score_cache import ScoreCache
+from aggregator.scoring_service import ScoringService
 from aggregator.synergy_ai import AINodeAggregator
 from escrow.escrow_manager import EscrowManager
+from storage.durable_ledger import DurableLedger
+from metrics.profiler import SlowBlockProfiler
+from metrics.registry import METRICS, serve_metrics
 
 # Import sample transactions for demonstration
 from samples.sample_transactions import get_demo_transactions
 
 def main():
+    # Set POSTFIAT_METRICS=1 to collect metrics and profile the slowest blocks (printed
+    # at exit); POSTFIAT_METRICS_PORT also serves them at /metrics and /metrics.json
+    if os.environ.get("POSTFIAT_METRICS"):
+        METRICS.enable()
+        METRICS.profiler = SlowBlockProfiler()
+        if os.environ.get("POSTFIAT_METRICS_PORT"):
+            serve_metrics(METRICS, port=int(os.environ["POSTFIAT_METRICS_PORT"]))
+
     # 1) Initialize ledger & concurrency
     account_state = AccountState()
     concurrency_engine = ConcurrencyEngine(account_state)
+    # Set POSTFIAT_LEDGER_DIR to persist finalized blocks and state across restarts
+    ledger_dir = os.environ.get("POSTFIAT_LEDGER_DIR")
+    ledger = DurableLedger(ledger_dir) if ledger_dir else None
+    recovery = ledger.recover(account_state, concurrency_engine) if ledger else None
     escrow_mgr = EscrowManager(account_state)  # ensures ESCROW_POOL is in place
+    state_commitment = StateCommitment()
+    state_commitment.commit(account_state, account_state.keys())  # genesis root
 
     # 2) Initialize consensus (PoH + Tower BFT)
-    poh = PoHGenerator()
+    poh = PoHService().start()  # continuous PoH thread
     tower_bft = TowerBFT()
     block_builder = BlockBuilder(poh, tower_bft)
+    if recovery is not None:
+        recovery.restore_chain(tower_bft, block_builder)
+        print(f"Recovered ledger through block {recovery.last_block_id} "
+              f"({len(recovery.blocks)} journaled blocks, {recovery.replayed_keys} keys replayed)")
 
     # 3) Node profiles + aggregator
     node_profiles = {
@@ -37,17 +64,24 @@ def main():
         "NodeB": "Focus: NFTs, gaming synergy",
         "NodeC": "Focus: cross-chain bridging"
     }
+    # LLM scores are cached; with a ledger directory the cache persists next to it
+    score_cache = ScoreCache(os.path.join(ledger_dir, "scores.sqlite") if ledger_dir else None)
     # We'll let the aggregator produce synergy-based payouts every 15 seconds for this demo
-    aggregator = AINodeAggregator(node_profiles=node_profiles, monthly_cycle=15.0)
+    aggregator = AINodeAggregator(node_profiles=node_profiles, monthly_cycle=15.0,
+                                  score_cache=score_cache)
+    # Synergy scoring runs off the block path; payouts wait for it to catch up
+    scoring = aggregator.use_scoring_service(ScoringService(aggregator).start())
 
     # 3a) Epoch Manager for Node Reassignments (optional)
     node_list = ["NodeA", "NodeB", "NodeC"]
     epoch_mgr = EpochManager(node_list)
-    epoch_mgr.start_new_epoch(clan_size=2)  # just for demonstration
+    # seeded from the PoH hash, so every node derives the same clans
+    epoch_mgr.start_new_epoch(clan_size=2, poh_hash=poh.get_current_poh())  # just for demonstration
 
     # 4) Create some batch proposers (assume NodeA & NodeB, NodeC is idle)
-    proposerA = BatchProposer("NodeA")
-    proposerB = BatchProposer("NodeB")
+    finalized_txs = FinalizedTxIndex()  # shared, so no proposer re-batches a finalized tx
+    proposerA = BatchProposer("NodeA", finalized=finalized_txs)
+    proposerB = BatchProposer("NodeB", finalized=finalized_txs)
 
     # 4a) Load sample transactions
     demo_txs = get_demo_transactions()
@@ -56,54 +90,95 @@ def main():
     proposerA.add_to_primary(demo_txs[1])
     proposerB.add_to_primary(demo_txs[2])
 
-    # 5) Optionally let aggregator reorder tasks for synergy if desired
-    new_batchA = aggregator.propose_ordering_for_block(proposerA.primary_bucket, "NodeA")
-    new_batchB = aggregator.propose_ordering_for_block(proposerB.primary_bucket, "NodeB")
-    # Then replace the proposers' buckets
-    proposerA.primary_bucket = new_batchA
-    proposerB.primary_bucket = new_batchB
-
-    # 6) Form batch from each
+    # 5) Form batch from each (fee order, deduplicated)
     batchA = proposerA.form_batch()
     batchB = proposerB.form_batch()
 
-    # Produce data availability certificates
-    daqcA = compute_daqc(batchA)
-    daqcB = compute_daqc(batchB)
-
-    # 7) Build + finalize block
-    poh.record_event(b"block1")
-    block1 = block_builder.build_block([daqcA, daqcB])
-    finalized = block_builder.finalize_block(block1)
-
-    if finalized:
-        all_txs = batchA + batchB
-        concurrency_results = concurrency_engine.execute_block_of_transactions(all_txs)
-
-        # aggregator: gather memos + node activity
-        block_memos = [tx.memo for tx in all_txs]
-        # NodeA, NodeB each get a base of 5 points for participating
-        aggregator.process_final_block(
-            block=block1,
-            node_activity={"NodeA": 5, "NodeB": 5},
-            block_memos=block_memos
-        )
-
-        print("\n== Block1 Finalized, concurrency results:", concurrency_results)
+    # 6) Optionally let aggregator reorder the formed batches for synergy if desired
+    batchA = aggregator.propose_ordering_for_block(batchA, "NodeA")
+    batchB = aggregator.propose_ordering_for_block(batchB, "NodeB")
+
+    # 7) Produce blocks through the pipeline: certificates, PoH + vote, then execution
+    #    against the ledger, each stage overlapping with the neighbouring blocks
+    def on_executed(job):
+        if job.meta.get("payout"):
+            job.meta["payout"].confirm_debit(job.results)
+            job.meta["payout"].confirm_credits(job.results)
+        for proposer in (proposerA, proposerB):
+            proposer.mark_finalized(job.txs)
+        if job.meta.get("node_activity"):
+            # aggregator: gather memos + node activity
+            aggregator.process_final_block(
+                block=job.block,
+                node_activity=job.meta["node_activity"],
+                block_memos=[tx.memo for tx in job.txs]
+            )
+        print(f"\n== Block {job.block.block_id} Finalized, concurrency results:", job.results)
         print("Ledger State now:", account_state.state_store)
+        print("State root:", pipeline.executed_root.hex())
+
+    # The collect stage packs each block so no hot account serializes it; whatever
+    # doesn't fit goes back to the proposer it came from
+    packer = BlockPacker()
+
+    def pack_block(batches, meta):
+        packed, result = packer.pack_batches(batches)
+        deferred = {tx.tx_id for tx in result.deferred}
+        for proposer, batch in zip(meta.get("proposers", ()), batches):
+            for tx in batch:
+                if tx.tx_id in deferred:
+                    proposer.add_to_secondary(tx)
+        return packed
+
+    # Signed transactions are verified before packing; the demo ones are unsigned, so
+    # let those through
+    sigverifier = SigVerifier(require_signatures=False)
+    pipeline = BlockPipeline(block_builder, concurrency_engine, state_commitment, ledger=ledger,
+                             collect_fn=pack_block, on_executed=on_executed,
+                             sigverifier=sigverifier).start()
+    # NodeA, NodeB each get a base of 5 points for participating
+    pipeline.submit([batchA, batchB], node_activity={"NodeA": 5, "NodeB": 5},
+                    proposers=[proposerA, proposerB])
+    pipeline.drain()
 
     # 8) Sleep & see if aggregator triggers monthly synergy
     print("\nSleeping for aggregator cycle...\n")
     time.sleep(3)
 
-    synergy_tx = aggregator.maybe_run_monthly()
-    if synergy_tx:
-        poh.record_event(b"block2")
-        daqcReward = compute_daqc([synergy_tx])
-        block2 = block_builder.build_block([daqcReward])
-        block_builder.finalize_block(block2)
-        concurrency_engine.execute_block_of_transactions([synergy_tx])
-        print("== AI Reward TX executed. Ledger State now:", account_state.state_store)
+    payout = aggregator.maybe_run_monthly(wait_timeout=30)
+    if payout:
+        # One escrow debit first; once it has executed, the per-node credits follow as
+        # conflict-free blocks
+        print(f"== AI Reward payout {payout.payout_id}: {payout.total} to {len(payout.node_ids)} nodes")
+        pipeline.submit([[payout.debit_tx()]], payout=payout)
+        pipeline.drain()
+        if payout.debit_confirmed:
+            # Credits that didn't execute are resubmitted; the ones that did are skipped
+            for _ in range(3):
+                for credits in payout.credit_blocks():
+                    pipeline.submit([credits], payout=payout)
+                pipeline.drain()
+                if not payout.credits_outstanding():
+                    break
+                print(f"== AI Reward payout: {payout.credits_outstanding()} credit transactions failed")
+        else:
+            aggregator.restore_payout(payout)
+            print("== AI Reward payout aborted: escrow debit failed")
+    pipeline.close()
+    sigverifier.shutdown()
+    report = pipeline.report()
+    print(f"Pipeline: {report['blocks']} blocks, bottleneck={report['bottleneck']}, "
+          f"latency_ms={report['latency_ms']}")
+
+    poh.stop()
+    scoring.stop(timeout=5)
+    score_cache.close()
+    if ledger:
+        ledger.close()
+    if METRICS.enabled:
+        print("\n" + METRICS.prometheus_text(), end="")
+        for slow in METRICS.profiler.slowest(top_stacks=3):
+            print("Slow block:", slow)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+# metrics/profiler.py
+
+import heapq
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Frames a thread sits in while it has nothing to do; stacks ending in them are not
+# samples of work
+_IDLE = {("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select"),
+         ("threading.py", "_wait_for_tstate_lock"), ("thread.py", "_worker")}
+
+
+def _collapse(frame, max_depth: int) -> Optional[str]:
+    """
+    A stack as 'file:function;...' root first (the flame graph "collapsed" format),
+    or None for an idle thread.
+    """
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE:
+        return None
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SlowBlockProfiler:
+    """
+    A sampling profiler for the slowest blocks. While a block runs inside block(),
+    a daemon thread samples every other thread's Python stack each `interval`
+    seconds (sys._current_frames(), so the profiled code isn't touched). The
+    collapsed-stack counts of the `keep` slowest blocks seen so far are kept.
+
+    Install it as METRICS.profiler; BlockPipeline wraps each block's execution in
+    METRICS.profile_block(). Only one block is profiled at a time; a block that
+    starts while another is being profiled runs unprofiled.
+    """
+
+    def __init__(self, keep: int = 5, interval: float = 0.001, max_depth: int = 48):
+        self.keep = keep
+        self.interval = interval
+        self.max_depth = max_depth
+        self._slowest: List[tuple] = []   # min-heap of (elapsed, seq, block_id, samples)
+        self._seq = 0
+        self._samples: Optional[Counter] = None
+        self._busy = threading.Lock()
+        self._sampling = threading.Lock()
+        self._active = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while True:
+            self._active.wait()
+            with self._sampling:
+                samples = self._samples
+                if samples is not None:
+                    for ident, frame in sys._current_frames().items():
+                        if ident != me:
+                            stack = _collapse(frame, self.max_depth)
+                            if stack is not None:
+                                samples[stack] += 1
+            time.sleep(self.interval)
+
+    def block(self, block_id):
+        return _ProfiledBlock(self, block_id)
+
+    def _begin(self) -> bool:
+        if not self._busy.acquire(blocking=False):
+            return False
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._sample_loop, name="slow-block-profiler", daemon=True)
+            self._thread.start()
+        self._samples = Counter()
+        self._active.set()
+        return True
+
+    def _end(self, block_id, elapsed: float):
+        self._active.clear()
+        with self._sampling:
+            samples, self._samples = self._samples, None
+        entry = (elapsed, self._seq, block_id, samples)
+        self._seq += 1
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, entry)
+        elif elapsed > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+        self._busy.release()
+
+    def slowest(self, top_stacks: int = 10) -> List[Dict]:
+        """
+        The kept blocks, slowest first, with their most-sampled stacks.
+        """
+        return [{"block_id": block_id, "elapsed_s": round(elapsed, 6), "samples": sum(samples.values()),
+                 "top_stacks": samples.most_common(top_stacks)}
+                for elapsed, _, block_id, samples in sorted(self._slowest, reverse=True)]
+
+    def collapsed(self, block_id) -> str:
+        """
+        One kept block's profile in collapsed-stack format ("stack count" lines), as
+        read by flamegraph.pl / speedscope.
+        """
+        for _, _, kept_id, samples in self._slowest:
+            if kept_id == block_id:
+                return "\n".join(f"{stack} {n}" for stack, n in samples.most_common())
+        raise KeyError(block_id)
+
+
+class _ProfiledBlock:
+    __slots__ = ("profiler", "block_id", "started", "active")
+
+    def __init__(self, profiler: SlowBlockProfiler, block_id):
+        self.profiler = profiler
+        self.block_id = block_id
+
+    def __enter__(self):
+        self.active = self.profiler._begin()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.active:
+            self.profiler._end(self.block_id, time.perf_counter() - self.started)
@@ -0,0 +1,309 @@
+# metrics/registry.py
+
+import contextlib
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+perf_counter = time.perf_counter  # monotonic; every timer here uses it
+
+# Histogram buckets: values below 2**_SUB_BITS units get their own bucket, above that
+# each power of two is split into _HALF sub-buckets, so a bucket's width is at most
+# 1/_HALF (~1.6%) of the values in it
+_SUB_BITS = 7
+_HALF = 1 << (_SUB_BITS - 1)
+_SUB = 1 << _SUB_BITS
+_BUCKETS = (64 - _SUB_BITS + 1) * _HALF + _SUB
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+def _bucket_of(v: int) -> int:
+    if v < _SUB:
+        return v
+    shift = v.bit_length() - _SUB_BITS
+    return (shift << (_SUB_BITS - 1)) + (v >> shift)
+
+
+def _bucket_bounds(idx: int):
+    if idx < _SUB:
+        return idx, idx + 1
+    shift = (idx >> (_SUB_BITS - 1)) - 1
+    low = (idx - (shift << (_SUB_BITS - 1))) << shift
+    return low, low + (1 << shift)
+
+
+class Counter:
+    kind = "counter"
+    __slots__ = ("name", "labels", "value", "_lock")
+
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+
+class Gauge:
+    """
+    A value that is set, or (with fn) computed when metrics are collected; an fn
+    returning None drops the gauge from the output.
+    """
+
+    kind = "gauge"
+    __slots__ = ("name", "labels", "value", "fn", "_lock")
+
+    def __init__(self, name: str, labels: Dict[str, str], fn: Optional[Callable[[], Optional[float]]] = None):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self.fn = fn
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def snapshot(self):
+        return self.fn() if self.fn is not None else self.value
+
+    def reset(self):
+        self.value = 0
+
+
+class Histogram:
+    """
+    HDR-style latency histogram: observations are scaled to integer units (`scale`
+    units per observed unit, so 1e9 records seconds at nanosecond resolution) and
+    counted in log-linear buckets, giving ~1.6% worst-case relative error from
+    nanoseconds to hours in a fixed ~3.8k-slot array, allocated on first use.
+    """
+
+    kind = "summary"
+    __slots__ = ("name", "labels", "scale", "count", "total", "max", "_counts", "_lock")
+
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, name: str, labels: Dict[str, str], scale: float = 1e9):
+        self.name = name
+        self.labels = labels
+        self.scale = scale
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._counts: Optional[List[int]] = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = _bucket_of(max(0, int(value * self.scale)))
+        with self._lock:
+            if self._counts is None:
+                self._counts = [0] * _BUCKETS
+            self._counts[idx] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    @contextlib.contextmanager
+    def time(self):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started)
+
+    def quantile(self, q: float) -> float:
+        """
+        Midpoint of the bucket holding the q-th observation (0 if empty).
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(q * self.count))
+            seen = 0
+            for idx, n in enumerate(self._counts):
+                seen += n
+                if seen >= rank:
+                    low, high = _bucket_bounds(idx)
+                    return min(self.max, (low + high - 1) / 2 / self.scale)
+        return self.max
+
+    def reset(self):
+        with self._lock:
+            self.count, self.total, self.max, self._counts = 0, 0.0, 0.0, None
+
+    def snapshot(self) -> Dict:
+        snap = {"count": self.count, "sum": self.total, "max": self.max,
+                "mean": self.total / self.count if self.count else 0.0}
+        for q in self.QUANTILES:
+            snap[f"p{q * 100:g}"] = self.quantile(q)
+        return snap
+
+
+class Registry:
+    """
+    Named metrics, each optionally split by labels. `enabled` is the switch the
+    instrumented code checks before doing any work, so with metrics off a hot path
+    pays one attribute test. Metric objects may be created up front either way.
+
+    profile_block() is the hook for a sampling profiler (see metrics/profiler.py)
+    around block execution; without one it is a shared no-op context.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.profiler = None
+        self._families: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, on: bool = True):
+        self.enabled = on
+        return self
+
+    def _get(self, cls, name: str, help_text: str, labels: Dict[str, str], **kwargs):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = {"kind": cls.kind, "help": help_text, "children": {}}
+            elif family["kind"] != cls.kind:
+                raise ValueError(f"metric {name} is a {family['kind']}, not a {cls.kind}")
+            metric = family["children"].get(key)
+            if metric is None or kwargs.get("fn") is not None:
+                metric = family["children"][key] = cls(name, dict(labels), **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str = "", **labels) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str = "", fn=None, **labels) -> Gauge:
+        return self._get(Gauge, name, help_text, labels, fn=fn)
+
+    def histogram(self, name: str, help_text: str = "", scale: float = 1e9, **labels) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, scale=scale)
+
+    def remove(self, name: str, **labels):
+        with self._lock:
+            family = self._families.get(name)
+            if family is not None:
+                family["children"].pop(tuple(sorted(labels.items())), None)
+
+    def profile_block(self, block_id):
+        if self.profiler is None or not self.enabled:
+            return _NULL_CONTEXT
+        return self.profiler.block(block_id)
+
+    # --- export -----------------------------------------------------------------
+
+    def collect(self):
+        with self._lock:
+            families = [(name, f["kind"], f["help"], list(f["children"].values()))
+                        for name, f in sorted(self._families.items())]
+        for name, kind, help_text, children in families:
+            samples = []
+            for metric in children:
+                value = metric.snapshot()
+                if value is not None:
+                    samples.append((metric.labels, value))
+            yield name, kind, help_text, samples
+
+    def to_json(self) -> Dict:
+        out = {}
+        for name, kind, _, samples in self.collect():
+            out[name] = {"type": kind, "samples": [{"labels": labels, "value": value} for labels, value in samples]}
+        if self.profiler is not None:
+            out["slowest_blocks"] = self.profiler.slowest()
+        return out
+
+    def json_text(self) -> str:
+        return json.dumps(self.to_json(), indent=2, default=str)
+
+    def prometheus_text(self) -> str:
+        lines = []
+        for name, kind, help_text, samples in self.collect():
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind == "summary":
+                    for q in Histogram.QUANTILES:
+                        lines.append(f"{name}{_fmt_labels(labels, quantile=f'{q:g}')} {value[f'p{q * 100:g}']!r}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {value['sum']!r}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_fmt_labels(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        Zeroes every metric (instrumented modules keep their metric objects).
+        """
+        with self._lock:
+            children = [m for f in self._families.values() for m in f["children"].values()]
+        for metric in children:
+            metric.reset()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Dict[str, str], **extra) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in sorted(items.items()))
+    return "{" + body + "}"
+
+
+# The process-wide registry the instrumented modules report to
+METRICS = Registry()
+
+
+def serve_metrics(registry: Registry = METRICS, host: str = "127.0.0.1", port: int = 9108) -> ThreadingHTTPServer:
+    """
+    Serves GET /metrics (Prometheus text) and /metrics.json on a daemon thread.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, ctype = registry.json_text().encode(), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, ctype = registry.prometheus_text().encode(), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -2,6 +2,7 @@
 
 from typing import List
 from concurrency.transaction import Transaction
+from concurrency.ops import Credit, Transfer
 
 def get_demo_transactions():
     """
@@ -52,3 +53,14 @@ def get_demo_transactions():
     ))
 
     return txs
+
+def get_demo_payment_transactions():
+    """
+    The same kind of traffic expressed with declarative ops instead of closures, so it
+    can be pickled, inspected, and batched by VectorizedExecutor.
+    """
+    return [
+        Transaction.from_ops("pay1", [Credit("A", 100)], memo="Deposit transaction in DeFi, user1", fee=0.1),
+        Transaction.from_ops("pay2", [Credit("B", 5)], memo="An NFT mint for user2, synergy with NodeB", fee=0.2),
+        Transaction.from_ops("pay3", [Transfer("A", "B", 10)], memo="A bridging transfer from A to B", fee=0.05),
+    ]
@@ -0,0 +1,183 @@
+# samples/stub_llm_server.py
+#
+# Minimal OpenAI-compatible chat completions server for exercising synergy scoring
+# without a real model. It scores each contributing node by how many memos share a
+# word with the node's profile (capped at 5), optionally with added latency and
+# injected 500 errors.
+#
+#   python -m samples.stub_llm_server --port 8089 --latency 0.2 --fail-rate 0.1
+#   OPENAI_API_KEY=x OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python main.py
+
+import argparse
+import ast
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+_WORD = re.compile(r"[a-z]{3,}")
+_STOPWORDS = {"focus", "and", "the", "for", "with"}
+_BLOCK = re.compile(r"^Block (\S+):$")
+
+
+def _words(text: str):
+    return set(_WORD.findall(text.lower())) - _STOPWORDS
+
+
+def score_prompt(prompt: str) -> dict:
+    """
+    Parses a prompt built by AINodeAggregator._build_prompt and scores its nodes. A
+    _build_group_prompt prompt gets {block label: {node: score}} instead.
+    """
+    profiles, blocks, label, section = {}, {}, None, None
+    for line in prompt.splitlines():
+        line = line.strip()
+        if line in ("Node Profiles:", "Block Memos:"):
+            section = line
+            blocks.setdefault(label, ([], []))
+        elif _BLOCK.match(line):
+            label = _BLOCK.match(line).group(1)
+        elif line.startswith("Nodes that contributed to this block:"):
+            blocks.setdefault(label, ([], []))[1].extend(ast.literal_eval(line.split(":", 1)[1].strip()))
+            section = None
+        elif section == "Node Profiles:" and "=>" in line:
+            node_id, desc = line.split("=>", 1)
+            profiles[node_id.strip()] = _words(desc)
+        elif section == "Block Memos:" and line.startswith("- "):
+            blocks[label][0].append(_words(line[2:]))
+
+    def score(memos, nodes):
+        return {n: min(5, sum(1 for m in memos if m & profiles.get(n, set()))) for n in nodes}
+
+    if label is None:
+        return score(*blocks.get(None, ([], [])))
+    return {b: score(memos, nodes) for b, (memos, nodes) in blocks.items() if b is not None}
+
+
+class StubLLMClient:
+    """
+    The same scoring in-process, behind the slice of the OpenAI client interface the
+    aggregator uses (chat.completions.create); for benchmarks that should not pay
+    for HTTP.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, **kwargs):
+        self.requests += 1
+        content = json.dumps(score_prompt(messages[-1]["content"]))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class StubLLMServer:
+    """
+    The server on a background thread; `port=0` picks a free port. `requests`
+    counts completions requests, including failed ones.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 fail_rate: float = 0.0, seed=None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: dict):
+                data = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out and hung up
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with server._lock:
+                    server.requests += 1
+                    fail = server._rng.random() < server.fail_rate
+                if server.latency:
+                    time.sleep(server.latency)
+                if not self.path.endswith("/chat/completions"):
+                    self._reply(404, {"error": {"message": "not found"}})
+                    return
+                if fail:
+                    self._reply(500, {"error": {"message": "injected failure", "type": "server_error"}})
+                    return
+                prompt = request["messages"][-1]["content"]
+                self._reply(200, {
+                    "id": f"chatcmpl-stub-{server.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": json.dumps(score_prompt(prompt))},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible synergy scorer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, args.port, args.latency, args.fail_rate)
+    print(f"Serving chat completions on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# samples/workload.py
+
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from concurrency.ops import Credit
+from concurrency.transaction import Transaction
+
+TOPICS = ["DeFi", "NFT", "gaming", "bridging", "lending", "oracle", "staking", "DAO", "privacy",
+          "payments", "identity", "storage", "compute", "AI", "insurance", "derivatives"]
+FILLER = ["transfer", "user", "swap", "mint", "deposit", "settle", "order", "pool", "vault",
+          "claim", "reward", "batch", "route", "quote", "fill", "margin"]
+FEE_DISTRIBUTIONS = ("constant", "uniform", "lognormal", "pareto")
+
+
+@dataclass
+class WorkloadConfig:
+    """
+    Shape of a synthetic transaction stream.
+
+      - accounts: key space size; keys are acct0..acct{accounts-1}, acct0 the hottest
+      - zipf_s: skew of key popularity (p(rank r) ~ 1 / r**zipf_s; 0 is uniform)
+      - reads / writes: keys each transaction reads only / writes (writes are Credits)
+      - conflict_ratio: fraction of transactions that also write one of the
+        hot_keys most popular keys, on top of the Zipf draw
+      - memo_min / memo_max: memo length range in bytes (topic words, so the
+        aggregator has something to score)
+      - fee_dist: one of FEE_DISTRIBUTIONS, scaled by fee_scale
+      - nodes: proposers the transactions are spread over (Node0..)
+    """
+    txs: int = 10_000
+    accounts: int = 100_000
+    zipf_s: float = 1.0
+    reads: int = 1
+    writes: int = 2
+    conflict_ratio: float = 0.0
+    hot_keys: int = 8
+    memo_min: int = 16
+    memo_max: int = 64
+    fee_dist: str = "lognormal"
+    fee_scale: float = 0.01
+    nodes: int = 8
+    seed: int = 0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def zipf_keys(rng: np.random.Generator, accounts: int, s: float, shape) -> np.ndarray:
+    """
+    Account indices drawn from a (finite) Zipf distribution over 0..accounts-1.
+    """
+    if s <= 0:
+        return rng.integers(0, accounts, size=shape)
+    cdf = np.cumsum(1.0 / np.arange(1, accounts + 1, dtype=np.float64) ** s)
+    cdf /= cdf[-1]
+    return np.minimum(np.searchsorted(cdf, rng.random(shape), side="right"), accounts - 1)
+
+
+def draw_fees(rng: np.random.Generator, dist: str, scale: float, n: int) -> np.ndarray:
+    if dist == "constant":
+        return np.full(n, scale)
+    if dist == "uniform":
+        return rng.uniform(0.0, 2.0 * scale, n)
+    if dist == "lognormal":
+        return scale * rng.lognormal(0.0, 1.0, n)
+    if dist == "pareto":
+        return scale * (1.0 + rng.pareto(1.5, n))
+    raise ValueError(f"unknown fee distribution {dist!r}; expected one of {FEE_DISTRIBUTIONS}")
+
+
+def _memo(rng: np.random.Generator, length: int) -> str:
+    words = [TOPICS[i] for i in rng.integers(0, len(TOPICS), 2)]
+    size = len(words[0]) + len(words[1]) + 1
+    fill = rng.integers(0, len(FILLER), max(1, length // 5))
+    for i in fill:
+        if size >= length:
+            break
+        words.append(FILLER[i])
+        size += len(FILLER[i]) + 1
+    return " ".join(words)[:max(length, 1)]
+
+
+def generate(config: WorkloadConfig, prefix: str = "w") -> List[Transaction]:
+    """
+    config.txs transactions, deterministic for a given config (seed included).
+    """
+    c = config
+    rng = np.random.default_rng(c.seed)
+    n = c.txs
+    writes = zipf_keys(rng, c.accounts, c.zipf_s, (n, c.writes))
+    reads = zipf_keys(rng, c.accounts, c.zipf_s, (n, c.reads))
+    hot = rng.random(n) < c.conflict_ratio
+    hot_key = rng.integers(0, min(c.hot_keys, c.accounts), n)
+    amounts = rng.integers(1, 1_000, (n, c.writes)).tolist()
+    fees = draw_fees(rng, c.fee_dist, c.fee_scale, n).round(6).tolist()
+    memo_lengths = rng.integers(c.memo_min, c.memo_max + 1, n).tolist()
+    writes_l, reads_l, hot_l, hot_key_l = writes.tolist(), reads.tolist(), hot.tolist(), hot_key.tolist()
+
+    txs = []
+    for i in range(n):
+        keys = dict.fromkeys(writes_l[i])
+        if hot_l[i]:
+            keys[hot_key_l[i]] = None
+        ops = [Credit(f"acct{k}", a) for k, a in zip(keys, amounts[i] + [1])]
+        write_keys = {op.key for op in ops}
+        read_keys = write_keys | {f"acct{k}" for k in reads_l[i]}
+        txs.append(Transaction(f"{prefix}{i}", read_keys, write_keys, None,
+                               memo=_memo(rng, memo_lengths[i]), fee=fees[i], ops=ops))
+    return txs
+
+
+def blocks(config: WorkloadConfig, block_size: int, batches_per_block: int = 2,
+           prefix: str = "w") -> Iterator[List[List[Transaction]]]:
+    """
+    The workload cut into blocks of block_size transactions, each split into
+    batches_per_block proposer batches.
+    """
+    txs = generate(config, prefix)
+    for start in range(0, len(txs), block_size):
+        block = txs[start:start + block_size]
+        step = -(-len(block) // batches_per_block)
+        yield [block[i:i + step] for i in range(0, len(block), step)]
+
+
+def node_profiles(nodes: int) -> Dict[str, str]:
+    """
+    Profiles for Node0..Node{nodes-1}, each focused on two topics.
+    """
+    return {f"Node{i}": f"Focus: {TOPICS[i % len(TOPICS)]}, {TOPICS[(3 * i + 1) % len(TOPICS)]}"
+            for i in range(nodes)}
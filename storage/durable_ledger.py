@@ -0,0 +1,181 @@
+# storage/durable_ledger.py
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from concurrency.codec import CodecError, decode_value, encode_value
+from concurrency.concurrency_engine import ConcurrencyEngine
+from concurrency.ops import SetValue
+from concurrency.transaction import Transaction
+from consensus.block import Block
+from storage.journal import Journal
+from storage.snapshot import SnapshotReader, list_snapshots, snapshot_path, write_snapshot
+
+
+def encode_block_record(block, delta: Dict) -> bytes:
+    votes = block.votes
+    try:
+        encode_value(votes)
+    except CodecError:
+        votes = {}  # votes are advisory; never let them block durability
+    return encode_value({
+        "block_id": block.block_id,
+        "prev_block_id": block.prev_block_id,
+        "poh_ref": block.poh_ref,
+        "daqc_refs": list(block.daqc_refs),
+        "state_root": block.state_root,
+        "executed_block_id": block.executed_block_id,
+        "votes": votes,
+        "delta": delta,
+    })
+
+
+def decode_block_record(payload):
+    record, _ = decode_value(payload)
+    block = Block(
+        block_id=record["block_id"],
+        poh_ref=record["poh_ref"],
+        daqc_refs=record["daqc_refs"],
+        prev_block_id=record["prev_block_id"],
+        votes=record["votes"],
+        state_root=record["state_root"],
+        executed_block_id=record.get("executed_block_id"),
+    )
+    return block, record["delta"]
+
+
+@dataclass
+class RecoveryResult:
+    snapshot_block_id: Optional[int]   # None when starting from an empty ledger
+    blocks: List[Block] = field(default_factory=list)  # journal tail, oldest first
+    replayed_keys: int = 0
+
+    @property
+    def last_block_id(self) -> Optional[int]:
+        if self.blocks:
+            return self.blocks[-1].block_id
+        return self.snapshot_block_id
+
+    def restore_chain(self, tower_bft=None, block_builder=None):
+        """
+        Re-registers the replayed blocks as finalized and points the builder past them.
+        """
+        if tower_bft is not None:
+            for block in self.blocks:
+                tower_bft.restore_finalized(block)
+        if block_builder is not None and self.last_block_id is not None:
+            block_builder.block_counter = self.last_block_id + 1
+            block_builder.last_block_id = self.last_block_id
+
+
+class DurableLedger:
+    """
+    Persistence for finalized blocks and the ledger state, laid out under one directory:
+
+        journal/                  write-ahead log, one record per finalized block
+                                  (header fields + the block's state delta)
+        snapshot-<block>.snap     compacted state as of <block>, memory-mapped on load
+
+    record_block() appends to the journal (fsync batched, see Journal). Every
+    snapshot_every blocks, maybe_snapshot() writes the full state and drops the journal
+    segments it covers. recover() maps the newest snapshot under the AccountState as a
+    lazily-read backing store and replays only the journal records after it.
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 1000, sync_every: int = 64,
+                 sync_interval: float = 0.05, replay_chunk: int = 256):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.replay_chunk = replay_chunk
+        os.makedirs(directory, exist_ok=True)
+        self.journal = Journal(os.path.join(directory, "journal"), sync_every=sync_every,
+                               sync_interval=sync_interval)
+        self._backing: Optional[SnapshotReader] = None
+        self.last_snapshot_block: Optional[int] = None
+        self._blocks_since_snapshot = 0
+
+    def record_block(self, block, delta: Dict):
+        """
+        Journals a finalized block and the values it left in the keys it wrote.
+        """
+        self.journal.append(block.block_id, encode_block_record(block, delta))
+        self._blocks_since_snapshot += 1
+
+    def maybe_snapshot(self, account_state, block_id: int, state_root: bytes = b"") -> bool:
+        if self._blocks_since_snapshot < self.snapshot_every:
+            return False
+        self.snapshot(account_state, block_id, state_root)
+        return True
+
+    def snapshot(self, account_state, block_id: int, state_root: bytes = b""):
+        """
+        Writes the state as of block_id (which must already be journaled, and the
+        state must not change while this runs), then compacts the journal.
+        """
+        self.journal.sync()
+        self.journal.start_segment(block_id + 1)
+        view = account_state.snapshot() if hasattr(account_state, "snapshot") else account_state
+        path = snapshot_path(self.directory, block_id)
+        write_snapshot(path, ((key, view.read(key)) for key in view.keys()), block_id, state_root)
+        self.journal.drop_through(block_id)
+        for old_id, old_path in list_snapshots(self.directory):
+            if old_id < block_id and (self._backing is None or old_path != self._backing.path):
+                os.remove(old_path)
+        self.last_snapshot_block = block_id
+        self._blocks_since_snapshot = 0
+
+    def _open_latest_snapshot(self) -> Optional[SnapshotReader]:
+        for _, path in list_snapshots(self.directory):
+            try:
+                return SnapshotReader(path)
+            except (OSError, ValueError):
+                continue  # incomplete or damaged; fall back to an older one
+        return None
+
+    def recover(self, account_state, engine=None) -> RecoveryResult:
+        """
+        Restores account_state (expected to be fresh) from disk: the newest snapshot is
+        mapped in as its backing store, then the journal tail is replayed.
+
+        The tail's deltas are merged first -- only the last value of each key matters --
+        which turns the replay into disjoint write-only transactions that the engine
+        runs as one fully parallel wave.
+        """
+        reader = self._open_latest_snapshot()
+        base = None
+        if reader is not None:
+            account_state.attach_backing(reader)
+            self._backing = reader
+            base = reader.block_id
+            self.last_snapshot_block = base
+
+        result = RecoveryResult(snapshot_block_id=base)
+        merged: Dict = {}
+        for _, payload in self.journal.records(after=base):
+            block, delta = decode_block_record(payload)
+            result.blocks.append(block)
+            merged.update(delta)
+        self._blocks_since_snapshot = len(result.blocks)
+
+        if merged:
+            items = list(merged.items())
+            txs = [
+                Transaction.from_ops(f"replay-{i}", [SetValue(k, v) for k, v in items[i:i + self.replay_chunk]])
+                for i in range(0, len(items), self.replay_chunk)
+            ]
+            own_engine = engine is None
+            engine = engine or ConcurrencyEngine(account_state)
+            try:
+                results = engine.execute_block_of_transactions(txs)
+            finally:
+                if own_engine:
+                    engine.shutdown()
+            failed = [tx_id for tx_id, (ok, _) in results.items() if not ok]
+            if failed:
+                raise RuntimeError(f"journal replay failed for {failed[:5]}")
+            result.replayed_keys = len(items)
+        return result
+
+    def close(self):
+        self.journal.close()
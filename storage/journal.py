@@ -0,0 +1,224 @@
+# storage/journal.py
+
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+# Frame: payload length, crc32 of (seq + payload), sequence number, then the payload
+_FRAME = struct.Struct(">IIq")
+_SUFFIX = ".wal"
+
+
+def _crc(seq_bytes: bytes, payload) -> int:
+    return zlib.crc32(payload, zlib.crc32(seq_bytes)) & 0xFFFFFFFF
+
+
+def _fsync_dir(path: str):
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """
+    An append-only write-ahead log split into segment files named after the first
+    sequence number they hold. Each record is framed with its length and a crc32, so
+    a torn write at the tail (crash mid-append) is detected and cut off on open.
+
+    fsync is batched: a record is flushed to disk once sync_every records are pending
+    or sync_interval seconds have passed since the last sync, whichever comes first
+    (a background thread covers the quiet case). Call sync() when a record must be
+    durable before going on.
+    """
+
+    def __init__(self, directory: str, sync_every: int = 64, sync_interval: float = 0.05,
+                 segment_bytes: int = 64 << 20):
+        self.directory = directory
+        self.sync_every = max(1, sync_every)
+        self.sync_interval = sync_interval
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment_size = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self.last_seq: Optional[int] = None
+        self._open_tail()
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if sync_interval and sync_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="journal-fsync", daemon=True)
+            self._flusher.start()
+
+    # --- segments -----------------------------------------------------------------
+
+    def segments(self) -> List[Tuple[int, str]]:
+        """
+        (first sequence number, path) of every segment, oldest first.
+        """
+        out = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                try:
+                    first = int(name[: -len(_SUFFIX)])
+                except ValueError:
+                    continue
+                out.append((first, os.path.join(self.directory, name)))
+        out.sort()
+        return out
+
+    def _open_tail(self):
+        segments = self.segments()
+        if not segments:
+            return
+        path = segments[-1][1]
+        valid_end, last_seq = self._scan(path)
+        if valid_end < os.path.getsize(path):
+            # Torn tail from a crash mid-append: drop it
+            with open(path, "r+b") as f:
+                f.truncate(valid_end)
+                f.flush()
+                os.fsync(f.fileno())
+        if last_seq is None and len(segments) > 1:
+            last_seq = self._scan(segments[-2][1])[1]
+        self.last_seq = last_seq
+        self._file = open(path, "ab")
+        self._segment_size = valid_end
+
+    @staticmethod
+    def _scan(path: str) -> Tuple[int, Optional[int]]:
+        """
+        Returns (offset just past the last intact record, its sequence number).
+        """
+        end, last_seq = 0, None
+        for seq, _, offset in Journal._frames(path):
+            end, last_seq = offset, seq
+        return end, last_seq
+
+    @staticmethod
+    def _frames(path: str) -> Iterator[Tuple[int, bytes, int]]:
+        with open(path, "rb") as f:
+            data = f.read()
+        offset, size = 0, len(data)
+        view = memoryview(data)
+        while offset + _FRAME.size <= size:
+            length, crc, seq = _FRAME.unpack_from(data, offset)
+            start = offset + _FRAME.size
+            end = start + length
+            if end > size:
+                break
+            payload = view[start:end]
+            if _crc(data[offset + 8:start], payload) != crc:
+                break
+            yield seq, payload, end
+            offset = end
+
+    def _roll(self, first_seq: int):
+        if self._file is not None:
+            self._sync_locked()
+            self._file.close()
+        path = os.path.join(self.directory, f"{first_seq:020d}{_SUFFIX}")
+        self._file = open(path, "ab")
+        self._segment_size = 0
+        _fsync_dir(self.directory)
+
+    # --- writing ------------------------------------------------------------------
+
+    def append(self, seq: int, payload: bytes):
+        """
+        Appends one record. Sequence numbers must increase.
+        """
+        header = _FRAME.pack(len(payload), 0, seq)
+        crc = _crc(header[8:], payload)
+        frame = _FRAME.pack(len(payload), crc, seq)
+        with self._lock:
+            if self.last_seq is not None and seq <= self.last_seq:
+                raise ValueError(f"journal sequence must increase ({seq} after {self.last_seq})")
+            if self._file is None or self._segment_size >= self.segment_bytes:
+                self._roll(seq)
+            self._file.write(frame)
+            self._file.write(payload)
+            self._segment_size += len(frame) + len(payload)
+            self.last_seq = seq
+            self._pending += 1
+            if self._pending >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync_locked()
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._file is not None and self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.sync_interval):
+            with self._lock:
+                if self._pending and self._file is not None:
+                    self._sync_locked()
+
+    def start_segment(self, first_seq: int):
+        """
+        Closes the current segment so later appends (from first_seq on) go to a new
+        one; used after a snapshot so older segments can be dropped whole.
+        """
+        with self._lock:
+            if self._segment_size:
+                self._roll(first_seq)
+
+    def drop_through(self, seq: int) -> int:
+        """
+        Deletes segments whose records all have sequence numbers <= seq; returns how
+        many were removed. The segment being written to is never removed.
+        """
+        with self._lock:
+            segments = self.segments()
+            removed = 0
+            for (first, path), (next_first, _) in zip(segments, segments[1:]):
+                if next_first <= seq + 1:
+                    os.remove(path)
+                    removed += 1
+            if removed:
+                _fsync_dir(self.directory)
+            return removed
+
+    # --- reading ------------------------------------------------------------------
+
+    def records(self, after: Optional[int] = None) -> Iterator[Tuple[int, memoryview]]:
+        """
+        Yields (seq, payload) for every intact record with seq > after, in order.
+        """
+        segments = self.segments()
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        for i, (first, path) in enumerate(segments):
+            if after is not None and i + 1 < len(segments) and segments[i + 1][0] <= after + 1:
+                continue  # every record in this segment is at or before `after`
+            for seq, payload, _ in self._frames(path):
+                if after is None or seq > after:
+                    yield seq, payload
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            if self._file is not None:
+                self._sync_locked()
+                self._file.close()
+                self._file = None
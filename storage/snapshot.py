@@ -0,0 +1,155 @@
+# storage/snapshot.py
+
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, Optional, Tuple
+
+from concurrency.codec import decode_value, encode_value
+
+# File layout (all integers big-endian):
+#   header  magic | version | block_id | count | index_offset | state_root (32 bytes)
+#   data    for each entry, sorted by key bytes: key bytes, then the encoded value
+#   index   count fixed-size entries: data offset, key length, value length
+#   footer  magic (a missing footer means the file was never completed)
+_MAGIC = b"PFSNAP01"
+_VERSION = 1
+_HEADER = struct.Struct(">8sIqQQ32s")
+_ENTRY = struct.Struct(">QII")
+_PREFIX = "snapshot-"
+_SUFFIX = ".snap"
+
+
+def snapshot_path(directory: str, block_id: int) -> str:
+    return os.path.join(directory, f"{_PREFIX}{block_id:020d}{_SUFFIX}")
+
+
+def list_snapshots(directory: str) -> list:
+    """
+    (block_id, path) of every snapshot file in directory, newest first.
+    """
+    out = []
+    if not os.path.isdir(directory):
+        return out
+    for name in os.listdir(directory):
+        if name.startswith(_PREFIX) and name.endswith(_SUFFIX):
+            try:
+                block_id = int(name[len(_PREFIX): -len(_SUFFIX)])
+            except ValueError:
+                continue
+            out.append((block_id, os.path.join(directory, name)))
+    out.sort(reverse=True)
+    return out
+
+
+def write_snapshot(path: str, items: Iterable[Tuple[str, object]], block_id: int,
+                   state_root: bytes = b"") -> int:
+    """
+    Writes a snapshot of items atomically (temp file, fsync, rename); returns the
+    number of entries. Keys must be unique.
+    """
+    entries = sorted((key.encode("utf-8"), value) for key, value in items)
+    tmp = path + ".tmp"
+    index = bytearray()
+    with open(tmp, "wb") as f:
+        f.write(bytes(_HEADER.size))
+        offset = _HEADER.size
+        for key, value in entries:
+            encoded = encode_value(value)
+            index += _ENTRY.pack(offset, len(key), len(encoded))
+            f.write(key)
+            f.write(encoded)
+            offset += len(key) + len(encoded)
+        f.write(index)
+        f.write(_MAGIC)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _VERSION, block_id, len(entries), offset,
+                             state_root.ljust(32, b"\0")[:32]))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if os.name == "posix":
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return len(entries)
+
+
+class SnapshotReader:
+    """
+    A memory-mapped, read-only view of a snapshot file. Opening it reads only the
+    header; each get() binary-searches the on-disk index and decodes a single value,
+    so the OS pages in just the parts of the file that are actually used.
+
+    It has the small mapping interface AccountState.attach_backing() expects:
+    get(), `in`, keys() and len().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if len(mm) < _HEADER.size + len(_MAGIC):
+            self._mm.close()
+            raise ValueError(f"{path}: truncated snapshot")
+        magic, version, block_id, count, index_offset, root = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or version != _VERSION or mm[-len(_MAGIC):] != _MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path}: not a complete snapshot")
+        if index_offset + count * _ENTRY.size + len(_MAGIC) != len(mm):
+            self._mm.close()
+            raise ValueError(f"{path}: index size mismatch")
+        self.block_id = block_id
+        self.state_root = root if any(root) else b""
+        self._count = count
+        self._index_offset = index_offset
+
+    def __len__(self):
+        return self._count
+
+    def _entry(self, i: int) -> Tuple[int, int, int]:
+        return _ENTRY.unpack_from(self._mm, self._index_offset + i * _ENTRY.size)
+
+    def _find(self, key: str) -> Optional[int]:
+        target = key.encode("utf-8")
+        mm = self._mm
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset, key_len, _ = self._entry(mid)
+            probe = mm[offset:offset + key_len]
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def get(self, key: str, default=None):
+        i = self._find(key)
+        if i is None:
+            return default
+        offset, key_len, _ = self._entry(i)
+        return decode_value(self._mm, offset + key_len)[0]
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) is not None
+
+    def keys(self) -> Iterator[str]:
+        mm = self._mm
+        for i in range(self._count):
+            offset, key_len, _ = self._entry(i)
+            yield mm[offset:offset + key_len].decode("utf-8")
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        mm = self._mm
+        for i in range(self._count):
+            offset, key_len, _ = self._entry(i)
+            yield mm[offset:offset + key_len].decode("utf-8"), decode_value(mm, offset + key_len)[0]
+
+    def close(self):
+        self._mm.close()